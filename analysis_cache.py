@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Smart Glasses Analysis Cache
+Content-addressed LRU cache for model responses, keyed by the image bytes,
+prompt and model name, with optional SQLite persistence across restarts.
+"""
+
+import time
+import sqlite3
+import hashlib
+import pathlib
+import threading
+from collections import OrderedDict
+
+def cache_key(image_data, prompt, model_name):
+    """Hash of everything that determines the model's answer"""
+    digest = hashlib.sha256()
+    for part in (image_data or b"", prompt.encode(), model_name.encode()):
+        digest.update(len(part).to_bytes(8, "little"))
+        digest.update(part)
+    return digest.hexdigest()
+
+class AnalysisCache:
+    def __init__(self, max_entries=1024, max_bytes=16 * 1024 * 1024, ttl=7 * 24 * 3600, db_path=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (created_at, text)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._conn = None
+        if db_path:
+            db_path = pathlib.Path(db_path)
+            db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS analysis_cache (
+                    key TEXT PRIMARY KEY,
+                    created_at REAL NOT NULL,
+                    text TEXT NOT NULL
+                )
+            """)
+            self._load()
+
+    def _load(self):
+        """Warm the in-memory LRU from disk, newest entries last"""
+        cutoff = time.time() - self.ttl
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM analysis_cache WHERE created_at < ?", (cutoff,))
+            rows = self._conn.execute(
+                "SELECT key, created_at, text FROM analysis_cache ORDER BY created_at DESC LIMIT ?",
+                (self.max_entries,)
+            ).fetchall()
+            for key, created_at, text in reversed(rows):
+                self._insert(key, created_at, text)
+        if rows:
+            print(f"🧠 Loaded {len(self._entries)} cached analyses")
+
+    def _insert(self, key, created_at, text):
+        """Add to the LRU and evict from the cold end until within bounds (lock held)"""
+        old = self._entries.pop(key, None)
+        if old:
+            self._bytes -= len(old[1])
+        self._entries[key] = (created_at, text)
+        self._bytes += len(text)
+        evicted = []
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            old_key, (_, old_text) = self._entries.popitem(last=False)
+            self._bytes -= len(old_text)
+            self.evictions += 1
+            evicted.append(old_key)
+        return evicted
+
+    def get(self, key):
+        """Cached text for key, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and time.time() - entry[0] <= self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry:
+                self._entries.pop(key)
+                self._bytes -= len(entry[1])
+                self.evictions += 1
+            self.misses += 1
+            return None
+
+    def put(self, key, text):
+        """Store a model response"""
+        now = time.time()
+        with self._lock:
+            evicted = self._insert(key, now, text)
+            if self._conn:
+                with self._conn:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO analysis_cache (key, created_at, text) VALUES (?, ?, ?)",
+                        (key, now, text)
+                    )
+                    self._conn.executemany(
+                        "DELETE FROM analysis_cache WHERE key = ?", [(k,) for k in evicted]
+                    )
+
+    def clear(self):
+        """Drop every entry, in memory and on disk"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            if self._conn:
+                with self._conn:
+                    self._conn.execute("DELETE FROM analysis_cache")
+
+    def stats(self):
+        """Hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'evictions': self.evictions,
+                'persistent': self._conn is not None
+            }
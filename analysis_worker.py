@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Smart Glasses Analysis Worker
+Background executor for model calls so HTTP threads return immediately.
+Identical in-flight requests (same image bytes + prompt) share one job.
+"""
+
+import time
+import uuid
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+def analysis_key(image_data, prompt):
+    """Dedup key for an analysis request: hash of the image bytes and the prompt"""
+    digest = hashlib.sha256(image_data)
+    digest.update(b"\0")
+    digest.update(prompt.encode())
+    return digest.hexdigest()
+
+class RateLimiter:
+    def __init__(self, rate_per_minute, burst=1):
+        # Token bucket: rate_per_minute tokens refill continuously, up to burst
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+class AnalysisJob:
+    def __init__(self, key, kind="analysis"):
+        self.id = uuid.uuid4().hex[:12]
+        self.key = key
+        self.kind = kind
+        self.status = "queued"
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.done = threading.Event()
+
+    def wait(self, timeout=None):
+        """Block until the job finishes; returns True if it did"""
+        return self.done.wait(timeout)
+
+    def to_dict(self):
+        """JSON-friendly job state"""
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+
+class AnalysisExecutor:
+    def __init__(self, max_workers=4, rate_per_minute=None, burst=1, max_jobs=1000, event_bus=None):
+        self.event_bus = event_bus
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="analysis")
+        self.rate_limiter = RateLimiter(rate_per_minute, burst) if rate_per_minute else None
+        self.max_jobs = max_jobs
+        self._jobs = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.coalesced = 0
+
+    def submit(self, key, fn, *args, kind="analysis", **kwargs):
+        """Queue fn(*args, **kwargs); an identical in-flight request returns the existing job"""
+        with self._lock:
+            job = self._inflight.get(key)
+            if job:
+                self.coalesced += 1
+                return job
+            job = AnalysisJob(key, kind)
+            self._inflight[key] = job
+            self._jobs[job.id] = job
+            self.submitted += 1
+            while len(self._jobs) > self.max_jobs:
+                old_id, old_job = next(iter(self._jobs.items()))
+                if not old_job.done.is_set():
+                    break
+                del self._jobs[old_id]
+        self.pool.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        """Worker body: rate limit, call, record the outcome"""
+        try:
+            if self.rate_limiter:
+                self.rate_limiter.acquire()
+            job.status = "running"
+            job.started_at = time.time()
+            job.result = fn(*args, **kwargs)
+            job.status = "done"
+        except Exception as e:
+            job.error = str(e)
+            job.status = "error"
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                self._inflight.pop(job.key, None)
+            job.done.set()
+            if self.event_bus:
+                self.event_bus.publish('analysis', job.to_dict())
+
+    def get(self, job_id):
+        """Look up a job by id"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self):
+        """Executor counters"""
+        with self._lock:
+            return {
+                'submitted': self.submitted,
+                'coalesced': self.coalesced,
+                'in_flight': len(self._inflight),
+                'tracked_jobs': len(self._jobs)
+            }
+
+    def shutdown(self, wait=True):
+        """Stop accepting work; optionally wait for running jobs"""
+        self.pool.shutdown(wait=wait)
@@ -5,16 +5,39 @@ Flask application providing web interface for smart glasses camera system.
 """
 
 import os
+import sys
 import json
+import math
 import time
+import signal
 import threading
+import uuid
+import hashlib
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-from flask import Flask, render_template, jsonify, request, send_file
+from flask import Flask, render_template, jsonify, request, send_file, Response, g
+from werkzeug.utils import safe_join
 from flask_cors import CORS
-import google.generativeai as genai
 from dotenv import load_dotenv
-from arduino_camera import ESP32Camera
+from camera_manager import CameraManager, discover_ports
+from arduino_camera import PROFILES
+from capture_catalog import CaptureCatalog
+from model_client import create_model_client, parse_outages, StreamStats
+from analysis_worker import AnalysisExecutor, analysis_key
+from job_queue import JobQueue, PermanentError, INTERACTIVE, BACKGROUND
+from analysis_cache import AnalysisCache, cache_key
+from frame_dedup import FrameDeduplicator
+from derivatives import DerivativeStore, VARIANTS
+from capture_store import CaptureStore
+from capture_scheduler import AdaptiveScheduler
+from disk_writer import DiskWriter
+from event_bus import EventBus, format_sse
+from scene_captioner import SceneCaptioner, CAPTION_PROMPT
+from embedding_index import EmbeddingIndex
+from summarizer import Summarizer
+from chat_store import ChatStore, SESSION_ID
+from metrics import REGISTRY, RequestProfiler
 
 # Load environment variables
 load_dotenv()
@@ -22,54 +45,100 @@ load_dotenv()
 app = Flask(__name__)
 CORS(app)
 
+HTTP_SECONDS = REGISTRY.histogram(
+    "http_request_seconds", "Time to produce a response (streams: until headers are sent)", ("route", "method", "status"))
+CATALOG_QUERY_SECONDS = REGISTRY.histogram(
+    "catalog_query_seconds", "Catalog query time", ("query",))
+
+# Per-request cProfile, switched on at runtime via /api/debug/profile (PROFILING_ALLOWED=1)
+profiler = RequestProfiler()
+PROFILING_ALLOWED = os.getenv('PROFILING_ALLOWED', '0') == '1'
+
 # Configuration
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
-    model = genai.GenerativeModel('gemini-1.5-flash')
-else:
-    model = None
-    print("⚠️  Warning: GEMINI_API_KEY not found in .env file")
+MODEL_BACKEND = os.getenv('MODEL_BACKEND', 'gemini')  # 'gemini' or 'fake'
+CHAT_CONTEXT_TOKENS = int(os.getenv('CHAT_CONTEXT_TOKENS', '1000'))
+# How long /api/chat waits for its queued answer before returning the job instead
+CHAT_WAIT_SECONDS = float(os.getenv('CHAT_WAIT_SECONDS', '30'))
+# Summaries of a window ending "now" end on the next whole minute
+SUMMARY_WINDOW_STEP = 60
+
+# Near-duplicate suppression for frames from a static scene (DEDUP_MAX_DISTANCE=-1 disables)
+DEDUP_MAX_DISTANCE = int(os.getenv('DEDUP_MAX_DISTANCE', '4'))
+
+# The default camera keeps writing to the top level of captures/
+DEFAULT_CAMERA = 'default'
+
+# Services are created by init_services(), once per process, so importing this
+# module (or a server re-importing it) never opens serial ports or starts threads
+model = None
+stream_stats = None
+event_bus = None
+analysis_queue = None
+stream_slots = None
+analysis_cache = None
+catalog = None
+search_index = None
+chat_store = None
+derivatives = None
+capture_store = None
+disk_writer = None
+camera_manager = None
+camera = None
+glasses_system = None
+captioner = None
+summarizer = None
+summary_executor = None
+_services_lock = threading.Lock()
+_services_started = False
 
-# Global camera instance
-camera = ESP32Camera()
-camera_running = False
+def make_deduplicator():
+    """One dedup window per camera"""
+    if DEDUP_MAX_DISTANCE < 0:
+        return None
+    return FrameDeduplicator(
+        max_distance=DEDUP_MAX_DISTANCE,
+        window=int(os.getenv('DEDUP_WINDOW', '32')),
+        mode=os.getenv('DEDUP_MODE', 'reference')
+    )
+
+def make_scheduler():
+    """One adaptive capture schedule (and budget) per camera"""
+    budget_mb = float(os.getenv('CAPTURE_BUDGET_MB_PER_HOUR', '0'))
+    return AdaptiveScheduler(
+        min_interval=float(os.getenv('CAPTURE_MIN_INTERVAL', '1')),
+        max_interval=float(os.getenv('CAPTURE_MAX_INTERVAL', '10')),
+        threshold=float(os.getenv('CAPTURE_CHANGE_THRESHOLD', '0.03')),
+        max_captures_per_hour=int(os.getenv('CAPTURE_BUDGET_PER_HOUR', '0')) or None,
+        max_bytes_per_hour=int(budget_mb * 1024 ** 2) or None
+    )
+
+@contextmanager
+def model_slot():
+    """Hold one of the ANALYSIS_WORKERS streaming slots (and a rate limit token) for a model call"""
+    with stream_slots:
+        if analysis_queue.rate_limiter:
+            analysis_queue.rate_limiter.acquire()
+        yield
 
 class SmartGlassesSystem:
     def __init__(self):
         self.captures_dir = Path("captures")
         self.captures_dir.mkdir(exist_ok=True)
-        self.chat_history = []
+        self.catalog = catalog
+        self.chat_store = chat_store
     
-    def get_recent_images(self, limit=20):
+    def get_recent_images(self, limit=20, before_id=None, camera=None, after_id=None, start=None, end=None):
         """Get most recent captured images"""
-        images = []
-        for img_path in sorted(self.captures_dir.glob("*.jpg"), key=os.path.getmtime, reverse=True):
-            if len(images) >= limit:
-                break
-            images.append({
-                'filename': img_path.name,
-                'path': str(img_path),
-                'timestamp': datetime.fromtimestamp(img_path.stat().st_mtime).strftime('%Y-%m-%d %H:%M:%S'),
-                'size': img_path.stat().st_size
-            })
-        return images
+        with CATALOG_QUERY_SECONDS.time(query="latest"):
+            return self.catalog.latest(limit, before_id=before_id, camera=camera, after_id=after_id,
+                                       start=start, end=end)
     
-    def analyze_image_with_gemini(self, image_path, user_question=None):
-        """Analyze image using Gemini Vision API"""
-        if not model:
-            return "Gemini API not configured. Please add GEMINI_API_KEY to .env file."
-        
-        try:
-            # Read image
-            with open(image_path, 'rb') as img_file:
-                img_data = img_file.read()
-            
-            # Prepare prompt
-            if user_question:
-                prompt = f"User question: {user_question}\n\nPlease analyze this image and answer the user's question. Be detailed and helpful."
-            else:
-                prompt = """Analyze this image captured by smart glasses. Describe:
+    def build_analysis_prompt(self, user_question=None):
+        """Prompt used for single-image analysis"""
+        if user_question:
+            return f"User question: {user_question}\n\nPlease analyze this image and answer the user's question. Be detailed and helpful."
+        return """Analyze this image captured by smart glasses. Describe:
 1. What you see in the scene
 2. Any people, objects, or activities
 3. The environment/location
@@ -77,58 +146,342 @@ class SmartGlassesSystem:
 5. Context that might be useful for someone wearing smart glasses
 
 Be concise but informative."""
-            
-            # Create image part
-            image_part = {
-                "mime_type": "image/jpeg",
-                "data": img_data
-            }
-            
-            # Generate response
-            response = model.generate_content([prompt, image_part])
-            return response.text
-            
-        except Exception as e:
-            return f"Error analyzing image: {str(e)}"
     
-    def chat_with_context(self, user_message, recent_images_count=5):
-        """Chat with Gemini using context from recent images"""
-        if not model:
-            return "Gemini API not configured. Please add GEMINI_API_KEY to .env file."
+    def generate_for_image(self, image_path, prompt):
+        """Run one image + prompt model call through the result cache; raises on failure"""
+        # Read the downscaled copy; full SVGA frames only cost upload time
+        img_data = derivatives.model_input(image_path)
         
-        try:
-            # Get recent images for context
-            recent_images = self.get_recent_images(recent_images_count)
-            
-            # Build context prompt
-            context_prompt = f"""You are an AI assistant for smart glasses. The user is asking: "{user_message}"
+        # Identical image + prompt + model: reuse the earlier answer
+        key = cache_key(img_data, prompt, model.model_name)
+        cached = analysis_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        # Create image part
+        image_part = {
+            "mime_type": "image/jpeg",
+            "data": img_data
+        }
+        
+        # Generate response
+        text = model.generate([prompt, image_part])
+        analysis_cache.put(key, text)
+        return text
+    
+    def stream_for_image(self, image_path, prompt):
+        """Like generate_for_image, but yields the response text as it arrives"""
+        img_data = derivatives.model_input(image_path)
+        key = cache_key(img_data, prompt, model.model_name)
+        cached = analysis_cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+        
+        chunks = []
+        with model_slot():
+            for chunk in stream_stats.timed(model.generate_stream([prompt, {"mime_type": "image/jpeg", "data": img_data}])):
+                chunks.append(chunk)
+                yield chunk
+        analysis_cache.put(key, "".join(chunks))
+    
+    def analyze_image_with_gemini(self, image_path, user_question=None):
+        """Analyze image using Gemini Vision API; raises so queued jobs can retry"""
+        return self.generate_for_image(image_path, self.build_analysis_prompt(user_question))
+    
+    def analysis_job(self, payload):
+        """Queue handler: analyze one stored capture"""
+        filename = payload['filename']
+        if not capture_store.exists(filename):
+            raise PermanentError(f"{filename} no longer exists")
+        return self.analyze_image_with_gemini(self.captures_dir / filename, payload.get('question'))
+    
+    def caption_image(self, image_path):
+        """Short scene description stored for chat context"""
+        return self.generate_for_image(image_path, CAPTION_PROMPT)
+    
+    def build_chat_context(self, user_message, caption_count=20, search_hits=5, history=None):
+        """Prompt parts for a chat turn: precomputed captions plus at most one fresh image"""
+        captioned = self.catalog.recent_captions(caption_count)
+        latest = self.get_recent_images(1)
+        # Older moments that match the question, beyond the recent window
+        recent_ids = {img['id'] for img in captioned}
+        hits = [capture_id for capture_id, _ in search_index.search(user_message, k=search_hits + len(recent_ids))
+                if capture_id not in recent_ids][:search_hits]
+        relevant = self.catalog.get_many(hits)
+        
+        context_prompt = f"""You are an AI assistant for smart glasses. The user is asking: "{user_message}"
 
-You have access to context from recent images captured by the smart glasses:
+Here is what the smart glasses captured recently (oldest first), as short scene descriptions:
 """
-            
-            # Add image context
-            for i, img in enumerate(recent_images[:3]):  # Use top 3 most recent
-                context_prompt += f"\nImage {i+1} (captured at {img['timestamp']}): {img['filename']}\n"
-            
-            context_prompt += "\nPlease respond helpfully based on this context. If the question relates to recent visual information, reference what the smart glasses likely captured."
-            
-            # Generate response
-            response = model.generate_content(context_prompt)
-            
-            # Store chat history
-            self.chat_history.append({
-                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                'user_message': user_message,
-                'ai_response': response.text
+        for img in reversed(captioned):
+            context_prompt += f"\n[{img['timestamp']}] {img['caption']}"
+        if not captioned:
+            context_prompt += "\n(no scene descriptions available yet)"
+        if relevant:
+            context_prompt += "\n\nEarlier moments that may be relevant to the question:\n"
+            for img in relevant:
+                context_prompt += f"\n[{img['timestamp']}] {img['caption']}"
+        
+        if history:
+            context_prompt += "\n\nEarlier in this conversation:\n"
+            for turn in history:
+                context_prompt += f"\nUser: {turn['user_message']}\nAssistant: {turn['ai_response']}"
+        
+        parts = [context_prompt]
+        # The newest frame may not be captioned yet; show it directly instead
+        if latest and (not captioned or latest[0]['id'] != captioned[0]['id']):
+            parts[0] += f"\n\nThe attached image is the most recent frame, captured at {latest[0]['timestamp']}."
+            parts.append({
+                "mime_type": "image/jpeg",
+                "data": derivatives.model_input(latest[0]['path'])
             })
-            
-            return response.text
-            
-        except Exception as e:
-            return f"Error in chat: {str(e)}"
+        
+        parts[0] += "\n\nPlease respond helpfully based on this context. If the question relates to something the glasses saw, say when it was seen."
+        return parts
+    
+    def chat_with_context(self, user_message, session_id):
+        """Chat with Gemini using context from recent images; raises so queued jobs can retry"""
+        # Generate response, with as much of this session's history as fits the budget
+        history = self.chat_store.context(session_id, max_tokens=CHAT_CONTEXT_TOKENS)
+        response_text = model.generate(self.build_chat_context(user_message, history=history))
+        
+        # Store chat history
+        self.chat_store.append(session_id, user_message, response_text)
+        
+        return response_text
+    
+    def chat_job(self, payload):
+        """Queue handler: answer one chat message (context is gathered when it runs)"""
+        return self.chat_with_context(payload['message'], payload['session_id'])
+
+    def stream_chat(self, user_message, session_id):
+        """Like chat_with_context, but yields the response text as it arrives"""
+        history = self.chat_store.context(session_id, max_tokens=CHAT_CONTEXT_TOKENS)
+        parts = self.build_chat_context(user_message, history=history)
+        chunks = []
+        with model_slot():
+            for chunk in stream_stats.timed(model.generate_stream(parts)):
+                chunks.append(chunk)
+                yield chunk
+        self.chat_store.append(session_id, user_message, "".join(chunks))
+    
+    def summarize_text(self, prompt):
+        """Text-only model call used by the summarizer's reduce steps"""
+        return model.generate([prompt])
+
+def index_caption(image, caption):
+    """Make a new caption searchable as soon as it is stored"""
+    if search_index.add(image['id'], image['captured_at'], caption, time.time()):
+        search_index.flush()
+
+def init_services():
+    """Create the model client, stores, cameras and background workers (idempotent)"""
+    global model, stream_stats, event_bus, analysis_queue, stream_slots, analysis_cache, catalog, search_index
+    global chat_store, derivatives, capture_store, disk_writer, camera_manager, camera, glasses_system, captioner
+    global summarizer, summary_executor, _services_started
+    with _services_lock:
+        if _services_started:
+            return
+        
+        model = create_model_client(GEMINI_API_KEY, backend=MODEL_BACKEND,
+                                    fake_latency=float(os.getenv('FAKE_MODEL_LATENCY', '0.5')),
+                                    fake_outages=parse_outages(os.getenv('FAKE_MODEL_OUTAGES')),
+                                    fake_outage_period=float(os.getenv('FAKE_MODEL_OUTAGE_PERIOD', '0')) or None,
+                                    fake_failure_rate=float(os.getenv('FAKE_MODEL_FAILURE_RATE', '0')))
+        if not model:
+            print("⚠️  Warning: GEMINI_API_KEY not found in .env file")
+        
+        # Time-to-first-token of streamed chat/analysis responses
+        stream_stats = StreamStats()
+        
+        # Pushes capture / camera / analysis events to connected browsers
+        event_bus = EventBus()
+        
+        # Durable queue for model calls: retried with backoff while offline,
+        # interactive work ahead of captions, drained as soon as the backend is back
+        workers = int(os.getenv('ANALYSIS_WORKERS', '4'))
+        analysis_queue = JobQueue(
+            db_path="captures/.catalog/jobs.db",
+            event_bus=event_bus,
+            max_workers=workers,
+            rate_per_minute=float(os.getenv('ANALYSIS_RATE_PER_MINUTE', '0')) or None,
+            burst=int(os.getenv('ANALYSIS_BURST', '4')),
+            max_attempts=int(os.getenv('ANALYSIS_MAX_ATTEMPTS', '8')),
+            max_delay=float(os.getenv('ANALYSIS_MAX_BACKOFF', '300'))
+        )
+        # Streamed answers run on request threads; they get as many model slots as the queue has workers
+        stream_slots = threading.BoundedSemaphore(workers)
+        
+        # Cache of model responses keyed by image content + prompt + model
+        analysis_cache = AnalysisCache(
+            max_entries=int(os.getenv('ANALYSIS_CACHE_ENTRIES', '1024')),
+            ttl=float(os.getenv('ANALYSIS_CACHE_TTL', str(7 * 24 * 3600))),
+            db_path="captures/.catalog/analysis_cache.db" if os.getenv('ANALYSIS_CACHE_PERSIST', '1') == '1' else None
+        )
+        
+        # Capture catalog shared by the camera (writer) and the web API (reader)
+        catalog = CaptureCatalog("captures")
+        catalog.rebuild()
+        
+        # Semantic search over scene captions, kept next to the catalog
+        search_index = EmbeddingIndex("captures/.catalog/embeddings")
+        search_index.sync(catalog)
+        
+        # Per-browser chat history: recent turns in memory, the rest in captures/.chat
+        chat_store = ChatStore(
+            "captures/.chat",
+            window=int(os.getenv('CHAT_HISTORY_WINDOW', '50'))
+        )
+        
+        # Thumbnails and model-sized copies, built in the background as frames arrive
+        derivatives = DerivativeStore("captures", reader=lambda filename: capture_store.read(filename))
+        
+        # Retention and compaction of old captures into per-day pack files
+        retention_gb = float(os.getenv('RETENTION_MAX_GB', '0'))
+        capture_store = CaptureStore(
+            "captures",
+            catalog=catalog,
+            derivatives=derivatives,
+            max_age_days=float(os.getenv('RETENTION_DAYS', '0')) or None,
+            max_bytes=int(retention_gb * 1024 ** 3) or None,
+            compact_after_days=float(os.getenv('COMPACT_AFTER_DAYS', '2')),
+            interval=float(os.getenv('STORAGE_MAINTENANCE_INTERVAL', '600'))
+        )
+        capture_store.start()
+        
+        # Frames are written off the serial read path: temp file, batched fsync, rename
+        disk_writer = DiskWriter(
+            max_pending=int(os.getenv('DISK_WRITER_QUEUE', '32')),
+            policy=os.getenv('DISK_WRITER_POLICY', 'block'),
+            fsync=os.getenv('DISK_FSYNC', 'batch'),
+            batch_size=int(os.getenv('DISK_FSYNC_BATCH', '8'))
+        )
+        
+        # Every camera shares the catalog, disk writer, derivative pool and event bus
+        camera_manager = CameraManager(
+            captures_dir="captures",
+            catalog=catalog,
+            event_bus=event_bus,
+            deduplicator_factory=make_deduplicator,
+            scheduler_factory=make_scheduler,
+            frame_listeners=[derivatives.schedule],
+            disk_writer=disk_writer,
+            # Protocol 2 firmware is switched to this rate after the handshake
+            target_baud=int(os.getenv('CAMERA_BAUD_TARGET', '0')) or None,
+            # Adaptive capture probes with this profile and saves full frames only on change
+            detect_profile=os.getenv('CAPTURE_DETECT_PROFILE', 'fast') or None
+        )
+        camera = camera_manager.add_camera(os.getenv('CAMERA_PORT', '/dev/cu.usbmodem2101'),
+                                           camera_id=DEFAULT_CAMERA, captures_dir="captures")
+        if os.getenv('CAMERA_DISCOVER', '1') == '1':
+            camera_manager.discover()
+        
+        glasses_system = SmartGlassesSystem()
+        
+        # Describe each capture once in the background (CAPTION_ENABLED=0 disables)
+        captioner = SceneCaptioner(
+            catalog,
+            glasses_system.caption_image,
+            analysis_queue,
+            event_bus=event_bus,
+            model_name=model.model_name if model else None
+        )
+        captioner.caption_listeners.append(index_caption)
+        
+        # Durable job kinds; work queued before a restart resumes once registered.
+        # Without a model they stay on disk until one is configured
+        if model:
+            analysis_queue.register('analysis', glasses_system.analysis_job, priority=INTERACTIVE)
+            analysis_queue.register('chat', glasses_system.chat_job, priority=INTERACTIVE)
+            # Captions never take every worker, so interactive requests start right away
+            analysis_queue.register('caption', captioner.caption_job, priority=BACKGROUND,
+                                    max_concurrent=int(os.getenv('CAPTION_CONCURRENCY', str(max(1, workers // 2)))))
+        if model and os.getenv('CAPTION_ENABLED', '1') == '1':
+            captioner.start()
+        
+        # Window summaries: keyframes -> captions -> cached per-bucket partials -> summary.
+        # Their orchestration waits on analysis jobs, so it runs on its own small pool
+        summary_executor = AnalysisExecutor(event_bus=event_bus, max_workers=2)
+        summarizer = Summarizer(
+            catalog,
+            captioner,
+            glasses_system.summarize_text,
+            analysis_queue,
+            analysis_cache,
+            model_name=model.model_name if model else None,
+            max_frames=int(os.getenv('SUMMARY_MAX_FRAMES', '48')),
+            bucket_seconds=float(os.getenv('SUMMARY_BUCKET_MINUTES', '10')) * 60,
+            deadline=float(os.getenv('SUMMARY_DEADLINE', '120'))
+        )
+        
+        _services_started = True
+
+def shutdown_services(timeout=30.0):
+    """Stop capturing, let queued analyses finish, then close the stores"""
+    global _services_started
+    with _services_lock:
+        if not _services_started:
+            return
+        _services_started = False
+        print("🛑 Stopping cameras and captioner...")
+        captioner.stop()
+        capture_store.stop()
+        camera_manager.shutdown()
+        disk_writer.close()
+        running = sum(depth['running'] for depth in analysis_queue.stats()['depth'].values())
+        if running:
+            print(f"⏳ Waiting for {running} running model calls (up to {timeout:.0f}s); queued jobs stay on disk...")
+        summary_executor.shutdown(wait=False)
+        drain = threading.Thread(target=analysis_queue.shutdown, kwargs={'wait': True}, daemon=True)
+        drain.start()
+        drain.join(timeout)
+        derivatives.shutdown()
+        search_index.flush()
+        catalog.close()
+        print("✅ Services stopped")
+
+def create_app():
+    """Application factory for WSGI servers: initializes services once and returns the app"""
+    init_services()
+    return app
 
-# Global system instance
-glasses_system = SmartGlassesSystem()
+@app.before_request
+def start_request_timer():
+    g.request_started = g.profile_started = time.perf_counter()
+    g.profile = profiler.start()
+
+@app.after_request
+def record_request_time(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        seconds = time.perf_counter() - started
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        HTTP_SECONDS.observe(seconds, route=route, method=request.method, status=response.status_code)
+    return response
+
+@app.teardown_request
+def finish_request_profile(exc):
+    # Runs even when the view raised, so the profiler is always released
+    profile = g.pop('profile', None)
+    if profile is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        profiler.finish(profile, f"{request.method} {route}", time.perf_counter() - g.get('profile_started', 0))
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus text exposition of all counters and histograms"""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/debug/profile', methods=['GET', 'POST'])
+def debug_profile():
+    """Switch per-request profiling on/off ({enabled, sample_rate}) or read recent profiles"""
+    if not PROFILING_ALLOWED:
+        return jsonify({'error': 'Profiling disabled; set PROFILING_ALLOWED=1'}), 403
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        profiler.configure(data.get('enabled', True), data.get('sample_rate'))
+    return jsonify(profiler.stats())
 
 @app.route('/')
 def index():
@@ -137,30 +490,324 @@ def index():
 
 @app.route('/api/images')
 def get_images():
-    """Get recent images"""
-    images = glasses_system.get_recent_images()
-    return jsonify(images)
+    """One page of captures, newest first.
+
+    ?before=<id> / ?after=<id> page older / newer from a capture, ?start=&end=
+    and ?camera= filter, and ?since=<cursor> returns only captures added
+    after an earlier response's cursor. Unchanged pages answer 304.
+    """
+    limit = min(request.args.get('limit', 20, type=int), 200)
+    camera_id = request.args.get('camera')
+    try:
+        start = parse_time(request.args.get('start'))
+        end = parse_time(request.args.get('end'))
+    except ValueError:
+        return jsonify({'error': 'start/end must be a unix timestamp or ISO date'}), 400
+    
+    # Read before the page so a capture landing in between shows up in the next delta
+    with CATALOG_QUERY_SECONDS.time(query="last_id"):
+        cursor = catalog.last_id()
+    since = request.args.get('since', type=int)
+    if since is not None:
+        with CATALOG_QUERY_SECONDS.time(query="since"):
+            added = catalog.added_since(since, limit + 1, camera=camera_id, start=start, end=end)
+        more = len(added) > limit
+        added = added[:limit]
+        page = {
+            'images': added[::-1],
+            # With more pending, resume from the last one returned rather than the end
+            'cursor': added[-1]['id'] if more else max(cursor, since),
+            'more': more
+        }
+    else:
+        before_id = request.args.get('before', type=int)
+        after_id = request.args.get('after', type=int)
+        # One extra row says whether another page exists beyond this one
+        images = glasses_system.get_recent_images(limit + 1, before_id=before_id, camera=camera_id,
+                                                  after_id=after_id, start=start, end=end)
+        newer = after_id is not None and before_id is None
+        more = len(images) > limit
+        if more:
+            # Newer pages are read upwards, so the extra row is the newest one
+            images = images[1:] if newer else images[:limit]
+        page = {
+            'images': images,
+            # Cursors for the neighbouring pages; None once there is nothing further
+            'before': images[-1]['id'] if images and ((more and not newer) or after_id is not None) else None,
+            'after': images[0]['id'] if images and (before_id is not None or (more and newer)) else None
+        }
+        if before_id is None and after_id is None:
+            # Only the head page carries the delta cursor, so older pages stay cacheable
+            page['cursor'] = cursor
+    
+    response = jsonify(page)
+    response.cache_control.no_cache = True
+    response.add_etag()
+    return response.make_conditional(request)
 
-@app.route('/api/image/<filename>')
+# Captures never change once written, so clients may cache them for a day
+IMAGE_MAX_AGE = 24 * 3600
+
+@app.route('/api/image/<path:filename>')
 def serve_image(filename):
-    """Serve image file"""
-    image_path = glasses_system.captures_dir / filename
-    if image_path.exists():
-        return send_file(image_path)
-    return "Image not found", 404
+    """Serve image file, optionally a smaller variant (?size=thumb|medium|model)"""
+    safe_path = safe_join(str(glasses_system.captures_dir), filename)
+    if safe_path is None or not capture_store.exists(filename):
+        return "Image not found", 404
+    
+    size = request.args.get('size')
+    if size:
+        if size not in VARIANTS:
+            return jsonify({'error': f'Unknown size: {size}'}), 400
+        try:
+            safe_path = derivatives.get(filename, size)
+        except Exception as e:
+            return jsonify({'error': f'Failed to resize image: {str(e)}'}), 500
+    elif not os.path.isfile(safe_path):
+        # Compacted into a pack: slice it out of the mapped pack file
+        response = Response(capture_store.read_packed(filename), mimetype='image/jpeg')
+        response.set_etag(hashlib.sha1(filename.encode()).hexdigest())
+        response.cache_control.public = True
+        response.cache_control.max_age = IMAGE_MAX_AGE
+        return response.make_conditional(request)
+    
+    return send_file(os.path.abspath(safe_path), mimetype='image/jpeg', etag=True, conditional=True,
+                     max_age=IMAGE_MAX_AGE)
+
+@app.route('/api/storage')
+def storage_stats():
+    """Capture storage usage, retention settings, compaction and disk writer counters"""
+    return jsonify({**capture_store.stats(), 'writer': disk_writer.stats()})
+
+@app.route('/api/storage/maintain', methods=['POST'])
+def run_storage_maintenance():
+    """Run retention and compaction now instead of waiting for the next pass"""
+    return jsonify(capture_store.maintain())
 
-@app.route('/api/analyze/<filename>', methods=['POST'])
+@app.route('/api/analyze/<path:filename>', methods=['POST'])
 def analyze_image(filename):
-    """Analyze specific image"""
-    image_path = glasses_system.captures_dir / filename
-    if not image_path.exists():
+    """Queue analysis of a specific image; returns a job to poll or stream"""
+    if not model:
+        return jsonify({'error': 'Gemini API not configured'}), 503
+    safe_path = safe_join(str(glasses_system.captures_dir), filename)
+    if safe_path is None or not capture_store.exists(filename):
         return jsonify({'error': 'Image not found'}), 404
     
-    data = request.get_json()
+    data = request.get_json(silent=True)
     user_question = data.get('question') if data else None
     
-    analysis = glasses_system.analyze_image_with_gemini(image_path, user_question)
-    return jsonify({'analysis': analysis})
+    prompt = glasses_system.build_analysis_prompt(user_question)
+    key = analysis_key(capture_store.read(filename), prompt)
+    job = analysis_queue.enqueue('analysis', {'filename': filename, 'question': user_question}, key=key)
+    return jsonify({'job_id': job.id, 'status': job.status}), 202
+
+def stream_text(chunks, fallback=None):
+    """SSE response for streamed model output: chunk events, then done (or error).
+
+    If the model fails before the first chunk, fallback() queues the request
+    as a durable job instead and a queued event names the job to follow.
+    """
+    def events():
+        start = time.perf_counter()
+        first = None
+        text = []
+        try:
+            for chunk in chunks:
+                if first is None:
+                    first = time.perf_counter() - start
+                text.append(chunk)
+                yield f"event: chunk\ndata: {json.dumps({'text': chunk})}\n\n"
+        except Exception as e:
+            if fallback and not text:
+                job = fallback()
+                yield f"event: queued\ndata: {json.dumps({'job_id': job.id, 'status': job.status, 'error': str(e)})}\n\n"
+            else:
+                yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+            return
+        yield "event: done\ndata: " + json.dumps({
+            'response': "".join(text),
+            'ttft_ms': round(first * 1000, 1) if first is not None else None,
+            'total_ms': round((time.perf_counter() - start) * 1000, 1)
+        }) + "\n\n"
+    
+    return Response(events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/analyze/<path:filename>/stream', methods=['POST'])
+def analyze_image_stream(filename):
+    """Analyze an image, streaming the answer as server-sent events"""
+    if not model:
+        return jsonify({'error': 'Gemini API not configured'}), 503
+    safe_path = safe_join(str(glasses_system.captures_dir), filename)
+    if safe_path is None or not capture_store.exists(filename):
+        return jsonify({'error': 'Image not found'}), 404
+    
+    data = request.get_json(silent=True)
+    question = data.get('question') if data else None
+    prompt = glasses_system.build_analysis_prompt(question)
+    key = analysis_key(capture_store.read(filename), prompt)
+    return stream_text(glasses_system.stream_for_image(Path(safe_path), prompt),
+                       fallback=lambda: analysis_queue.enqueue(
+                           'analysis', {'filename': filename, 'question': question}, key=key))
+
+@app.route('/api/summarize', methods=['POST'])
+def summarize_window():
+    """Queue a summary of a time window ({"minutes": 60} or {"start", "end"}, optional "camera")"""
+    if not model:
+        return jsonify({'error': 'Gemini API not configured'}), 503
+    data = request.get_json(silent=True) or {}
+    try:
+        end = parse_time(data.get('end'))
+        if end is None:
+            # "Up to now" is rounded up to the minute, so repeated requests for
+            # "the last hour" within that minute get the same key and join the
+            # job if it is still running
+            end = math.ceil(time.time() / SUMMARY_WINDOW_STEP) * SUMMARY_WINDOW_STEP
+        start = parse_time(data.get('start')) or end - float(data.get('minutes', 60)) * 60
+    except (TypeError, ValueError):
+        return jsonify({'error': 'start/end must be a unix timestamp or ISO date'}), 400
+    if start >= end:
+        return jsonify({'error': 'start must be before end'}), 400
+    camera_id = data.get('camera')
+    start, end = int(start), int(end)
+    job = summary_executor.submit(f"summarize:{camera_id}:{start}:{end}", summarizer.summarize,
+                                  start, end, camera=camera_id, kind="summary")
+    return jsonify({'job_id': job.id, 'status': job.status}), 202
+
+def find_job(job_id):
+    """A job by id; chat jobs only for the browser session that sent the message"""
+    job = analysis_queue.get(job_id) or summary_executor.get(job_id)
+    if job is not None and job.kind == 'chat':
+        payload = getattr(job, 'payload', None) or {}
+        if payload.get('session_id') != request.cookies.get(CHAT_COOKIE):
+            return None
+    return job
+
+@app.route('/api/queue')
+def queue_status():
+    """Model job queue: depth per kind, backend health (ok / degraded) and retry counters"""
+    return jsonify(analysis_queue.stats())
+
+@app.route('/api/queue/jobs')
+def queue_jobs():
+    """Pending jobs in dispatch order, then recently finished ones (?status=&kind=&limit=)"""
+    limit = min(request.args.get('limit', 50, type=int), 500)
+    return jsonify({'jobs': analysis_queue.jobs(request.args.get('status'), request.args.get('kind'), limit)})
+
+@app.route('/api/queue/retry', methods=['POST'])
+def queue_retry():
+    """Retry every waiting job now instead of after its backoff"""
+    return jsonify({'rescheduled': analysis_queue.retry_now(), **analysis_queue.stats()})
+
+@app.route('/api/jobs/<job_id>')
+def get_job(job_id):
+    """Poll an analysis or summary job"""
+    job = find_job(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/api/jobs/<job_id>/stream')
+def stream_job(job_id):
+    """Server-sent events for a job: status updates, then the final result"""
+    job = find_job(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    def events():
+        yield f"event: status\ndata: {json.dumps(job.to_dict())}\n\n"
+        while not job.wait(timeout=15.0):
+            yield ": keepalive\n\n"
+        yield f"event: done\ndata: {json.dumps(job.to_dict())}\n\n"
+    
+    return Response(events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/events')
+def events():
+    """Server-sent event stream of new captures, camera state and finished analyses"""
+    last_id = request.headers.get('Last-Event-ID', type=int)
+    sub = event_bus.subscribe()
+    
+    def stream():
+        try:
+            yield "retry: 3000\n\n"
+            if last_id is not None:
+                missed = event_bus.since(last_id)
+                if missed is None:
+                    # Too far behind to replay; tell the client to refetch
+                    yield "event: resync\ndata: {}\n\n"
+                else:
+                    for event in missed:
+                        yield format_sse(event)
+            while True:
+                event = sub.get(timeout=15.0)
+                if sub.overflowed:
+                    sub.overflowed = False
+                    yield "event: resync\ndata: {}\n\n"
+                if event is None:
+                    yield ": keepalive\n\n"
+                else:
+                    yield format_sse(event)
+        finally:
+            sub.close()
+    
+    return Response(stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/cache/stats')
+def cache_stats():
+    """Analysis cache and executor statistics"""
+    return jsonify({
+        'cache': analysis_cache.stats(),
+        'queue': analysis_queue.stats(),
+        'streaming': stream_stats.stats(),
+        'summaries': {**summarizer.stats(), 'executor': summary_executor.stats()}
+    })
+
+def parse_time(value):
+    """Unix timestamp or ISO date/time from a query string, or None"""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+@app.route('/api/search')
+def search_captures():
+    """Semantic search over capture descriptions (?q=&k=&start=&end=)"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'No query provided'}), 400
+    k = min(request.args.get('k', 10, type=int), 100)
+    try:
+        start = parse_time(request.args.get('start'))
+        end = parse_time(request.args.get('end'))
+    except ValueError:
+        return jsonify({'error': 'start/end must be a unix timestamp or ISO date'}), 400
+    
+    t0 = time.perf_counter()
+    hits = search_index.search(query, k=k, start=start, end=end)
+    scores = dict(hits)
+    results = catalog.get_many([capture_id for capture_id, _ in hits])
+    for image in results:
+        image['score'] = round(scores[image['id']], 4)
+    return jsonify({
+        'query': query,
+        'results': results,
+        'took_ms': round((time.perf_counter() - t0) * 1000, 2),
+        'index': search_index.stats()
+    })
+
+CHAT_COOKIE = 'chat_session'
+
+def chat_session():
+    """Chat session id from the cookie, or a new one (second value True if new)"""
+    session_id = request.cookies.get(CHAT_COOKIE, '')
+    if SESSION_ID.match(session_id):
+        return session_id, False
+    return uuid.uuid4().hex, True
 
 @app.route('/api/chat', methods=['POST'])
 def chat():
@@ -171,58 +818,173 @@ def chat():
     if not user_message:
         return jsonify({'error': 'No message provided'}), 400
     
-    response = glasses_system.chat_with_context(user_message)
-    return jsonify({'response': response})
+    if not model:
+        return jsonify({'error': 'Gemini API not configured'}), 503
+    
+    # Queued durably: if the model is unreachable the answer arrives later
+    # through /api/jobs/<job_id> (and lands in the chat history)
+    session_id, is_new = chat_session()
+    job = analysis_queue.enqueue('chat', {'message': user_message, 'session_id': session_id})
+    job.wait(CHAT_WAIT_SECONDS)
+    if job.status == 'done':
+        result, status = jsonify({'response': job.result}), 200
+    elif job.status == 'error':
+        result, status = jsonify({'error': f'Error in chat: {job.error}'}), 502
+    else:
+        result, status = jsonify({'job_id': job.id, 'status': job.status, 'error': job.error}), 202
+    if is_new:
+        result.set_cookie(CHAT_COOKIE, session_id, max_age=365 * 24 * 3600, httponly=True, samesite='Lax')
+    return result, status
+
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """Chat, streaming the answer as server-sent events"""
+    if not model:
+        return jsonify({'error': 'Gemini API not configured'}), 503
+    data = request.get_json(silent=True) or {}
+    user_message = data.get('message', '')
+    if not user_message:
+        return jsonify({'error': 'No message provided'}), 400
+    
+    session_id, is_new = chat_session()
+    response = stream_text(glasses_system.stream_chat(user_message, session_id),
+                           fallback=lambda: analysis_queue.enqueue(
+                               'chat', {'message': user_message, 'session_id': session_id}))
+    if is_new:
+        response.set_cookie(CHAT_COOKIE, session_id, max_age=365 * 24 * 3600, httponly=True, samesite='Lax')
+    return response
 
 @app.route('/api/chat/history')
 def chat_history():
-    """Get chat history"""
-    return jsonify(glasses_system.chat_history)
+    """Get one page of this browser's chat history (?limit=&before=)"""
+    session_id, is_new = chat_session()
+    if is_new:
+        return jsonify({'turns': [], 'before': None})
+    limit = min(request.args.get('limit', 20, type=int), 100)
+    return jsonify(chat_store.history(session_id, limit=limit,
+                                      before=request.args.get('before', type=int)))
 
-@app.route('/api/camera/start', methods=['POST'])
-def start_camera():
-    """Start camera capture"""
-    global camera_running
-    
-    if camera_running:
+def start_options(data):
+    """Translate a start request body into CameraManager.start arguments"""
+    if data.get('mode') == 'stream':
+        return 'stream', {
+            'target_fps': data.get('fps'),
+            'queue_size': int(data.get('queue_size', 8)),
+            'policy': data.get('policy', 'drop_oldest')
+        }
+    if data.get('mode') == 'interval' or 'interval' in data:
+        return 'interval', {'interval': float(data.get('interval', 10.0))}
+    # Default: follow the scene, tuned through /api/cameras/<id>/schedule
+    return 'interval', {'adaptive': True}
+
+@app.route('/api/cameras')
+def list_cameras():
+    """Status of every registered camera"""
+    return jsonify(camera_manager.statuses())
+
+@app.route('/api/cameras/discover', methods=['POST'])
+def discover_cameras():
+    """Scan serial ports and register newly attached cameras"""
+    added = camera_manager.discover()
+    return jsonify({'added': added, 'ports': discover_ports(), 'cameras': camera_manager.statuses()})
+
+@app.route('/api/cameras/<camera_id>/start', methods=['POST'])
+def start_camera_by_id(camera_id):
+    """Start capture on one camera"""
+    if not camera_manager.get(camera_id):
+        return jsonify({'error': 'Camera not found'}), 404
+    if camera_manager.get(camera_id).running:
         return jsonify({'message': 'Camera already running'}), 200
     
+    mode, options = start_options(request.get_json(silent=True) or {})
     try:
-        camera.start_continuous_capture(interval=10.0)
-        camera_running = True
+        if not camera_manager.start(camera_id, mode, **options):
+            return jsonify({'error': 'Failed to connect to camera'}), 500
         return jsonify({'message': 'Camera started successfully'})
     except Exception as e:
         return jsonify({'error': f'Failed to start camera: {str(e)}'}), 500
 
-@app.route('/api/camera/stop', methods=['POST'])
-def stop_camera():
-    """Stop camera capture"""
-    global camera_running
-    
+@app.route('/api/cameras/<camera_id>/stop', methods=['POST'])
+def stop_camera_by_id(camera_id):
+    """Stop capture on one camera"""
+    if not camera_manager.get(camera_id):
+        return jsonify({'error': 'Camera not found'}), 404
     try:
-        camera.stop_continuous_capture()
-        camera_running = False
+        camera_manager.stop(camera_id)
         return jsonify({'message': 'Camera stopped successfully'})
     except Exception as e:
         return jsonify({'error': f'Failed to stop camera: {str(e)}'}), 500
 
-@app.route('/api/camera/status')
-def camera_status():
-    """Get camera status"""
-    return jsonify({
-        'running': camera_running,
-        'connected': camera.ser is not None
-    })
+@app.route('/api/cameras/<camera_id>/status')
+def camera_status_by_id(camera_id):
+    """Status of one camera"""
+    if not camera_manager.get(camera_id):
+        return jsonify({'error': 'Camera not found'}), 404
+    return jsonify(camera_manager.status(camera_id))
 
-@app.route('/api/camera/capture', methods=['POST'])
-def capture_single():
-    """Capture single image"""
+@app.route('/api/cameras/<camera_id>/schedule', methods=['GET', 'POST'])
+def camera_schedule_by_id(camera_id):
+    """Get or tune one camera's adaptive schedule and budgets"""
+    cam = camera_manager.get(camera_id)
+    if not cam:
+        return jsonify({'error': 'Camera not found'}), 404
+    if cam.scheduler is None:
+        return jsonify({'error': 'Camera has no adaptive schedule'}), 404
+    if request.method == 'POST':
+        try:
+            cam.scheduler.configure(**(request.get_json(silent=True) or {}))
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': str(e)}), 400
+    return jsonify(cam.scheduler.stats())
+
+@app.route('/api/cameras/<camera_id>/settings', methods=['GET', 'POST'])
+def camera_settings_by_id(camera_id):
+    """Get or change one camera's firmware settings (profile, framesize, quality, baud)"""
+    cam = camera_manager.get(camera_id)
+    if not cam:
+        return jsonify({'error': 'Camera not found'}), 404
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        unknown = set(data) - {'profile', 'framesize', 'quality', 'baud'}
+        if unknown:
+            return jsonify({'error': f"Unknown settings: {', '.join(sorted(unknown))}"}), 400
+        try:
+            if not cam.ser and not cam.connect():
+                return jsonify({'error': 'Failed to connect to camera'}), 500
+            if data.get('profile'):
+                cam.use_profile(data['profile'])
+                cam.capture_profile = data['profile']
+            if data.get('framesize') is not None or data.get('quality') is not None:
+                cam.configure(data.get('framesize'), data.get('quality'))
+            if data.get('baud'):
+                cam.set_baud(int(data['baud']))
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': str(e)}), 400
+        except (RuntimeError, TimeoutError) as e:
+            return jsonify({'error': str(e)}), 409
+    status = cam.firmware_status()
+    status['capture_profile'] = cam.capture_profile
+    status['detect_profile'] = cam.detect_profile
+    status['profiles'] = PROFILES
+    return jsonify(status)
+
+@app.route('/api/cameras/<camera_id>/capture', methods=['POST'])
+def capture_single_by_id(camera_id):
+    """Capture single image from one camera"""
+    cam = camera_manager.get(camera_id)
+    if not cam:
+        return jsonify({'error': 'Camera not found'}), 404
     try:
-        if not camera.ser:
-            if not camera.connect():
+        if not cam.ser:
+            if not cam.connect():
                 return jsonify({'error': 'Failed to connect to camera'}), 500
         
-        image_path = camera.capture_single_image()
+        profile = (request.get_json(silent=True) or {}).get('profile')
+        if profile and profile not in PROFILES:
+            return jsonify({'error': f'Unknown profile: {profile}'}), 400
+        image_path = cam.capture_single_image(profile)
+        # The client expects to open the capture straight away
+        disk_writer.flush(5.0)
         if image_path:
             return jsonify({'message': 'Image captured', 'path': image_path})
         else:
@@ -230,18 +992,56 @@ def capture_single():
     except Exception as e:
         return jsonify({'error': f'Capture error: {str(e)}'}), 500
 
+# Single-camera routes used by the dashboard act on the default camera
+@app.route('/api/camera/start', methods=['POST'])
+def start_camera():
+    """Start camera capture"""
+    return start_camera_by_id(DEFAULT_CAMERA)
+
+@app.route('/api/camera/stop', methods=['POST'])
+def stop_camera():
+    """Stop camera capture"""
+    return stop_camera_by_id(DEFAULT_CAMERA)
+
+@app.route('/api/camera/schedule', methods=['GET', 'POST'])
+def camera_schedule():
+    """Get or tune the default camera's adaptive schedule"""
+    return camera_schedule_by_id(DEFAULT_CAMERA)
+
+@app.route('/api/camera/settings', methods=['GET', 'POST'])
+def camera_settings():
+    """Get or change the default camera's firmware settings"""
+    return camera_settings_by_id(DEFAULT_CAMERA)
+
+@app.route('/api/camera/status')
+def camera_status():
+    """Get camera status"""
+    return camera_status_by_id(DEFAULT_CAMERA)
+
+@app.route('/api/camera/capture', methods=['POST'])
+def capture_single():
+    """Capture single image"""
+    return capture_single_by_id(DEFAULT_CAMERA)
+
 if __name__ == '__main__':
-    print("🚀 Starting Smart Glasses Web Server...")
-    print("📱 Access your smart glasses interface at: http://localhost:5000")
+    # Development server; see serve.py for production serving
+    port = int(os.getenv('PORT', '5000'))
+    print("🚀 Starting Smart Glasses Web Server (development mode)...")
+    print(f"📱 Access your smart glasses interface at: http://localhost:{port}")
     print("🔍 Make sure your .env file contains: GEMINI_API_KEY=your_api_key")
     print("📸 Connect your ESP32 camera and use the web interface to start capturing")
+    print("💡 For production use: python serve.py")
     print("\nPress Ctrl+C to stop the server")
     
+    create_app()
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
     try:
-        app.run(host='0.0.0.0', port=5000, debug=True, threaded=True)
-    except KeyboardInterrupt:
+        # No reloader: it would import this module a second time and open the cameras twice
+        app.run(host='0.0.0.0', port=port, debug=os.getenv('FLASK_DEBUG', '0') == '1',
+                use_reloader=False, threaded=True)
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
         print("\n🛑 Shutting down server...")
-        if camera_running:
-            camera.stop_continuous_capture()
-        camera.disconnect()
+        shutdown_services()
         print("✅ Server stopped")
@@ -4,148 +4,707 @@ Smart Glasses Camera Module
 Handles continuous image capture from ESP32 camera for smart glasses system.
 """
 
+import re
 import time
 import serial
-import struct
 import pathlib
 import threading
-from datetime import datetime
+from frame_parser import FrameDecoder
+from frame_queue import FrameQueue, DROP_OLDEST
+from frame_dedup import REFERENCE, to_signed
+from capture_store import new_capture_path
+from capture_scheduler import AdaptiveScheduler
+from link_health import LinkHealth, Backoff
+from metrics import REGISTRY, SIZE_BUCKETS
+
+SERIAL_SYNC_WAIT = REGISTRY.histogram(
+    "serial_sync_wait_seconds", "Time from trigger until a frame header arrives", ("camera",))
+SERIAL_FRAME_SECONDS = REGISTRY.histogram(
+    "serial_frame_seconds", "Time from trigger until a complete frame is decoded", ("camera",))
+SERIAL_FRAME_BYTES = REGISTRY.histogram(
+    "serial_frame_bytes", "Size of decoded JPEG frames", ("camera",), buckets=SIZE_BUCKETS)
+SERIAL_BYTES = REGISTRY.counter(
+    "serial_bytes_total", "Bytes read from the serial link (rate() gives bytes/sec)", ("camera",))
+SERIAL_TIMEOUTS = REGISTRY.counter(
+    "serial_timeouts_total", "Triggers that produced no frame in time", ("camera",))
+SERIAL_ERRORS = REGISTRY.counter(
+    "serial_errors_total", "Serial I/O errors", ("camera",))
+DISK_WRITE_SECONDS = REGISTRY.histogram(
+    "capture_write_seconds", "Time to write a capture to disk", ("camera",))
+
+# Frame sizes understood by protocol 2 firmware, smallest first
+FRAME_SIZES = ("QQVGA", "QVGA", "CIF", "VGA", "SVGA", "XGA", "HD", "SXGA", "UXGA")
+
+# Largest JPEG the firmware can send: the camera driver's frame buffer holds
+# width * height / 5 bytes, allocated for UXGA (1600x1200)
+MAX_FRAME_BYTES = 1600 * 1200 // 5
+
+# Host-side capture profiles: small frames for change detection, full frames on demand
+PROFILES = {
+    'fast': {'framesize': 'QVGA', 'quality': 30},
+    'full': {'framesize': 'SVGA', 'quality': 12},
+    'max': {'framesize': 'UXGA', 'quality': 10}
+}
+
+def parse_reply(text):
+    """key=value pairs of a protocol reply line"""
+    return dict(pair.split("=", 1) for pair in text.split() if "=" in pair)
 
 class ESP32Camera:
-    def __init__(self, port="/dev/cu.usbmodem2101", baud=115200, timeout=1.0):
+    def __init__(self, port="/dev/cu.usbmodem2101", baud=115200, timeout=1.0, catalog=None,
+                 deduplicator=None, event_bus=None, camera_id="default", captures_dir="captures",
+                 ready_timeout=5.0, frame_timeout=20.0, max_failures=3, disk_writer=None,
+                 scheduler=None, target_baud=None, detect_profile="fast", capture_profile="full",
+                 heartbeat_interval=5.0):
         self.port = port
+        self.camera_id = camera_id
         self.baud = baud
+        # Firmware boots at boot_baud; protocol 2 firmware is then switched to target_baud
+        self.boot_baud = baud
+        self.target_baud = target_baud
         self.timeout = timeout
         self.ser = None
         self.running = False
         self.capture_thread = None
-        self.captures_dir = pathlib.Path("captures")
-        self.captures_dir.mkdir(exist_ok=True)
+        self.captures_dir = pathlib.Path(captures_dir)
+        self.captures_dir.mkdir(parents=True, exist_ok=True)
+        self.catalog = catalog
+        self.deduplicator = deduplicator
+        self.event_bus = event_bus
+        # Optional shared DiskWriter; without one frames are written inline
+        self.disk_writer = disk_writer
+        # Scene-change scheduler for adaptive capture; sees every frame from this camera
+        self.scheduler = scheduler
+        self.adaptive = False
+        # Negotiated with the firmware on connect; version 1 firmware has no commands
+        self.protocol = None
+        self.firmware = {}
+        self.settings = {}
+        self.profile = None
+        self.detect_profile = detect_profile
+        self.capture_profile = capture_profile
+        self._last_saved = 0.0
+        # Serializes trigger/response exchanges between the capture loop and API calls
+        self._io_lock = threading.RLock()
+        # Room for a full UXGA frame plus the tail of a truncated one before it
+        self.decoder = FrameDecoder(capacity=2 * MAX_FRAME_BYTES, max_frame_size=MAX_FRAME_BYTES)
+        self.frame_queue = None
+        self.writer_thread = None
+        self.frame_listeners = []
+        self.stream_stats = {'frames': 0, 'timeouts': 0}
+        # Connection supervision
+        self.ready_timeout = ready_timeout
+        self.frame_timeout = frame_timeout
+        self.max_failures = max_failures
+        # Seconds of silence before an idle capture loop probes the firmware with '?'
+        self.heartbeat_interval = heartbeat_interval
+        self.health = LinkHealth()
+        self.backoff = Backoff()
+        self._stop_event = threading.Event()
         
-    def connect(self):
-        """Establish connection to ESP32 camera"""
+    def connect(self, reconnect=False):
+        """Establish connection to ESP32 camera.
+
+        Returns as soon as the firmware reports "Ready" instead of sleeping
+        through a fixed boot delay. Protocol 2 firmware is then asked for its
+        settings, switched to target_baud and given back the last profile.
+        """
+        t0 = time.time()
         try:
             print(f"🔌 Connecting to ESP32 on {self.port}...")
+            if self.ser:
+                self.ser.close()
             self.ser = serial.Serial(self.port, self.baud, timeout=self.timeout)
+            self.decoder.reset()
             
-            # Give ESP32 time to reboot after opening port
-            time.sleep(2.0)
-            self.ser.reset_input_buffer()
+            print("📡 Waiting for ESP32 ready handshake...")
+            if not self._wait_for_ready(t0 + self.ready_timeout):
+                if self.baud == self.boot_baud:
+                    raise TimeoutError(f"no ready message within {self.ready_timeout}s")
+                # The board reset and is back at its boot rate
+                print(f"⚠️  No answer at {self.baud} baud, retrying at {self.boot_baud}")
+                self.baud = self.ser.baudrate = self.boot_baud
+                if not self._wait_for_ready(time.time() + self.ready_timeout):
+                    raise TimeoutError(f"no ready message within {self.ready_timeout}s")
             
-            # Read any boot/ready messages
-            print("📡 Reading ESP32 boot messages...")
-            t0 = time.time()
-            while time.time() - t0 < 5.0:
-                line = self.ser.readline()
-                if not line:
-                    break
-                try:
-                    message = line.decode(errors="ignore").strip()
-                    if message:
-                        print(f"ESP32: {message}")
-                except:
-                    pass
+            if self.protocol >= 2:
+                self._negotiate()
             
-            print("✅ ESP32 camera connected successfully")
+            elapsed = time.time() - t0
+            self.health.link_up(elapsed, reconnect=reconnect)
+            self.backoff.reset()
+            print(f"✅ ESP32 camera connected successfully ({elapsed:.2f}s, protocol {self.protocol})")
+            self._publish_state()
             return True
             
         except Exception as e:
             print(f"❌ Failed to connect to ESP32: {e}")
+            self.health.connect_failed(str(e))
+            if self.ser:
+                try:
+                    self.ser.close()
+                except Exception:
+                    pass
+                self.ser = None
+            return False
+    
+    def _negotiate(self):
+        """Read the firmware's settings, raise the baud rate and restore the active profile"""
+        self.hello()
+        if self.target_baud and self.target_baud != self.baud:
+            try:
+                self.set_baud(self.target_baud)
+            except Exception as e:
+                print(f"⚠️  Staying at {self.baud} baud: {e}")
+        if self.profile:
+            self.use_profile(self.profile, force=True)
+    
+    def _wait_for_ready(self, deadline):
+        """Read boot output until the firmware says it is ready.
+
+        A board that just reset prints "Ready" on its own. One that was already
+        running prints nothing, so after a short quiet period we probe with '?'
+        (answered with "Ready"); older firmware treats the probe as a capture
+        trigger, which ends in "Done" and counts as ready too.
+        """
+        probes = [time.time() + 0.3, time.time() + 2.5]
+        self.ser.timeout = 0.1
+        try:
+            while time.time() < deadline:
+                if probes and time.time() >= probes[0]:
+                    probes.pop(0)
+                    self.ser.write(b"?")
+                line = self.ser.readline()
+                if not line:
+                    continue
+                message = line.decode(errors="ignore").strip()
+                if "Ready" in message or message.endswith("Done"):
+                    version = re.search(r"proto=(\d+)", message)
+                    self.protocol = int(version.group(1)) if version else 1
+                    self.ser.reset_input_buffer()
+                    return True
+                if message and message.isprintable():
+                    print(f"ESP32: {message}")
+            return False
+        finally:
+            self.ser.timeout = self.timeout
+    
+    def command(self, line, timeout=2.0):
+        """Send one protocol 2 command ("!LINE\\n") and return the key=value pairs of its OK reply"""
+        if not self.ser:
+            raise RuntimeError("Camera not connected")
+        if (self.protocol or 1) < 2:
+            raise RuntimeError("Firmware does not support commands (protocol 1)")
+        if self.writer_thread is not None and threading.current_thread() is not self.capture_thread:
+            # Replies would interleave with streamed frames; the reader thread may still
+            # renegotiate after a reconnect
+            raise RuntimeError("Stop streaming capture before changing camera settings")
+        with self._io_lock:
+            self.decoder.reset()
+            self.ser.reset_input_buffer()
+            self.ser.write(b"!" + line.encode() + b"\n")
+            deadline = time.time() + timeout
+            while time.time() < deadline:
+                message = self.ser.readline().decode(errors="ignore").strip()
+                if message.startswith("OK"):
+                    return parse_reply(message[2:])
+                if message.startswith("ERR"):
+                    raise ValueError(message[3:].strip())
+            raise TimeoutError(f"No reply to {line.split()[0]}")
+    
+    def hello(self):
+        """Firmware version and current camera settings"""
+        reply = self.command("HELLO")
+        self.firmware = {'protocol': int(reply.get('proto', 2)), 'version': reply.get('fw')}
+        self._update_settings(reply)
+        return self.firmware_status()
+    
+    def _update_settings(self, reply):
+        for key in ('framesize', 'quality', 'baud'):
+            if key in reply:
+                self.settings[key] = reply[key] if key == 'framesize' else int(reply[key])
+    
+    def configure(self, framesize=None, quality=None):
+        """Change frame size and/or JPEG quality (4..63, lower is better)"""
+        args = []
+        if framesize is not None:
+            framesize = str(framesize).upper()
+            if framesize not in FRAME_SIZES:
+                raise ValueError(f"Unknown frame size: {framesize}")
+            args.append(f"framesize={framesize}")
+        if quality is not None:
+            args.append(f"quality={int(quality)}")
+        if not args:
+            return self.settings
+        self._update_settings(self.command("SET " + " ".join(args)))
+        # Explicit settings no longer match a named profile; keep them for saved frames
+        self.profile = None
+        self.capture_profile = None
+        return self.settings
+    
+    def use_profile(self, name, force=False):
+        """Switch to a named profile unless it is already active"""
+        if name not in PROFILES:
+            raise ValueError(f"Unknown profile: {name}")
+        if self.profile == name and not force:
+            return
+        capture_profile = self.capture_profile
+        self.configure(**PROFILES[name])
+        self.profile = name
+        self.capture_profile = capture_profile
+    
+    def set_baud(self, baud):
+        """Move the link to a new baud rate; the firmware reverts if we can't hear it there"""
+        with self._io_lock:
+            previous = self.baud
+            self.command(f"BAUD {int(baud)}")
+            self.ser.baudrate = baud
+            self.ser.reset_input_buffer()
+            self.ser.write(b"?")
+            deadline = time.time() + 1.5
+            while time.time() < deadline:
+                if "Ready" in self.ser.readline().decode(errors="ignore"):
+                    self.baud = baud
+                    self.settings['baud'] = baud
+                    print(f"⚡ Link running at {baud} baud")
+                    return True
+            # Give the firmware time to fall back before talking at the old rate again
+            self.ser.baudrate = previous
+            time.sleep(2.1)
+            self.ser.reset_input_buffer()
+            raise TimeoutError(f"Camera did not answer at {baud} baud")
+    
+    def firmware_status(self):
+        """Protocol version, firmware version and active settings"""
+        return {
+            'protocol': self.protocol,
+            'firmware': self.firmware.get('version'),
+            'settings': dict(self.settings),
+            'profile': self.profile,
+            'baud': self.baud
+        }
+    
+    def ensure_connected(self):
+        """Reopen the port with exponential backoff until it works or capture is stopped"""
+        while not self.ser and self.running:
+            delay = self.backoff.next_delay()
+            print(f"🔁 Reconnecting to {self.port} in {delay:.1f}s...")
+            if self._stop_event.wait(delay):
+                return False
+            self.connect(reconnect=True)
+        return self.ser is not None
+    
+    def _drop_link(self, reason):
+        """Close a port that stopped working so the supervisor reopens it"""
+        print(f"⚠️  Link to {self.port} lost: {reason}")
+        self.health.link_down(reason)
+        if self.ser:
+            try:
+                self.ser.close()
+            except Exception:
+                pass
+            self.ser = None
+        self._publish_state()
+    
+    def _check_health(self):
+        """Drop the link after too many consecutive timeouts/errors"""
+        if self.ser and self.health.consecutive_failures >= self.max_failures:
+            self._drop_link(f"{self.health.consecutive_failures} consecutive failures")
+    
+    def probe(self, timeout=1.0):
+        """Ask protocol 2 firmware whether it is alive ('?' is answered with "Ready").
+
+        Returns None without sending anything to older firmware, which would
+        take the probe as a capture trigger.
+        """
+        if not self.ser or (self.protocol or 1) < 2 or self.writer_thread is not None:
+            return None
+        try:
+            with self._io_lock:
+                self.decoder.reset()
+                self.ser.reset_input_buffer()
+                self.ser.write(b"?")
+                deadline = time.time() + timeout
+                while time.time() < deadline:
+                    if "Ready" in self.ser.readline().decode(errors="ignore"):
+                        self.health.heartbeat()
+                        return True
+        except (serial.SerialException, OSError) as e:
+            SERIAL_ERRORS.inc(camera=self.camera_id)
+            self.health.error(str(e))
+            self._drop_link(str(e))
             return False
+        print("⚠️  No answer to heartbeat probe")
+        self.health.timeout()
+        return False
     
-    def capture_single_image(self):
-        """Capture a single image from ESP32"""
+    def _idle_wait(self, delay):
+        """Wait between captures, probing the link whenever it has been quiet for
+        heartbeat_interval so a dead camera is noticed before the next capture"""
+        end = time.time() + delay
+        while self.running and self.ser:
+            last = self.health.last_heartbeat_at or time.time()
+            due = last + self.heartbeat_interval if self.heartbeat_interval else end
+            if self._stop_event.wait(max(0.0, min(end, due) - time.time())) or time.time() >= end:
+                return
+            if self.probe() is None:
+                # Nothing to probe with; sleep out the rest
+                self._stop_event.wait(max(0.0, end - time.time()))
+                return
+            self._check_health()
+    
+    def grab_frame(self, profile=None):
+        """Trigger one capture and return the JPEG bytes without saving them.
+
+        profile switches protocol 2 firmware to a named profile first; it is
+        ignored for older firmware.
+        """
         if not self.ser:
             print("❌ ESP32 not connected")
             return None
             
         try:
-            # Send trigger to capture
-            self.ser.write(b"x")
-            
-            # Find sync pattern 0xAA 0x55
-            buf = bytearray()
-            deadline = time.time() + 20.0
-            found = False
-            
-            while time.time() < deadline:
-                chunk = self.ser.read(1024)
-                if chunk:
-                    buf += chunk
-                    # Search for sync in buffer
-                    i = buf.find(b"\xAA\x55")
-                    if i != -1:
-                        # Ensure we have the 4-byte length after sync
-                        while len(buf) < i + 2 + 4:
-                            more = self.ser.read(1024)
-                            if more:
-                                buf += more
-                            elif time.time() >= deadline:
-                                break
-                        
-                        if len(buf) >= i + 6:
-                            length = struct.unpack("<I", buf[i+2:i+6])[0]
-                            print(f"📸 Sync found. JPEG length: {length} bytes")
-                            
-                            # Consume header
-                            buf = buf[i+6:]
-                            
-                            # Read remaining image bytes
-                            while len(buf) < length and time.time() < deadline:
-                                more = self.ser.read(length - len(buf))
-                                if more:
-                                    buf += more
-                            
-                            if len(buf) >= length:
-                                img = bytes(buf[:length])
-                                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                                filename = f"capture_{timestamp}.jpg"
-                                filepath = self.captures_dir / filename
-                                filepath.write_bytes(img)
-                                print(f"💾 Saved {filepath} (size: {len(img)} bytes)")
-                                found = True
-                                return str(filepath)
-                        break
-            
-            if not found:
+            with self._io_lock:
+                if profile and (self.protocol or 1) >= 2:
+                    self.use_profile(profile)
+                
+                # Drop anything left over from an earlier timed-out capture so we
+                # don't save a stale frame for this trigger
+                self.decoder.reset()
+                self.ser.reset_input_buffer()
+
+                # Send trigger to capture
+                started = time.perf_counter()
+                bytes_before = self.decoder.bytes_in
+                self.ser.write(b"x")
+                
+                # A capture loop gives up as soon as it is stopped; a one-off capture waits it out
+                stop = self._stop_event if self.running else None
+                img = self.decoder.read_frame(self.ser, time.time() + self.frame_timeout, stop)
+                SERIAL_BYTES.inc(self.decoder.bytes_in - bytes_before, camera=self.camera_id)
+            if img is None:
                 print("⚠️  No image received within timeout")
+                SERIAL_TIMEOUTS.inc(camera=self.camera_id)
+                self.health.timeout()
                 return None
+            
+            self._observe_frame(img, time.perf_counter() - started)
+            self.health.frame_received()
+            print(f"📸 Frame received. JPEG length: {len(img)} bytes")
+            return img
                 
+        except (serial.SerialException, OSError) as e:
+            # Unplugged or reset: the port is unusable until reopened
+            print(f"❌ Error capturing image: {e}")
+            SERIAL_ERRORS.inc(camera=self.camera_id)
+            self.health.error(str(e))
+            self._drop_link(str(e))
+            return None
+        except Exception as e:
+            print(f"❌ Error capturing image: {e}")
+            self.health.error(str(e))
+            return None
+    
+    def capture_single_image(self, profile=None):
+        """Capture a single image from ESP32 (with capture_profile unless profile is given)"""
+        img = self.grab_frame(profile or self.capture_profile)
+        if img is None:
+            return None
+        if self.scheduler:
+            self.scheduler.observe(img)
+        try:
+            path = self._save_frame(img)
         except Exception as e:
             print(f"❌ Error capturing image: {e}")
             return None
+        self._last_saved = time.time()
+        return path
+    
+    def _capture_adaptive(self):
+        """One adaptive step: with protocol 2 firmware, probe with a small frame and
+        only fetch and save a full one when the scene changed (or max_interval passed)"""
+        if (self.protocol or 1) < 2 or not self.detect_profile or not self.capture_profile:
+            # Legacy firmware or explicit settings: every frame is a full capture
+            self.capture_single_image()
+            return
+        probe = self.grab_frame(self.detect_profile)
+        if probe is None:
+            return
+        # Probes aren't stored, so only the full frame counts against the budgets
+        score = self.scheduler.observe(probe, count=False)
+        stale = time.time() - self._last_saved >= self.scheduler.max_interval
+        if score is None or score >= self.scheduler.threshold or stale:
+            img = self.grab_frame(self.capture_profile)
+            if img is not None:
+                self._save_frame(img)
+                self.scheduler.record(len(img))
+                self._last_saved = time.time()
+    
+    def _observe_frame(self, img, seconds):
+        """Record transfer metrics for one decoded frame"""
+        SERIAL_FRAME_SECONDS.observe(seconds, camera=self.camera_id)
+        SERIAL_FRAME_BYTES.observe(len(img), camera=self.camera_id)
+        if self.decoder.last_sync_wait is not None:
+            SERIAL_SYNC_WAIT.observe(self.decoder.last_sync_wait, camera=self.camera_id)
+    
+    def _save_frame(self, img):
+        """Write a decoded JPEG to the captures directory.
+
+        With a deduplicator, a frame that nearly matches a recent capture is
+        not written; the path of the matching capture is returned instead.
+        With a disk writer the file is queued and cataloged once it is in
+        place, so the returned path may not exist for a few moments.
+        """
+        phash = None
+        if self.deduplicator:
+            phash, ref = self.deduplicator.check(img)
+            if ref is not None:
+                capture_id, ref_path = ref
+                if self.deduplicator.mode == REFERENCE and self.catalog and capture_id:
+                    self.catalog.add_sighting(capture_id)
+                print(f"♻️  Duplicate of {ref_path}, not saved")
+                return ref_path
+        
+        # Unique even for several frames per second, sharded by day
+        filepath = new_capture_path(self.captures_dir)
+        if self.disk_writer:
+            # Remembered now so a burst of identical frames is still deduplicated,
+            # and forgotten again if the write fails
+            on_fail = None
+            if self.deduplicator:
+                self.deduplicator.remember(phash, (None, str(filepath)))
+                on_fail = lambda path: self.deduplicator.forget(str(path))
+            captured_at = time.time()
+            self.disk_writer.submit(filepath, img,
+                                    lambda path: self._commit_frame(path, img, phash, captured_at),
+                                    on_fail)
+            return str(filepath)
+        with DISK_WRITE_SECONDS.time(camera=self.camera_id):
+            filepath.write_bytes(img)
+        return self._commit_frame(filepath, img, phash, time.time(), remember=True)
+    
+    def _commit_frame(self, filepath, img, phash, captured_at, remember=False):
+        """Catalog a frame that is on disk and notify listeners"""
+        capture_id = None
+        if self.catalog:
+            capture_id = self.catalog.add(filepath, captured_at=captured_at, size=len(img),
+                                          phash=to_signed(phash) if phash is not None else None,
+                                          camera=self.camera_id)
+        if self.deduplicator:
+            if remember:
+                self.deduplicator.remember(phash, (capture_id, str(filepath)))
+            elif capture_id:
+                self.deduplicator.resolve(str(filepath), capture_id)
+        print(f"💾 Saved {filepath} (size: {len(img)} bytes)")
+        for listener in self.frame_listeners:
+            try:
+                listener(str(filepath), img)
+            except Exception as e:
+                print(f"❌ Frame listener error: {e}")
+        if self.event_bus:
+            image = self.catalog.get_by_id(capture_id) if capture_id else None
+            self.event_bus.publish('capture', image or {
+                'filename': filepath.name, 'size': len(img), 'camera': self.camera_id
+            })
+        return str(filepath)
     
-    def start_continuous_capture(self, interval=10.0):
-        """Start continuous image capture in background thread for smart glasses"""
+    def start_continuous_capture(self, interval=10.0, adaptive=False):
+        """Start continuous image capture in background thread for smart glasses.
+
+        With adaptive=True the scheduler picks the delay after each frame
+        (fast while the scene changes, slow while it is static) and interval
+        is ignored.
+        """
         if self.running:
             print("⚠️  Continuous capture already running")
             return
-            
-        if not self.connect():
+        if self._capture_threads_alive():
+            print("⚠️  Previous capture is still stopping")
             return
             
+        if not self.ser and not self.connect():
+            return
+        
+        if adaptive and self.scheduler is None:
+            self.scheduler = AdaptiveScheduler()
+        self.adaptive = adaptive
         self.running = True
+        self._stop_event.clear()
         self.capture_thread = threading.Thread(target=self._capture_loop, args=(interval,))
         self.capture_thread.daemon = True
         self.capture_thread.start()
-        print(f"🎥 Started smart glasses capture (every {interval}s)")
+        if adaptive:
+            print(f"🎥 Started adaptive capture ({self.scheduler.min_interval}-{self.scheduler.max_interval}s)")
+        else:
+            print(f"🎥 Started smart glasses capture (every {interval}s)")
+        self._publish_state()
     
     def _capture_loop(self, interval):
         """Internal capture loop"""
         while self.running:
             try:
-                self.capture_single_image()
-                time.sleep(interval)
+                if not self.ensure_connected():
+                    break
+                if self.adaptive:
+                    self._capture_adaptive()
+                else:
+                    self.capture_single_image()
+                self._check_health()
             except Exception as e:
                 print(f"❌ Error in capture loop: {e}")
-                time.sleep(interval)
+            if self.adaptive:
+                delay = self.scheduler.next_delay()
+            elif self.scheduler:
+                # Fixed pace, but the hourly budgets still apply
+                delay = max(interval, self.scheduler.budget_delay())
+            else:
+                delay = interval
+            self._idle_wait(delay)
+    
+    def start_streaming_capture(self, target_fps=None, queue_size=8, policy=DROP_OLDEST,
+                                pipeline_depth=2, frame_timeout=None):
+        """Start pipelined capture: triggers are issued back to back while frames are saved.
+
+        target_fps caps the trigger rate (None = as fast as the link allows).
+        pipeline_depth is how many triggers may be outstanding, so the ESP32
+        starts the next capture while the host is still receiving this one.
+        """
+        if self.running:
+            print("⚠️  Continuous capture already running")
+            return
+        if self._capture_threads_alive():
+            print("⚠️  Previous capture is still stopping")
+            return
+            
+        if not self.ser and not self.connect():
+            return
+            
+        self.frame_queue = FrameQueue(maxsize=queue_size, policy=policy)
+        self.stream_stats = {'frames': 0, 'timeouts': 0}
+        self.running = True
+        self._stop_event.clear()
+        self.capture_thread = threading.Thread(
+            target=self._stream_reader_loop,
+            args=(target_fps, pipeline_depth, frame_timeout or self.frame_timeout)
+        )
+        self.capture_thread.daemon = True
+        self.writer_thread = threading.Thread(target=self._stream_writer_loop)
+        self.writer_thread.daemon = True
+        self.writer_thread.start()
+        self.capture_thread.start()
+        rate = f"{target_fps} fps" if target_fps else "max rate"
+        print(f"🎥 Started streaming capture ({rate}, queue={queue_size}, policy={policy})")
+        self._publish_state()
+    
+    def _stream_reader_loop(self, target_fps, pipeline_depth, frame_timeout):
+        """Producer: keep triggers in flight and push decoded frames onto the queue"""
+        period = 1.0 / target_fps if target_fps else 0.0
+        outstanding = 0
+        next_trigger = time.time()
+        last_progress = time.time()
+        self.decoder.reset()
+        
+        while self.running:
+            try:
+                if not self.ser:
+                    if not self.ensure_connected():
+                        break
+                    outstanding = 0
+                    next_trigger = last_progress = time.time()
+                
+                now = time.time()
+                hold = 0.0
+                if self.scheduler and outstanding < pipeline_depth and now >= next_trigger:
+                    # Budget spent: no new triggers until the window frees up
+                    hold = self.scheduler.budget_delay(now)
+                    if hold and not outstanding:
+                        self._stop_event.wait(min(hold, 1.0))
+                        continue
+                while not hold and outstanding < pipeline_depth and now >= next_trigger:
+                    self.ser.write(b"x")
+                    outstanding += 1
+                    next_trigger = max(next_trigger + period, now)
+                
+                # Wake up in time for the next trigger if one is due
+                deadline = now + frame_timeout
+                if outstanding < pipeline_depth and not hold:
+                    deadline = min(deadline, next_trigger)
+                deadline = max(deadline, now + 0.01)
+                
+                bytes_before = self.decoder.bytes_in
+                img = self.decoder.read_frame(self.ser, deadline, self._stop_event)
+                SERIAL_BYTES.inc(self.decoder.bytes_in - bytes_before, camera=self.camera_id)
+                if img is not None:
+                    SERIAL_FRAME_BYTES.observe(len(img), camera=self.camera_id)
+                    outstanding = max(0, outstanding - 1)
+                    last_progress = time.time()
+                    self.stream_stats['frames'] += 1
+                    self.health.frame_received()
+                    if self.scheduler:
+                        self.scheduler.record(len(img))
+                    self.frame_queue.put(img)
+                elif outstanding and time.time() - last_progress >= frame_timeout:
+                    # Triggers were lost (e.g. firmware reset); start over
+                    print("⚠️  No frame received within timeout")
+                    SERIAL_TIMEOUTS.inc(camera=self.camera_id)
+                    self.stream_stats['timeouts'] += 1
+                    self.health.timeout()
+                    outstanding = 0
+                    last_progress = time.time()
+                    self._check_health()
+            except (serial.SerialException, OSError) as e:
+                SERIAL_ERRORS.inc(camera=self.camera_id)
+                self.health.error(str(e))
+                self._drop_link(str(e))
+            except Exception as e:
+                print(f"❌ Error in streaming reader: {e}")
+                self.health.error(str(e))
+                self._stop_event.wait(1.0)
+        
+        self.frame_queue.close()
+    
+    def _stream_writer_loop(self):
+        """Consumer: save frames and hand them to listeners until the queue is drained"""
+        while True:
+            img = self.frame_queue.get()
+            if img is None:
+                break
+            try:
+                self._save_frame(img)
+            except Exception as e:
+                print(f"❌ Error saving streamed frame: {e}")
+    
+    def _capture_threads_alive(self):
+        return any(thread is not None and thread.is_alive()
+                   for thread in (self.capture_thread, self.writer_thread))
     
     def stop_continuous_capture(self):
         """Stop continuous image capture"""
         self.running = False
+        self._stop_event.set()
+        # Reads notice the stop event within the port timeout; a frame in progress
+        # can take up to frame_timeout, so never give up before that
+        wait = self.frame_timeout + self.timeout + 1.0
         if self.capture_thread:
-            self.capture_thread.join(timeout=5.0)
+            self.capture_thread.join(timeout=wait)
+        if self.writer_thread:
+            self.writer_thread.join(timeout=wait)
+            if not self.writer_thread.is_alive():
+                self.writer_thread = None
+        if self._capture_threads_alive():
+            print("⚠️  Capture thread did not stop in time; not restarting until it does")
         print("🛑 Continuous capture stopped")
+        self._publish_state()
+    
+    def capture_status(self):
+        """Streaming counters and queue state"""
+        status = dict(self.stream_stats)
+        status['link'] = self.health.stats(resyncs=self.decoder.resyncs)
+        if self.frame_queue is not None:
+            status['queue'] = self.frame_queue.stats()
+        status['adaptive'] = self.running and self.adaptive
+        status['firmware'] = self.firmware_status()
+        return status
     
     def disconnect(self):
         """Disconnect from ESP32"""
@@ -153,7 +712,19 @@ class ESP32Camera:
         if self.ser:
             self.ser.close()
             self.ser = None
+            self.health.link_down()
         print("🔌 ESP32 disconnected")
+        self._publish_state()
+    
+    def _publish_state(self):
+        """Push the current running/connected state to event subscribers"""
+        if self.event_bus:
+            self.event_bus.publish('camera', {
+                'camera': self.camera_id,
+                'port': self.port,
+                'running': self.running,
+                'connected': self.ser is not None
+            })
 
 def main():
     """Test the ESP32 camera module"""
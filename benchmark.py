@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+"""
+Smart Glasses Benchmark Suite
+Runs without hardware or an API key: a fake ESP32 on a pty feeds ESP32Camera,
+the web app runs against the fake model, and the catalog is filled with
+synthetic captures to measure the gallery at scale.
+
+    python benchmark.py                                # default sizes 10^3..10^5
+    python benchmark.py --sizes 1000,1000000 --json results.json
+    python benchmark.py --baseline results.json        # exit 1 on regressions
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import random
+import pathlib
+import argparse
+import tempfile
+import threading
+import numpy as np
+from PIL import Image
+from fake_esp32 import FakeESP32
+from arduino_camera import ESP32Camera
+from capture_catalog import CaptureCatalog
+from capture_scheduler import AdaptiveScheduler, simulate
+from job_queue import JobQueue, INTERACTIVE, BACKGROUND
+from model_client import FakeModelClient
+
+def percentile_ms(ordered, q):
+    return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 3)
+
+def summarize(samples):
+    """Latency percentiles (ms) of a list of durations in seconds"""
+    if not samples:
+        return {'n': 0}
+    ordered = sorted(samples)
+    return {
+        'n': len(ordered),
+        'p50_ms': percentile_ms(ordered, 0.50),
+        'p95_ms': percentile_ms(ordered, 0.95),
+        'p99_ms': percentile_ms(ordered, 0.99)
+    }
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+def bench_serial(args, workdir):
+    """Single-shot and streaming capture from the fake camera"""
+    results = {}
+    captures = workdir / "serial"
+    device = FakeESP32(baud=args.baud, latency=args.camera_latency, corruption=args.corruption,
+                       frame_size=args.frame_size).start()
+    catalog = CaptureCatalog(captures)
+    camera = ESP32Camera(port=device.port, captures_dir=captures, catalog=catalog, frame_timeout=2.0,
+                         target_baud=args.target_baud)
+    try:
+        t0 = time.perf_counter()
+        if not camera.connect():
+            raise RuntimeError("fake camera did not answer")
+        results['serial_handshake'] = {
+            'seconds': round(time.perf_counter() - t0, 3),
+            'protocol': camera.protocol,
+            'firmware': camera.firmware.get('version'),
+            'baud': camera.baud
+        }
+        if args.target_baud and camera.baud != args.target_baud:
+            raise RuntimeError(f"baud switch to {args.target_baud} failed")
+        samples = []
+        saved = 0
+        t0 = time.perf_counter()
+        for _ in range(args.frames):
+            start = time.perf_counter()
+            if camera.capture_single_image():
+                saved += 1
+                samples.append(time.perf_counter() - start)
+        elapsed = time.perf_counter() - t0
+        results['serial_single'] = {
+            **summarize(samples),
+            'frames_per_s': round(saved / elapsed, 2),
+            'success_rate': round(saved / args.frames, 3),
+            'mb_per_s': round(saved * args.frame_size / elapsed / 1e6, 3)
+        }
+
+        before = camera.stream_stats['frames']
+        camera.start_streaming_capture(pipeline_depth=2, frame_timeout=2.0)
+        time.sleep(args.stream_seconds)
+        camera.stop_continuous_capture()
+        frames = camera.stream_stats['frames'] - before
+        results['serial_stream'] = {
+            'frames_per_s': round(frames / args.stream_seconds, 2),
+            'mb_per_s': round(frames * args.frame_size / args.stream_seconds / 1e6, 3),
+            'resyncs': camera.decoder.resyncs,
+            'corrupted_sent': device.frames_corrupted
+        }
+
+        # Change detection runs on 'fast' frames; 'full' is what gets saved
+        for profile in ("fast", "full"):
+            camera.use_profile(profile)
+            sizes = []
+            t0 = time.perf_counter()
+            for _ in range(args.frames):
+                img = camera.grab_frame()
+                if img is not None:
+                    sizes.append(len(img))
+            elapsed = time.perf_counter() - t0
+            results[f'serial_profile_{profile}'] = {
+                'frames_per_s': round(len(sizes) / elapsed, 2),
+                'avg_kb': round(sum(sizes) / max(1, len(sizes)) / 1024, 1),
+                'settings': dict(camera.settings)
+            }
+    finally:
+        camera.disconnect()
+        device.stop()
+        catalog.close()
+    return results
+
+def synthetic_recording(seconds, fps, event_every=120.0, seed=0):
+    """A mostly static recording with sensor noise and about one event per event_every seconds.
+
+    Each event is a bright object crossing the frame for 3-20 s. Returns the
+    JPEG frames and the (start, end) times of the events.
+    """
+    rng = np.random.default_rng(seed)
+    small = rng.integers(40, 200, (6, 8, 3), dtype=np.uint8)
+    scene = np.asarray(Image.fromarray(small).resize((320, 240), Image.BILINEAR), dtype=np.int16)
+    events = []
+    for slot in np.arange(0, seconds - event_every, event_every):
+        start = slot + rng.uniform(0, event_every - 20)
+        events.append((start, start + rng.uniform(3, 20)))
+    frames = []
+    for n in range(int(seconds * fps)):
+        t = n / fps
+        frame = scene + rng.normal(0, 4, scene.shape)
+        for start, end in events:
+            if start <= t < end:
+                x = int((t - start) / (end - start) * 260)
+                frame[80:160, x:x + 60] = 250
+        out = io.BytesIO()
+        Image.fromarray(np.clip(frame, 0, 255).astype(np.uint8)).save(out, format="JPEG", quality=80)
+        frames.append(out.getvalue())
+    return frames, events
+
+def load_recording(directory):
+    """JPEG frames of a recorded sequence, in file name order"""
+    return [p.read_bytes() for p in sorted(pathlib.Path(directory).rglob("*.jpg"))]
+
+def event_coverage(captured, fps, events):
+    """Share of events with at least one capture, captures during events, and the mean delay to the first"""
+    times = np.array(captured) / fps
+    delays = []
+    during = 0
+    for start, end in events:
+        inside = times[(times >= start) & (times < end)]
+        during += len(inside)
+        if len(inside):
+            delays.append(inside[0] - start)
+    return {
+        'events_caught': round(len(delays) / len(events), 3) if events else None,
+        'event_captures': during,
+        'detect_delay_s': round(float(np.mean(delays)), 2) if delays else None
+    }
+
+def bench_scheduler(args):
+    """Adaptive vs fixed-interval capture replayed over a recorded frame sequence"""
+    if args.recording:
+        frames, events = load_recording(args.recording), []
+    else:
+        frames, events = synthetic_recording(args.recording_seconds, args.recording_fps)
+    if not frames:
+        raise RuntimeError(f"no JPEG frames in {args.recording}")
+    results = {}
+    t0 = time.perf_counter()
+    scheduler = AdaptiveScheduler(min_interval=args.min_interval, max_interval=args.max_interval,
+                                  threshold=args.change_threshold)
+    policies = {
+        'fixed': simulate(frames, args.recording_fps, fixed_interval=10.0),
+        'adaptive': simulate(frames, args.recording_fps, scheduler=scheduler)
+    }
+    elapsed = time.perf_counter() - t0
+    for name, captured in policies.items():
+        results[f'schedule_{name}'] = {
+            'captures': len(captured),
+            'mb': round(sum(len(frames[i]) for i in captured) / 1e6, 2),
+            **event_coverage(captured, args.recording_fps, events)
+        }
+    results['schedule_adaptive']['scene_changes'] = scheduler.changes
+    results['schedule_adaptive']['frames_per_s'] = round(len(policies['adaptive']) / elapsed, 1)
+    return results
+
+def start_app(workdir, args):
+    """Import and initialize the web app in a scratch directory against the fake model"""
+    appdir = workdir / "app"
+    (appdir / "captures").mkdir(parents=True)
+    for n in range(8):
+        Image.new("RGB", (800, 600), (n * 30, 90, 160)).save(appdir / "captures" / f"capture_seed_{n}.jpg", quality=85)
+    os.environ.update(MODEL_BACKEND="fake", FAKE_MODEL_LATENCY=str(args.model_latency),
+                      CAMERA_DISCOVER="0", CAMERA_PORT="/dev/null-camera", CAPTION_ENABLED="0",
+                      ANALYSIS_CACHE_PERSIST="0", ANALYSIS_WORKERS=str(args.model_workers))
+    os.chdir(appdir)
+    # Imported late: app reads its configuration from the environment at import
+    import app as webapp
+    webapp.create_app()
+    return webapp
+
+def fill_catalog(catalog, target, start_at):
+    """Grow the catalog to target synthetic captures, 10 s apart, spread over 4 cameras"""
+    have = catalog.count()
+    batch = []
+    for n in range(have, target):
+        camera = ("default", "cam1", "cam2", "cam3")[n % 4]
+        batch.append((f"synthetic/{n:08d}.jpg", start_at + n * 10.0, 48 * 1024, camera))
+        if len(batch) >= 50_000:
+            catalog.add_many(batch)
+            batch = []
+    if batch:
+        catalog.add_many(batch)
+
+def bench_gallery(webapp, sizes, repeat):
+    """Gallery listing latency as the catalog grows"""
+    results = {}
+    client = webapp.app.test_client()
+    catalog = webapp.catalog
+    start_at = time.time() - 10 * max(sizes)
+    rng = random.Random(1)
+    for size in sizes:
+        t0 = time.perf_counter()
+        fill_catalog(catalog, size, start_at)
+        fill = time.perf_counter() - t0
+        newest = catalog.latest(1)[0]['id']
+
+        first_page = timed(lambda: client.get('/api/images?limit=20').get_json(), repeat)
+        deep_page = timed(lambda: client.get(f"/api/images?limit=20&before={rng.randrange(1, newest)}").get_json(), repeat)
+        camera_page = timed(lambda: client.get('/api/images?limit=20&camera=cam2').get_json(), repeat)
+        window = timed(lambda: catalog.between(start_at + size * 5, start_at + size * 5 + 3600), repeat)
+        results[f'gallery_{size}'] = {
+            'fill_s': round(fill, 2),
+            'first_page': summarize(first_page),
+            'deep_page': summarize(deep_page),
+            'camera_page': summarize(camera_page),
+            'hour_window': summarize(window)
+        }
+    return results
+
+def bench_model(webapp, count, concurrency):
+    """Analysis job throughput and streamed chat time-to-first-token with the fake model"""
+    client = webapp.app.test_client()
+    images = [img['filename'] for img in webapp.catalog.latest(200) if img['filename'].startswith("capture_seed")]
+    job_ids = []
+    lock = threading.Lock()
+
+    def submit(worker):
+        for n in range(worker, count, concurrency):
+            r = client.post(f"/api/analyze/{images[n % len(images)]}", json={'question': f"benchmark {n}"})
+            with lock:
+                job_ids.append(r.get_json()['job_id'])
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=submit, args=(w,)) for w in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    latencies = []
+    for job_id in job_ids:
+        job = webapp.analysis_queue.get(job_id)
+        job.wait(60)
+        latencies.append(job.finished_at - job.created_at)
+    elapsed = time.perf_counter() - t0
+
+    ttft = []
+    for n in range(5):
+        t1 = time.perf_counter()
+        response = client.post('/api/chat/stream', json={'message': f"what did I see {n}"}, buffered=False)
+        for piece in response.response:
+            if piece.startswith(b"event: chunk"):
+                ttft.append(time.perf_counter() - t1)
+                break
+        response.close()
+    return {
+        'analysis': {**summarize(latencies), 'jobs_per_s': round(len(job_ids) / elapsed, 2)},
+        'chat_stream_ttft': summarize(ttft)
+    }
+
+def bench_queue(args, workdir):
+    """Durable job queue through a scheduled outage of the fake model.
+
+    Captions and interactive analyses are queued while the model is down; the
+    queue must lose nothing, send few calls during the outage, drain quickly
+    once it is back and resume what was queued across a restart.
+    """
+    outage = args.outage_seconds
+    model = FakeModelClient(latency=args.model_latency / 4, outages=[(0.0, outage)])
+    db_path = workdir / "jobs.db"
+    done_at = {}
+
+    def handler(payload):
+        text = model.generate([f"{payload['kind']} {payload['n']}"])
+        done_at[(payload['kind'], payload['n'])] = time.monotonic()
+        return text
+
+    queue = JobQueue(db_path, max_workers=args.model_workers, base_delay=0.25, max_delay=2.0, seed=0)
+    queue.register('caption', handler, priority=BACKGROUND, max_concurrent=max(1, args.model_workers // 2))
+    queue.register('analysis', handler, priority=INTERACTIVE)
+    started = time.monotonic()
+    jobs = [queue.enqueue('caption', {'kind': 'caption', 'n': n}) for n in range(args.queue_jobs)]
+    interactive = []
+    for n in range(10):
+        time.sleep(outage / 20)
+        interactive.append(queue.enqueue('analysis', {'kind': 'analysis', 'n': n}))
+    for job in jobs + interactive:
+        job.wait(outage + 120)
+    recovered = started + outage
+    calls_in_outage = model.failures
+    stats = queue.stats()
+    queue.shutdown()
+
+    # Restart: jobs queued while the model is down come back on the next start
+    model.outages = [(0.0, 1e9)]
+    queue = JobQueue(db_path, max_workers=args.model_workers, base_delay=0.25, max_delay=2.0)
+    queue.register('caption', handler)
+    pending = [queue.enqueue('caption', {'kind': 'restart', 'n': n}).id for n in range(20)]
+    time.sleep(0.5)
+    queue.shutdown()
+    model.outages = []
+    queue = JobQueue(db_path, max_workers=args.model_workers)
+    queue.register('caption', handler)
+    resumed = sum(1 for job_id in pending if queue.get(job_id) and queue.get(job_id).wait(30)
+                  and queue.get(job_id).status == 'done')
+    queue.shutdown()
+
+    return {'queue_outage': {
+        'outage_s': outage,
+        'jobs': len(jobs) + len(interactive),
+        'lost': sum(job.status != 'done' for job in jobs + interactive),
+        'calls_during_outage': calls_in_outage,
+        'probes': stats['probes'],
+        'interactive_after_recovery': summarize([done_at[('analysis', n)] - recovered for n in range(10)]),
+        'drain_s': round(max(done_at.values()) - recovered, 2),
+        'drain_jobs_per_s': round(len(done_at) / max(1e-3, max(done_at.values()) - recovered), 2),
+        'resumed_after_restart': f"{resumed}/{len(pending)}"
+    }}
+
+def flatten(results, prefix=""):
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        else:
+            flat[name] = value
+    return flat
+
+def compare(results, baseline, tolerance):
+    """Metrics that got worse than baseline by more than the tolerance factor"""
+    current = flatten(results)
+    regressions = []
+    for name, old in flatten(baseline).items():
+        new = current.get(name)
+        if not isinstance(old, (int, float)) or not isinstance(new, (int, float)) or old <= 0:
+            continue
+        if name.endswith("_ms") and new > old * tolerance:
+            regressions.append(f"{name}: {old} -> {new}")
+        elif name.endswith("_per_s") and new < old / tolerance:
+            regressions.append(f"{name}: {old} -> {new}")
+    return regressions
+
+def report(results):
+    for section, values in results.items():
+        print(f"\n📊 {section}")
+        for key, value in values.items():
+            if isinstance(value, dict):
+                detail = "  ".join(f"{k}={v}" for k, v in value.items())
+                print(f"   {key:<12} {detail}")
+            else:
+                print(f"   {key:<12} {value}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Smart glasses benchmark suite")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Catalog sizes for the gallery benchmark")
+    parser.add_argument("--repeat", type=int, default=200, help="Requests per gallery measurement")
+    parser.add_argument("--frames", type=int, default=50, help="Single-shot captures")
+    parser.add_argument("--frame-size", type=int, default=48 * 1024)
+    parser.add_argument("--stream-seconds", type=float, default=3.0)
+    parser.add_argument("--baud", type=int, default=None, help="Emulated UART rate (default: unthrottled USB CDC)")
+    parser.add_argument("--target-baud", type=int, default=None, help="Rate to negotiate after the handshake")
+    parser.add_argument("--camera-latency", type=float, default=0.0, help="Seconds from trigger to frame")
+    parser.add_argument("--corruption", type=float, default=0.0, help="Fraction of frames damaged in transit")
+    parser.add_argument("--model-latency", type=float, default=0.2)
+    parser.add_argument("--model-workers", type=int, default=4)
+    parser.add_argument("--analyses", type=int, default=40)
+    parser.add_argument("--outage-seconds", type=float, default=5.0, help="Fake model outage in the queue benchmark")
+    parser.add_argument("--queue-jobs", type=int, default=200, help="Captions queued during the outage")
+    parser.add_argument("--recording", help="Directory of JPEGs recorded at --recording-fps for the scheduler benchmark")
+    parser.add_argument("--recording-fps", type=float, default=1.0)
+    parser.add_argument("--recording-seconds", type=float, default=3600.0, help="Length of the synthetic recording")
+    parser.add_argument("--min-interval", type=float, default=1.0)
+    parser.add_argument("--max-interval", type=float, default=30.0)
+    parser.add_argument("--change-threshold", type=float, default=0.03)
+    parser.add_argument("--skip", default="", help="Comma-separated sections to skip: serial,schedule,queue,gallery,model")
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--baseline", help="Compare with an earlier --json file")
+    parser.add_argument("--tolerance", type=float, default=1.5, help="Allowed slowdown factor vs baseline")
+    args = parser.parse_args()
+
+    skip = set(filter(None, args.skip.split(",")))
+    sizes = [int(s) for s in args.sizes.split(",")]
+    results = {}
+
+    with tempfile.TemporaryDirectory(prefix="glasses-bench-") as tmp:
+        workdir = pathlib.Path(tmp)
+        cwd = os.getcwd()
+        try:
+            if "serial" not in skip:
+                print("📷 Serial capture...")
+                results.update(bench_serial(args, workdir))
+            if "schedule" not in skip:
+                print("⏱️  Capture scheduling...")
+                results.update(bench_scheduler(args))
+            if "queue" not in skip:
+                print("📥 Job queue through a model outage...")
+                results.update(bench_queue(args, workdir))
+            if not {"gallery", "model"} <= skip:
+                webapp = start_app(workdir, args)
+                if "model" not in skip:
+                    print("🤖 Model pipeline...")
+                    results['model'] = bench_model(webapp, args.analyses, concurrency=8)
+                if "gallery" not in skip:
+                    print(f"🖼️  Gallery at {', '.join(f'{s:,}' for s in sizes)} captures...")
+                    results.update(bench_gallery(webapp, sizes, args.repeat))
+                webapp.shutdown_services()
+        finally:
+            os.chdir(cwd)
+
+    report(results)
+    if args.json:
+        pathlib.Path(args.json).write_text(json.dumps(results, indent=2))
+        print(f"\n💾 Results written to {args.json}")
+    if args.baseline:
+        regressions = compare(results, json.loads(pathlib.Path(args.baseline).read_text()), args.tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) beyond {args.tolerance}x:")
+            for line in regressions:
+                print(f"   {line}")
+            sys.exit(1)
+        print(f"\n✅ No regressions beyond {args.tolerance}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Smart Glasses Camera Manager
+Discovers ESP32 cameras on the serial bus and runs each one with its own
+capture threads and capture directory, sharing one catalog/derivative/event
+pipeline across all of them.
+"""
+
+import re
+import threading
+from serial.tools import list_ports
+from arduino_camera import ESP32Camera
+
+# USB vendor id of Espressif's native USB (XIAO ESP32S3 and friends)
+ESPRESSIF_VID = 0x303A
+
+# Port name patterns used by USB serial adapters when the VID is unknown
+SERIAL_PORT_PATTERNS = ("usbmodem", "ttyACM", "ttyUSB", "usbserial")
+
+def discover_ports():
+    """List serial ports that look like an ESP32 camera"""
+    found = []
+    for info in list_ports.comports():
+        if info.vid == ESPRESSIF_VID or any(p in info.device for p in SERIAL_PORT_PATTERNS):
+            found.append({
+                'port': info.device,
+                'description': info.description,
+                'serial_number': info.serial_number,
+                'camera_id': camera_id_for(info)
+            })
+    return found
+
+def camera_id_for(info):
+    """Stable, filesystem-safe id for a port: USB serial number if present, else the device name"""
+    raw = info.serial_number or info.device.rsplit("/", 1)[-1]
+    return re.sub(r"[^A-Za-z0-9_-]", "_", raw).lower()
+
+class CameraManager:
+    def __init__(self, captures_dir="captures", catalog=None, event_bus=None,
+                 deduplicator_factory=None, frame_listeners=None, baud=115200, disk_writer=None,
+                 scheduler_factory=None, target_baud=None, detect_profile="fast"):
+        self.captures_dir = captures_dir
+        self.catalog = catalog
+        self.event_bus = event_bus
+        self.deduplicator_factory = deduplicator_factory
+        self.scheduler_factory = scheduler_factory
+        self.frame_listeners = list(frame_listeners or [])
+        self.baud = baud
+        self.target_baud = target_baud
+        self.detect_profile = detect_profile
+        self.disk_writer = disk_writer
+        self.cameras = {}
+        self._lock = threading.Lock()
+
+    def add_camera(self, port, camera_id=None, captures_dir=None):
+        """Register a camera; each one gets its own directory under captures/ by default"""
+        camera_id = camera_id or re.sub(r"[^A-Za-z0-9_-]", "_", port.rsplit("/", 1)[-1]).lower()
+        with self._lock:
+            if camera_id in self.cameras:
+                return self.cameras[camera_id]
+            camera = ESP32Camera(
+                port=port,
+                baud=self.baud,
+                target_baud=self.target_baud,
+                detect_profile=self.detect_profile,
+                catalog=self.catalog,
+                deduplicator=self.deduplicator_factory() if self.deduplicator_factory else None,
+                event_bus=self.event_bus,
+                disk_writer=self.disk_writer,
+                scheduler=self.scheduler_factory() if self.scheduler_factory else None,
+                camera_id=camera_id,
+                captures_dir=captures_dir or f"{self.captures_dir}/{camera_id}"
+            )
+            camera.frame_listeners.extend(self.frame_listeners)
+            self.cameras[camera_id] = camera
+        print(f"📷 Registered camera '{camera_id}' on {port}")
+        return camera
+
+    def discover(self):
+        """Register any newly attached cameras, returns the ids that were added"""
+        known_ports = {cam.port for cam in self.cameras.values()}
+        added = []
+        for found in discover_ports():
+            if found['port'] not in known_ports and found['camera_id'] not in self.cameras:
+                self.add_camera(found['port'], found['camera_id'])
+                added.append(found['camera_id'])
+        return added
+
+    def get(self, camera_id):
+        with self._lock:
+            return self.cameras.get(camera_id)
+
+    def start(self, camera_id, mode="interval", **options):
+        """Start one camera; returns False if it couldn't connect"""
+        camera = self.get(camera_id)
+        if camera is None:
+            raise KeyError(camera_id)
+        if camera.running:
+            return True
+        if mode == "stream":
+            camera.start_streaming_capture(**options)
+        else:
+            camera.start_continuous_capture(**options)
+        return camera.running
+
+    def stop(self, camera_id):
+        """Stop one camera's capture threads"""
+        camera = self.get(camera_id)
+        if camera is None:
+            raise KeyError(camera_id)
+        camera.stop_continuous_capture()
+
+    def status(self, camera_id):
+        """State of one camera"""
+        camera = self.get(camera_id)
+        if camera is None:
+            raise KeyError(camera_id)
+        return {
+            'camera': camera.camera_id,
+            'port': camera.port,
+            'running': camera.running,
+            'connected': camera.ser is not None,
+            'captures_dir': str(camera.captures_dir),
+            'capture': camera.capture_status(),
+            'dedup': camera.deduplicator.stats() if camera.deduplicator else None,
+            'schedule': camera.scheduler.stats() if camera.scheduler else None
+        }
+
+    def statuses(self):
+        """State of every registered camera"""
+        with self._lock:
+            ids = list(self.cameras)
+        return [self.status(camera_id) for camera_id in ids]
+
+    def shutdown(self):
+        """Stop and disconnect every camera"""
+        with self._lock:
+            cameras = list(self.cameras.values())
+        for camera in cameras:
+            camera.disconnect()
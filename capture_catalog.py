@@ -0,0 +1,476 @@
+#!/usr/bin/env python3
+"""
+Smart Glasses Capture Catalog
+SQLite-backed index of captured images so the gallery and chat never have to
+scan the captures directory on a request.
+"""
+
+import os
+import time
+import sqlite3
+import pathlib
+import threading
+from datetime import datetime
+from frame_dedup import from_signed
+
+class CaptureCatalog:
+    def __init__(self, captures_dir="captures", db_path=None):
+        self.captures_dir = pathlib.Path(captures_dir)
+        self.captures_dir.mkdir(parents=True, exist_ok=True)
+        # Kept in a hidden subdirectory so database writes don't touch the
+        # captures directory mtime used to detect changes on disk
+        self.db_path = pathlib.Path(db_path) if db_path else self.captures_dir / ".catalog" / "catalog.db"
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+
+    def _create_schema(self):
+        """Create tables and indexes if they don't exist"""
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS captures (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    filename TEXT NOT NULL UNIQUE,
+                    captured_at REAL NOT NULL,
+                    size INTEGER NOT NULL
+                )
+            """)
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_captures_time ON captures (captured_at, id)"
+            )
+            self._ensure_column("phash", "INTEGER")
+            self._ensure_column("repeat_count", "INTEGER NOT NULL DEFAULT 0")
+            self._ensure_column("last_seen", "REAL")
+            self._ensure_column("camera", "TEXT NOT NULL DEFAULT 'default'")
+            # Set once a capture has been compacted into a pack file
+            self._ensure_column("pack", "TEXT")
+            self._ensure_column("pack_offset", "INTEGER")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_captures_camera_time ON captures (camera, captured_at, id)"
+            )
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS captions (
+                    capture_id INTEGER PRIMARY KEY REFERENCES captures (id) ON DELETE CASCADE,
+                    caption TEXT NOT NULL,
+                    model TEXT,
+                    created_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                )
+            """)
+
+    def _ensure_column(self, name, definition):
+        """Add a column to captures when opening a catalog created by an older version"""
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(captures)")}
+        if name not in columns:
+            self._conn.execute(f"ALTER TABLE captures ADD COLUMN {name} {definition}")
+
+    def _relative_name(self, filepath):
+        """Catalog key for a file: its path relative to the captures directory"""
+        path = pathlib.Path(filepath)
+        try:
+            return path.resolve().relative_to(self.captures_dir.resolve()).as_posix()
+        except ValueError:
+            return path.name
+
+    def _row_to_image(self, row):
+        """Convert a catalog row to the gallery dict format"""
+        return {
+            'id': row['id'],
+            'filename': row['filename'],
+            'path': str(self.captures_dir / row['filename']),
+            'timestamp': datetime.fromtimestamp(row['captured_at']).strftime('%Y-%m-%d %H:%M:%S'),
+            'captured_at': row['captured_at'],
+            'size': row['size'],
+            'repeat_count': row['repeat_count'],
+            'camera': row['camera']
+        }
+
+    def add(self, filepath, captured_at=None, size=None, phash=None, camera="default"):
+        """Record a newly written capture, returns its catalog id"""
+        filename = self._relative_name(filepath)
+        if captured_at is None or size is None:
+            st = os.stat(filepath)
+            captured_at = st.st_mtime if captured_at is None else captured_at
+            size = st.st_size if size is None else size
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO captures (filename, captured_at, size, phash, camera) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(filename) DO UPDATE SET captured_at=excluded.captured_at, "
+                "size=excluded.size, phash=excluded.phash, camera=excluded.camera",
+                (filename, captured_at, size, phash, camera)
+            )
+            row = self._conn.execute("SELECT id FROM captures WHERE filename = ?", (filename,)).fetchone()
+            return row['id']
+
+    def add_many(self, rows):
+        """Bulk-insert (filename, captured_at, size, camera) rows, e.g. for imports and benchmarks"""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO captures (filename, captured_at, size, camera) VALUES (?, ?, ?, ?)",
+                rows
+            )
+
+    def add_sighting(self, capture_id, seen_at=None):
+        """Record that a near-duplicate of an existing capture was seen again"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE captures SET repeat_count = repeat_count + 1, last_seen = ? WHERE id = ?",
+                (seen_at or time.time(), capture_id)
+            )
+
+    def remove(self, filename):
+        """Drop a capture from the catalog"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM captions WHERE capture_id IN (SELECT id FROM captures WHERE filename = ?)",
+                (filename,)
+            )
+            self._conn.execute("DELETE FROM captures WHERE filename = ?", (filename,))
+
+    def set_caption(self, capture_id, caption, model=None):
+        """Store the precomputed scene description for a capture"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO captions (capture_id, caption, model, created_at) VALUES (?, ?, ?, ?)",
+                (capture_id, caption, model, time.time())
+            )
+
+    def get_caption(self, capture_id):
+        """Caption text for one capture, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT caption FROM captions WHERE capture_id = ?", (capture_id,)
+            ).fetchone()
+        return row['caption'] if row else None
+
+    def recent_captions(self, limit=20, camera=None, before=None):
+        """Newest captioned captures as gallery dicts with a 'caption' key, newest first"""
+        sql = ("SELECT c.*, k.caption FROM captures c JOIN captions k ON k.capture_id = c.id "
+               "WHERE c.captured_at <= ?")
+        params = [before if before is not None else float('inf')]
+        if camera is not None:
+            sql += " AND c.camera = ?"
+            params.append(camera)
+        sql += " ORDER BY c.captured_at DESC, c.id DESC LIMIT ?"
+        with self._lock:
+            rows = self._conn.execute(sql, (*params, limit)).fetchall()
+        images = []
+        for row in rows:
+            image = self._row_to_image(row)
+            image['caption'] = row['caption']
+            images.append(image)
+        return images
+
+    def uncaptioned(self, limit=50):
+        """Newest captures that don't have a caption yet"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT c.* FROM captures c LEFT JOIN captions k ON k.capture_id = c.id "
+                "WHERE k.capture_id IS NULL ORDER BY c.captured_at DESC, c.id DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+        return [self._row_to_image(row) for row in rows]
+
+    def captions_since(self, created_after, batch=1000):
+        """Yield captions stored after a time, oldest first, for incremental indexing"""
+        last = (created_after, 0)
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT k.capture_id, k.caption, k.created_at, c.captured_at "
+                    "FROM captions k JOIN captures c ON c.id = k.capture_id "
+                    "WHERE (k.created_at, k.capture_id) > (?, ?) "
+                    "ORDER BY k.created_at, k.capture_id LIMIT ?",
+                    (*last, batch)
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield dict(row)
+            last = (rows[-1]['created_at'], rows[-1]['capture_id'])
+
+    def get_many(self, capture_ids):
+        """Look up captures (with captions) by id, returned in the order given"""
+        if not capture_ids:
+            return []
+        placeholders = ",".join("?" * len(capture_ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT c.*, k.caption FROM captures c LEFT JOIN captions k ON k.capture_id = c.id "
+                f"WHERE c.id IN ({placeholders})",
+                list(capture_ids)
+            ).fetchall()
+        by_id = {}
+        for row in rows:
+            image = self._row_to_image(row)
+            image['caption'] = row['caption']
+            by_id[row['id']] = image
+        return [by_id[i] for i in capture_ids if i in by_id]
+
+    def window(self, start, end, camera=None, limit=20000):
+        """Captures in [start, end], oldest first, with 'caption' and unsigned 'phash' keys"""
+        sql = ("SELECT c.*, k.caption FROM captures c LEFT JOIN captions k ON k.capture_id = c.id "
+               "WHERE c.captured_at >= ? AND c.captured_at <= ?")
+        params = [start, end]
+        if camera is not None:
+            sql += " AND c.camera = ?"
+            params.append(camera)
+        sql += " ORDER BY c.captured_at, c.id LIMIT ?"
+        with self._lock:
+            rows = self._conn.execute(sql, (*params, limit)).fetchall()
+        images = []
+        for row in rows:
+            image = self._row_to_image(row)
+            image['caption'] = row['caption']
+            image['phash'] = from_signed(row['phash']) if row['phash'] is not None else None
+            images.append(image)
+        return images
+
+    def pack_location(self, filename):
+        """(pack, offset, size) of a packed capture, or None if it is a loose file"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT pack, pack_offset, size FROM captures WHERE filename = ? AND pack IS NOT NULL",
+                (filename,)
+            ).fetchone()
+        return (row['pack'], row['pack_offset'], row['size']) if row else None
+
+    def loose_before(self, before, limit=1000):
+        """Oldest captures taken before a time that are still loose files"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, filename, captured_at, camera FROM captures "
+                "WHERE captured_at < ? AND pack IS NULL ORDER BY captured_at, id LIMIT ?",
+                (before, limit)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def set_packed(self, updates):
+        """Record (pack, offset, size, id) for captures just appended to a pack"""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE captures SET pack = ?, pack_offset = ?, size = ? WHERE id = ?", updates
+            )
+
+    def pack_in_use(self, pack):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM captures WHERE pack = ? LIMIT 1", (pack,)
+            ).fetchone() is not None
+
+    def oldest(self, before=None, limit=1000):
+        """Oldest captures (optionally only those taken before a time), for retention"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, filename, captured_at, size, pack FROM captures "
+                "WHERE captured_at < ? ORDER BY captured_at, id LIMIT ?",
+                (before if before is not None else float('inf'), limit)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def total_size(self):
+        """Bytes of capture data, loose and packed"""
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM captures").fetchone()[0]
+
+    def remove_ids(self, capture_ids):
+        """Drop captures (and their captions) by id"""
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM captions WHERE capture_id = ?", [(i,) for i in capture_ids])
+            self._conn.executemany("DELETE FROM captures WHERE id = ?", [(i,) for i in capture_ids])
+
+    def get(self, filename):
+        """Look up a single capture by filename"""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM captures WHERE filename = ?", (filename,)).fetchone()
+        return self._row_to_image(row) if row else None
+
+    def get_by_id(self, capture_id):
+        """Look up a single capture by catalog id"""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM captures WHERE id = ?", (capture_id,)).fetchone()
+        return self._row_to_image(row) if row else None
+
+    def count(self):
+        """Total number of cataloged captures"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM captures").fetchone()[0]
+
+    def latest(self, limit=20, before_id=None, camera=None, after_id=None, start=None, end=None):
+        """Most recent captures, newest first, optionally for one camera and time range.
+
+        Paging is keyset based: pass the id of the last image from the previous
+        page as before_id (or the first one as after_id, for the page of newer
+        captures next to it) so each page is a single index range scan.
+        """
+        where = []
+        params = []
+        if camera is not None:
+            where.append("camera = ?")
+            params.append(camera)
+        if start is not None:
+            where.append("captured_at >= ?")
+            params.append(start)
+        if end is not None:
+            where.append("captured_at <= ?")
+            params.append(end)
+        if before_id is not None:
+            where.append("(captured_at, id) < (SELECT captured_at, id FROM captures WHERE id = ?)")
+            params.append(before_id)
+        if after_id is not None:
+            where.append("(captured_at, id) > (SELECT captured_at, id FROM captures WHERE id = ?)")
+            params.append(after_id)
+        sql = "SELECT * FROM captures"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        # Newer pages are read upwards from the cursor, then flipped to newest first
+        order = "ASC" if after_id is not None and before_id is None else "DESC"
+        sql += f" ORDER BY captured_at {order}, id {order} LIMIT ?"
+        with self._lock:
+            rows = self._conn.execute(sql, (*params, limit)).fetchall()
+        if order == "ASC":
+            rows.reverse()
+        return [self._row_to_image(row) for row in rows]
+
+    def added_since(self, capture_id, limit=100, camera=None, start=None, end=None):
+        """Captures cataloged after capture_id (ids only grow), oldest first"""
+        sql = "SELECT * FROM captures WHERE id > ?"
+        params = [capture_id]
+        if camera is not None:
+            sql += " AND camera = ?"
+            params.append(camera)
+        if start is not None:
+            sql += " AND captured_at >= ?"
+            params.append(start)
+        if end is not None:
+            sql += " AND captured_at <= ?"
+            params.append(end)
+        sql += " ORDER BY id LIMIT ?"
+        with self._lock:
+            rows = self._conn.execute(sql, (*params, limit)).fetchall()
+        return [self._row_to_image(row) for row in rows]
+
+    def last_id(self):
+        """Highest catalog id so far (the cursor for added_since)"""
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM captures").fetchone()[0]
+
+    def between(self, start=None, end=None, limit=100, camera=None):
+        """Captures taken in [start, end] (unix timestamps), oldest first"""
+        start = float('-inf') if start is None else start
+        end = float('inf') if end is None else end
+        sql = "SELECT * FROM captures WHERE captured_at >= ? AND captured_at <= ?"
+        params = [start, end]
+        if camera is not None:
+            sql += " AND camera = ?"
+            params.append(camera)
+        sql += " ORDER BY captured_at, id LIMIT ?"
+        with self._lock:
+            rows = self._conn.execute(sql, (*params, limit)).fetchall()
+        return [self._row_to_image(row) for row in rows]
+
+    def _get_meta(self, key):
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row['value'] if row else None
+
+    def _set_meta(self, key, value):
+        self._conn.execute(
+            "INSERT INTO meta (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value=excluded.value",
+            (key, str(value))
+        )
+
+    def _scan_files(self):
+        """Walk the captures directory yielding (relative name, DirEntry) for JPEGs"""
+        stack = [(self.captures_dir, "")]
+        while stack:
+            directory, prefix = stack.pop()
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not entry.name.startswith('.'):
+                            stack.append((pathlib.Path(entry.path), f"{prefix}{entry.name}/"))
+                    elif entry.name.endswith('.jpg'):
+                        yield prefix + entry.name, entry
+
+    def _directory_signature(self):
+        """Cheap fingerprint of the directory tree; changes when files are added or removed"""
+        parts = []
+        stack = [self.captures_dir]
+        while stack:
+            directory = stack.pop()
+            parts.append(f"{directory}:{os.stat(directory).st_mtime_ns}")
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False) and not entry.name.startswith('.'):
+                        stack.append(pathlib.Path(entry.path))
+        return "|".join(sorted(parts))
+
+    def _camera_for(self, filename):
+        """Files under captures/<camera>/ belong to that camera; top-level files and
+        date shards (captures/YYYY/...) belong to the default camera"""
+        first, _, rest = filename.partition("/")
+        if not rest or (len(first) == 4 and first.isdigit()):
+            return "default"
+        return first
+
+    def rebuild(self):
+        """Bring the catalog in sync with files already on disk.
+
+        Only files missing from the catalog are stat()ed, and if no directory
+        in the tree has changed since the last sync the scan is skipped.
+        """
+        t0 = time.time()
+        signature = self._directory_signature()
+        with self._lock:
+            if self._get_meta('dir_signature') == signature:
+                return 0
+
+            # Packed captures have no loose file by design
+            known = {row[0] for row in self._conn.execute("SELECT filename FROM captures WHERE pack IS NULL")}
+
+        on_disk = set()
+        new_rows = []
+        for filename, entry in self._scan_files():
+            on_disk.add(filename)
+            if filename not in known:
+                st = entry.stat()
+                new_rows.append((filename, st.st_mtime, st.st_size, self._camera_for(filename)))
+
+        missing = known - on_disk
+        new_rows.sort(key=lambda r: r[1])
+
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO captures (filename, captured_at, size, camera) VALUES (?, ?, ?, ?)",
+                new_rows
+            )
+            self._conn.executemany(
+                "DELETE FROM captions WHERE capture_id IN (SELECT id FROM captures WHERE filename = ?)",
+                [(name,) for name in missing]
+            )
+            self._conn.executemany(
+                "DELETE FROM captures WHERE filename = ?",
+                [(name,) for name in missing]
+            )
+            self._set_meta('dir_signature', signature)
+
+        if new_rows or missing:
+            print(f"🗂️  Catalog synced: +{len(new_rows)} / -{len(missing)} captures "
+                  f"in {time.time() - t0:.2f}s")
+        return len(new_rows)
+
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Smart Glasses Capture Scheduler
+Adapts the capture interval to the scene: each frame is compared with the
+previous one at very low resolution, the interval drops to the minimum while
+the scene changes and backs off towards the maximum while it is static.
+Optional per-camera budgets cap captures and bytes per hour.
+"""
+
+import io
+import time
+import threading
+import numpy as np
+from collections import deque
+from PIL import Image
+
+THUMB_SIZE = (32, 24)
+BUDGET_WINDOW = 3600.0  # budgets are per rolling hour
+
+def thumbnail(jpeg_data, size=THUMB_SIZE):
+    """Tiny grayscale copy of a JPEG with its mean removed (ignores exposure drift)"""
+    img = Image.open(io.BytesIO(jpeg_data))
+    # Decode at 1/8 scale in the DCT; the full frame is never needed
+    img.draft("L", (size[0] * 4, size[1] * 4))
+    pixels = np.asarray(img.convert("L").resize(size, Image.BILINEAR), dtype=np.float32)
+    return pixels - pixels.mean()
+
+def scene_change(previous, current):
+    """Mean absolute difference of two thumbnails, 0 (same) .. ~1 (different)"""
+    return float(np.abs(current - previous).mean()) / 255.0
+
+class AdaptiveScheduler:
+    def __init__(self, min_interval=1.0, max_interval=30.0, threshold=0.03, backoff=1.5,
+                 max_captures_per_hour=None, max_bytes_per_hour=None):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.threshold = threshold
+        self.backoff = backoff
+        self.max_captures_per_hour = max_captures_per_hour
+        self.max_bytes_per_hour = max_bytes_per_hour
+        self.interval = min_interval
+        self.last_change = None
+        self._previous = None
+        self._recent = deque()  # (time, bytes) of captures in the budget window
+        self._recent_bytes = 0
+        self._lock = threading.Lock()
+        self.frames = 0
+        self.changes = 0
+        self.throttled = 0
+
+    def configure(self, **settings):
+        """Update tuning at runtime; unknown keys raise ValueError"""
+        allowed = ('min_interval', 'max_interval', 'threshold', 'backoff',
+                   'max_captures_per_hour', 'max_bytes_per_hour')
+        unknown = set(settings) - set(allowed)
+        if unknown:
+            raise ValueError(f"Unknown schedule settings: {', '.join(sorted(unknown))}")
+        values = {key: None if value is None else (int if key.startswith('max_') and key.endswith('_hour') else float)(value)
+                  for key, value in settings.items()}
+        with self._lock:
+            merged = {key: values.get(key, getattr(self, key)) for key in allowed}
+            if (not merged['min_interval'] or merged['min_interval'] <= 0
+                    or not merged['max_interval'] or merged['max_interval'] < merged['min_interval']
+                    or not merged['backoff'] or merged['backoff'] < 1 or merged['threshold'] is None):
+                raise ValueError("Need 0 < min_interval <= max_interval, backoff >= 1 and a threshold")
+            for key, value in values.items():
+                setattr(self, key, value)
+            self.interval = min(max(self.interval, self.min_interval), self.max_interval)
+
+    def observe(self, jpeg_data, now=None, count=True):
+        """Adapt the interval to a frame; returns the change score.
+
+        count=False only looks at the scene: for probe frames that are not
+        stored, whose capture is recorded separately.
+        """
+        now = time.time() if now is None else now
+        try:
+            current = thumbnail(jpeg_data)
+        except Exception:
+            # Undecodable frames say nothing about the scene; keep the current pace
+            current = None
+        with self._lock:
+            self.frames += 1
+            if count:
+                self._record(len(jpeg_data), now)
+            score = None
+            if current is not None:
+                if self._previous is not None and self._previous.shape == current.shape:
+                    score = scene_change(self._previous, current)
+                    if score >= self.threshold:
+                        # React immediately; the next frames show how the event unfolds
+                        self.changes += 1
+                        self.last_change = now
+                        self.interval = self.min_interval
+                    else:
+                        self.interval = min(self.max_interval, self.interval * self.backoff)
+                self._previous = current
+            return score
+
+    def record(self, size, now=None):
+        """Count a stored frame against the budgets without looking at the scene"""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._record(size, now)
+
+    def _record(self, size, now):
+        self._recent.append((now, size))
+        self._recent_bytes += size
+
+    def _expire(self, now):
+        while self._recent and self._recent[0][0] <= now - BUDGET_WINDOW:
+            _, size = self._recent.popleft()
+            self._recent_bytes -= size
+
+    def _over_budget(self, now):
+        """Seconds until the oldest capture leaves the window if a budget is spent, else 0"""
+        self._expire(now)
+        over_count = self.max_captures_per_hour and len(self._recent) >= self.max_captures_per_hour
+        over_bytes = self.max_bytes_per_hour and self._recent_bytes >= self.max_bytes_per_hour
+        if (over_count or over_bytes) and self._recent:
+            return max(0.0, self._recent[0][0] + BUDGET_WINDOW - now)
+        return 0.0
+
+    def next_delay(self, now=None):
+        """Seconds to wait before the next capture, honoring the hourly budgets"""
+        now = time.time() if now is None else now
+        with self._lock:
+            wait = self._over_budget(now)
+            if wait:
+                self.throttled += 1
+            return max(self.interval, wait)
+
+    def budget_delay(self, now=None):
+        """Seconds to hold off before the next capture in fixed-rate modes (0 = go)"""
+        now = time.time() if now is None else now
+        with self._lock:
+            wait = self._over_budget(now)
+            if wait:
+                self.throttled += 1
+            return wait
+
+    def stats(self):
+        with self._lock:
+            self._expire(time.time())
+            return {
+                'interval': round(self.interval, 3),
+                'min_interval': self.min_interval,
+                'max_interval': self.max_interval,
+                'threshold': self.threshold,
+                'backoff': self.backoff,
+                'max_captures_per_hour': self.max_captures_per_hour,
+                'max_bytes_per_hour': self.max_bytes_per_hour,
+                'captures_last_hour': len(self._recent),
+                'bytes_last_hour': self._recent_bytes,
+                'frames': self.frames,
+                'changes': self.changes,
+                'throttled': self.throttled,
+                'last_change': self.last_change
+            }
+
+def simulate(frames, fps, scheduler=None, fixed_interval=None):
+    """Replay a recorded sequence (frames at a fixed fps) through a capture policy.
+
+    Returns the indices of the frames that would have been captured, either
+    adaptively or every fixed_interval seconds.
+    """
+    captured = []
+    t = 0.0
+    duration = len(frames) / fps
+    while t < duration:
+        index = int(t * fps)
+        captured.append(index)
+        if fixed_interval:
+            t += fixed_interval
+        else:
+            scheduler.observe(frames[index], now=t)
+            t += max(1.0 / fps, scheduler.next_delay(now=t))
+    return captured
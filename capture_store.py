@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Smart Glasses Capture Store
+Storage layout and lifecycle for captures: unique date-sharded file names,
+retention by age and total size, and compaction of old frames into one pack
+file per camera and day (offsets kept in the catalog) so the number of files
+stays bounded over months of continuous capture.
+"""
+
+import os
+import mmap
+import time
+import pathlib
+import threading
+from datetime import datetime
+from collections import OrderedDict
+
+_id_lock = threading.Lock()
+_last_id = 0
+
+def next_capture_id():
+    """Strictly increasing microsecond timestamp, unique within the process"""
+    global _last_id
+    with _id_lock:
+        _last_id = max(_last_id + 1, time.time_ns() // 1000)
+        return _last_id
+
+def new_capture_path(base_dir):
+    """Unique path for a new capture: base/YYYY/MM/DD/capture_YYYYMMDD_HHMMSS_uuuuuu.jpg"""
+    capture_id = next_capture_id()
+    when = datetime.fromtimestamp(capture_id / 1e6)
+    directory = pathlib.Path(base_dir) / when.strftime("%Y/%m/%d")
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory / f"capture_{when.strftime('%Y%m%d_%H%M%S')}_{capture_id % 1_000_000:06d}.jpg"
+
+def is_capture_name(filename):
+    """Only JPEGs outside hidden directories; .catalog, .chat and .packs are internal"""
+    parts = pathlib.PurePosixPath(filename).parts
+    return (bool(parts) and filename.lower().endswith((".jpg", ".jpeg"))
+            and not any(part.startswith(".") for part in parts))
+
+class CaptureStore:
+    def __init__(self, captures_dir="captures", catalog=None, derivatives=None,
+                 max_age_days=None, max_bytes=None, compact_after_days=2.0,
+                 interval=600.0, batch=2000, open_packs=16):
+        self.captures_dir = pathlib.Path(captures_dir)
+        self.pack_dir = self.captures_dir / ".packs"
+        self.pack_dir.mkdir(parents=True, exist_ok=True)
+        self.catalog = catalog
+        self.derivatives = derivatives
+        self.max_age_days = max_age_days
+        self.max_bytes = max_bytes
+        self.compact_after_days = compact_after_days
+        self.interval = interval
+        self.batch = batch
+        # Recently read packs stay mapped; frames are sliced straight out of the page cache
+        self._maps = OrderedDict()
+        self._open_packs = open_packs
+        self._maps_lock = threading.Lock()
+        self._run_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.compacted = 0
+        self.expired = 0
+        self.last_run = None
+
+    # Reading
+
+    def exists(self, filename):
+        """True if a capture is available, loose or packed"""
+        if not is_capture_name(filename):
+            return False
+        path = self.captures_dir / filename
+        return path.is_file() or (self.catalog is not None and self.catalog.pack_location(filename) is not None)
+
+    def read_packed(self, filename):
+        """A capture's bytes from its pack, or None if it isn't packed"""
+        location = self.catalog.pack_location(filename) if self.catalog else None
+        if location is None:
+            return None
+        pack, offset, size = location
+        with self._maps_lock:
+            # Sliced under the lock so compaction can't unmap it mid-read
+            return self._map(pack)[offset:offset + size]
+
+    def read(self, filename):
+        """A capture's bytes, from the loose file or its pack"""
+        path = self.captures_dir / filename
+        try:
+            return path.read_bytes()
+        except FileNotFoundError:
+            data = self.read_packed(filename)
+            if data is None:
+                raise
+            return data
+
+    def _map(self, pack):
+        """Mapping of a pack file; call with _maps_lock held"""
+        mapped = self._maps.get(pack)
+        if mapped is not None:
+            self._maps.move_to_end(pack)
+            return mapped
+        with open(self.pack_dir / pack, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps[pack] = mapped
+        while len(self._maps) > self._open_packs:
+            _, old = self._maps.popitem(last=False)
+            old.close()
+        return mapped
+
+    def _unmap(self, pack):
+        with self._maps_lock:
+            mapped = self._maps.pop(pack, None)
+            if mapped is not None:
+                mapped.close()
+
+    # Maintenance
+
+    def start(self):
+        """Run retention and compaction periodically in the background"""
+        if self._thread:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="capture-store")
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=5.0)
+            self._thread = None
+        with self._maps_lock:
+            for mapped in self._maps.values():
+                mapped.close()
+            self._maps.clear()
+
+    def _loop(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.maintain()
+            except Exception as e:
+                print(f"❌ Storage maintenance failed: {e}")
+
+    def maintain(self, now=None):
+        """One pass: expire old captures, trim to the size budget, then compact"""
+        now = now or time.time()
+        with self._run_lock:
+            expired = 0
+            if self.max_age_days:
+                expired += self._expire(self.catalog.oldest(before=now - self.max_age_days * 86400))
+            if self.max_bytes:
+                excess = self.catalog.total_size() - self.max_bytes
+                while excess > 0:
+                    rows = self.catalog.oldest(limit=self.batch)
+                    if not rows:
+                        break
+                    victims = []
+                    for row in rows:
+                        if excess <= 0:
+                            break
+                        victims.append(row)
+                        excess -= row['size']
+                    expired += self._expire(victims)
+            compacted = 0
+            if self.compact_after_days is not None:
+                compacted = self._compact(now - self.compact_after_days * 86400)
+            self.last_run = now
+        if expired or compacted:
+            print(f"🧹 Storage maintenance: expired {expired}, packed {compacted} captures")
+        return {'expired': expired, 'compacted': compacted}
+
+    def _expire(self, rows):
+        """Delete captures (files, derivatives and catalog rows); drop packs left empty"""
+        if not rows:
+            return 0
+        packs = set()
+        for row in rows:
+            if row['pack']:
+                packs.add(row['pack'])
+            else:
+                self._unlink(self.captures_dir / row['filename'])
+            if self.derivatives:
+                self.derivatives.remove(row['filename'])
+        self.catalog.remove_ids([row['id'] for row in rows])
+        for pack in packs:
+            if not self.catalog.pack_in_use(pack):
+                self._unmap(pack)
+                self._unlink(self.pack_dir / pack)
+        self.expired += len(rows)
+        return len(rows)
+
+    def _compact(self, before):
+        """Append loose captures older than before to their camera/day pack"""
+        rows = self.catalog.loose_before(before, limit=self.batch)
+        groups = {}
+        for row in rows:
+            day = datetime.fromtimestamp(row['captured_at']).strftime("%Y%m%d")
+            groups.setdefault(f"{row['camera']}/{day}.pack", []).append(row)
+
+        packed = 0
+        for pack, members in groups.items():
+            path = self.pack_dir / pack
+            path.parent.mkdir(parents=True, exist_ok=True)
+            updates = []
+            with open(path, "ab") as f:
+                for row in members:
+                    try:
+                        data = (self.captures_dir / row['filename']).read_bytes()
+                    except FileNotFoundError:
+                        continue
+                    updates.append((pack, f.tell(), len(data), row['id']))
+                    f.write(data)
+                f.flush()
+                # The catalog must never point at bytes that aren't on disk yet
+                os.fsync(f.fileno())
+            # A mapping made before this append doesn't cover the new bytes
+            self._unmap(pack)
+            self.catalog.set_packed(updates)
+            for row in members:
+                self._unlink(self.captures_dir / row['filename'])
+            packed += len(updates)
+        self.compacted += packed
+        return packed
+
+    def _unlink(self, path):
+        """Remove a file and any shard directories it leaves empty"""
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            return
+        parent = path.parent
+        while parent != self.captures_dir and parent != self.pack_dir:
+            try:
+                parent.rmdir()
+            except OSError:
+                break
+            parent = parent.parent
+
+    def stats(self):
+        packs = sum(1 for _ in self.pack_dir.rglob("*.pack"))
+        return {
+            'total_bytes': self.catalog.total_size() if self.catalog else None,
+            'max_bytes': self.max_bytes,
+            'max_age_days': self.max_age_days,
+            'compact_after_days': self.compact_after_days,
+            'packs': packs,
+            'compacted': self.compacted,
+            'expired': self.expired,
+            'last_run': self.last_run
+        }
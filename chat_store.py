@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Smart Glasses Chat Store
+Per-session chat history: a bounded window of recent turns in memory, every
+turn appended to a JSON-lines log on disk for paging back further.
+"""
+
+import os
+import re
+import json
+import time
+import pathlib
+import threading
+from collections import OrderedDict, deque
+
+# Session ids become file names, so only allow a conservative alphabet
+SESSION_ID = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+
+def estimate_tokens(text):
+    """Rough token count (about 4 characters per token) for prompt budgeting"""
+    return len(text) // 4 + 1
+
+class _Session:
+    def __init__(self, window):
+        self.turns = deque(maxlen=window)
+        self.last_id = 0
+        self.lock = threading.Lock()
+
+class ChatStore:
+    def __init__(self, directory="captures/.chat", window=50, max_sessions=256):
+        self.directory = pathlib.Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.window = window
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _log_path(self, session_id):
+        return self.directory / f"{session_id}.jsonl"
+
+    def _session(self, session_id):
+        """In-memory window for a session, loaded from the tail of its log on first use"""
+        if not SESSION_ID.match(session_id or ""):
+            raise ValueError(f"Invalid session id: {session_id!r}")
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._sessions.move_to_end(session_id)
+                return session
+            session = _Session(self.window)
+            for turn in reversed(list(self._read_backwards(session_id, None, self.window))):
+                session.turns.append(turn)
+            if session.turns:
+                session.last_id = session.turns[-1]['id']
+            self._sessions[session_id] = session
+            # Idle sessions only live on disk
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+            return session
+
+    def _read_backwards(self, session_id, before, limit, block=64 * 1024):
+        """Yield up to limit turns with id < before from the log, newest first"""
+        path = self._log_path(session_id)
+        if not path.exists() or limit <= 0:
+            return
+        found = 0
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            position = f.tell()
+            tail = b""
+            while position > 0:
+                step = min(block, position)
+                position -= step
+                f.seek(position)
+                lines = (f.read(step) + tail).split(b"\n")
+                # The first piece may be a partial line; keep it for the next block
+                tail = lines.pop(0) if position > 0 else b""
+                for line in reversed(lines):
+                    if not line.strip():
+                        continue
+                    turn = json.loads(line)
+                    if before is not None and turn['id'] >= before:
+                        continue
+                    yield turn
+                    found += 1
+                    if found >= limit:
+                        return
+
+    def append(self, session_id, user_message, ai_response):
+        """Record one exchange; returns the stored turn"""
+        session = self._session(session_id)
+        with session.lock:
+            session.last_id += 1
+            turn = {
+                'id': session.last_id,
+                'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'user_message': user_message,
+                'ai_response': ai_response
+            }
+            with open(self._log_path(session_id), "a", encoding="utf-8") as f:
+                f.write(json.dumps(turn) + "\n")
+            session.turns.append(turn)
+        return turn
+
+    def history(self, session_id, limit=20, before=None):
+        """One page of turns, oldest first, plus the cursor for the page before it"""
+        session = self._session(session_id)
+        with session.lock:
+            window = [t for t in session.turns if before is None or t['id'] < before]
+            oldest_in_memory = session.turns[0]['id'] if session.turns else 1
+        page = window[-limit:]
+        if len(page) < limit and oldest_in_memory > 1:
+            # Reached the start of the window: continue from the on-disk log
+            cursor = page[0]['id'] if page else min(before or oldest_in_memory, oldest_in_memory)
+            older = list(self._read_backwards(session_id, cursor, limit - len(page)))
+            page = list(reversed(older)) + page
+        return {
+            'turns': page,
+            'before': page[0]['id'] if page and page[0]['id'] > 1 else None
+        }
+
+    def context(self, session_id, max_tokens=1000):
+        """Most recent turns that fit in a token budget, oldest first, for the model prompt"""
+        session = self._session(session_id)
+        with session.lock:
+            recent = list(session.turns)
+        selected = []
+        used = 0
+        for turn in reversed(recent):
+            cost = estimate_tokens(turn['user_message']) + estimate_tokens(turn['ai_response'])
+            if used + cost > max_tokens:
+                break
+            selected.append(turn)
+            used += cost
+        return list(reversed(selected))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'sessions_in_memory': len(self._sessions),
+                'turns_in_memory': sum(len(s.turns) for s in self._sessions.values()),
+                'window': self.window
+            }
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Smart Glasses Image Derivatives
+Downscaled copies of each capture, built once in a background pool: small
+thumbnails for the gallery and a resized/recompressed version for model uploads.
+"""
+
+import io
+import os
+import pathlib
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+
+# name -> (longest edge in pixels, JPEG quality)
+VARIANTS = {
+    'thumb': (320, 70),
+    'medium': (640, 80),
+    'model': (768, 85)
+}
+
+class DerivativeStore:
+    def __init__(self, captures_dir="captures", cache_dir=None, max_workers=2, reader=None):
+        # reader(filename) -> original bytes; defaults to the loose file
+        self.captures_dir = pathlib.Path(captures_dir)
+        self.reader = reader or (lambda filename: (self.captures_dir / filename).read_bytes())
+        self.cache_dir = pathlib.Path(cache_dir) if cache_dir else self.captures_dir / ".derived"
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="derivatives")
+        self._pending = set()
+        self._lock = threading.Lock()
+        self.generated = 0
+        self.failures = 0
+
+    def path_for(self, filename, variant):
+        """Cache location of one derivative of a capture"""
+        return self.cache_dir / variant / filename
+
+    def _relative_name(self, filepath):
+        path = pathlib.Path(filepath)
+        try:
+            return path.relative_to(self.captures_dir).as_posix()
+        except ValueError:
+            return path.name
+
+    def schedule(self, filepath, img_data=None):
+        """Queue derivative generation for a new capture (frame listener signature)"""
+        filename = self._relative_name(filepath)
+        with self._lock:
+            if filename in self._pending:
+                return
+            self._pending.add(filename)
+        self.pool.submit(self._generate_all, filename, img_data)
+
+    def _generate_all(self, filename, img_data=None):
+        """Build every variant from one decode of the original"""
+        try:
+            if img_data is None:
+                img_data = self.reader(filename)
+            for variant in VARIANTS:
+                self._generate(filename, variant, img_data)
+        except Exception as e:
+            with self._lock:
+                self.failures += 1
+            print(f"❌ Error building derivatives for {filename}: {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(filename)
+
+    def _generate(self, filename, variant, img_data):
+        """Resize and recompress one variant, written atomically"""
+        target = self.path_for(filename, variant)
+        if target.exists():
+            return target
+        edge, quality = VARIANTS[variant]
+        img = Image.open(io.BytesIO(img_data))
+        if max(img.size) <= edge and variant == 'model':
+            # Already small enough to upload as is
+            data = img_data
+        else:
+            # draft() lets the JPEG decoder skip most of the work for big reductions
+            img.draft("RGB", (edge, edge))
+            img = img.convert("RGB")
+            img.thumbnail((edge, edge), Image.LANCZOS)
+            out = io.BytesIO()
+            img.save(out, format="JPEG", quality=quality, optimize=True)
+            data = out.getvalue()
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # Unique temp name: a request and the pool may build the same variant at once
+        fd, tmp = tempfile.mkstemp(dir=target.parent, prefix=f".{target.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                out.write(data)
+            os.replace(tmp, target)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+        with self._lock:
+            self.generated += 1
+        return target
+
+    def get(self, filename, variant):
+        """Path to a derivative, building it inline if the background pool hasn't yet"""
+        if variant not in VARIANTS:
+            raise ValueError(f"Unknown image size: {variant}")
+        target = self.path_for(filename, variant)
+        if target.exists():
+            return target
+        return self._generate(filename, variant, self.reader(filename))
+
+    def model_input(self, image_path):
+        """Bytes to upload to the model for a capture"""
+        try:
+            return self.get(self._relative_name(image_path), 'model').read_bytes()
+        except Exception as e:
+            print(f"⚠️  Using original image for model upload: {e}")
+            return self.reader(self._relative_name(image_path))
+
+    def remove(self, filename):
+        """Delete every variant of a capture"""
+        for variant in VARIANTS:
+            try:
+                self.path_for(filename, variant).unlink()
+            except FileNotFoundError:
+                pass
+
+    def stats(self):
+        """Generation counters"""
+        with self._lock:
+            pending = len(self._pending)
+        return {'generated': self.generated, 'failures': self.failures, 'pending': pending}
+
+    def shutdown(self, wait=True):
+        """Stop the background pool"""
+        self.pool.shutdown(wait=wait)
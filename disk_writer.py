@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Smart Glasses Disk Writer
+Dedicated thread that writes captures so a slow disk never stalls the serial
+read loop. Files are written under a hidden temporary name and renamed into
+place once complete, with syncs batched across several frames.
+"""
+
+import os
+import time
+import pathlib
+import threading
+from frame_queue import FrameQueue, BLOCK
+from metrics import REGISTRY
+
+WRITE_SECONDS = REGISTRY.histogram(
+    "disk_writer_batch_seconds", "Time to write, sync and rename one batch of captures")
+WRITE_QUEUE_WAIT = REGISTRY.histogram(
+    "disk_writer_queue_seconds", "Time a capture waited in the writer queue")
+WRITE_FAILURES = REGISTRY.counter(
+    "disk_writer_failures_total", "Captures that could not be written")
+
+# fsync modes
+FSYNC_ALWAYS = "always"  # every file synced and renamed on its own
+FSYNC_BATCH = "batch"    # write a whole batch, then sync it, then one rename pass
+FSYNC_NEVER = "never"    # leave it to the OS (fastest, may lose recent frames on power loss)
+
+# File data (and the size) without forcing an unrelated metadata update where supported
+sync_data = getattr(os, "fdatasync", os.fsync)
+
+def sync_files(fds):
+    """fdatasync every file of a batch once all of them are written; returns {fd: OSError} for failures.
+
+    Only this batch is flushed, unlike syncfs(), which would also wait for
+    the catalog, the job queue and anything else dirty on the filesystem.
+    """
+    errors = {}
+    for fd in fds:
+        try:
+            sync_data(fd)
+        except OSError as e:
+            errors[fd] = e
+    return errors
+
+class DiskWriter:
+    def __init__(self, max_pending=32, policy=BLOCK, fsync=FSYNC_BATCH, batch_size=8, batch_interval=0.5):
+        if fsync not in (FSYNC_ALWAYS, FSYNC_BATCH, FSYNC_NEVER):
+            raise ValueError(f"Unknown fsync mode: {fsync}")
+        # BLOCK applies backpressure once max_pending frames are waiting;
+        # DROP_OLDEST keeps capturing and loses the oldest unwritten frames
+        self.queue = FrameQueue(maxsize=max_pending, policy=policy, on_drop=self._evicted)
+        self.fsync = fsync
+        self.batch_size = 1 if fsync == FSYNC_ALWAYS else batch_size
+        self.batch_interval = batch_interval
+        self.written = 0
+        self.bytes_written = 0
+        self.failures = 0
+        self.batches = 0
+        self.last_error = None
+        self._pending = 0
+        self._idle = threading.Condition()
+        self._submit_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="disk-writer")
+        self._thread.start()
+
+    def submit(self, path, data, on_commit=None, on_fail=None):
+        """Queue a file write; on_commit(path) runs on the writer thread once it is in place.
+
+        on_fail(path) runs instead if the file will never be written: a write
+        error, eviction by DROP_OLDEST or a writer that is shutting down.
+        """
+        path = pathlib.Path(path)
+        with self._idle:
+            self._pending += 1
+        with self._submit_lock:
+            dropped = self.queue.dropped
+            queued = self.queue.put((path, data, on_commit, on_fail, time.perf_counter()))
+            # Frames evicted by DROP_OLDEST (or this one, if refused) will never be written
+            lost = self.queue.dropped - dropped + (0 if queued else 1)
+        if not queued:
+            self._notify_failed(path, on_fail)
+        if lost:
+            self.failures += lost
+            WRITE_FAILURES.inc(lost)
+            self._done(lost)
+        return queued
+
+    def _evicted(self, item):
+        path, _, _, on_fail, _ = item
+        self._notify_failed(path, on_fail)
+
+    def _notify_failed(self, path, on_fail):
+        if on_fail:
+            try:
+                on_fail(path)
+            except Exception as e:
+                print(f"❌ Error after failing to write {path.name}: {e}")
+
+    def _done(self, count):
+        with self._idle:
+            self._pending -= count
+            self._idle.notify_all()
+
+    def flush(self, timeout=None):
+        """Wait until everything submitted so far is on disk (or failed)"""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending <= 0, timeout)
+
+    def _loop(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.batch_interval
+            while len(batch) < self.batch_size:
+                item = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                if item is None:
+                    break
+                batch.append(item)
+            self._write_batch(batch)
+
+    def _write_batch(self, batch):
+        started = time.perf_counter()
+        written = []
+        for path, data, on_commit, on_fail, queued_at in batch:
+            WRITE_QUEUE_WAIT.observe(started - queued_at)
+            tmp = path.with_name(f".{path.name}.tmp")
+            fd = None
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+                view = memoryview(data)
+                while len(view):
+                    view = view[os.write(fd, view):]
+                written.append((fd, tmp, path, len(data), on_commit, on_fail))
+            except OSError as e:
+                if fd is not None:
+                    os.close(fd)
+                self._discard(tmp, path, e, on_fail)
+
+        # Sync only once the whole batch is written: one flush for all of it
+        errors = {}
+        if self.fsync != FSYNC_NEVER:
+            errors = sync_files([item[0] for item in written])
+        staged = []
+        for fd, tmp, path, size, on_commit, on_fail in written:
+            os.close(fd)
+            if fd in errors:
+                self._discard(tmp, path, errors[fd], on_fail)
+            else:
+                staged.append((tmp, path, size, on_commit, on_fail))
+
+        # Only complete files become visible under their real name
+        directories = set()
+        committed = []
+        for tmp, path, size, on_commit, on_fail in staged:
+            try:
+                os.replace(tmp, path)
+                directories.add(path.parent)
+                committed.append((path, size, on_commit))
+            except OSError as e:
+                self._failed(path, e, on_fail)
+        if self.fsync != FSYNC_NEVER:
+            for directory in directories:
+                self._fsync_dir(directory)
+        WRITE_SECONDS.observe(time.perf_counter() - started)
+
+        self.batches += 1
+        for path, size, on_commit in committed:
+            self.written += 1
+            self.bytes_written += size
+            if on_commit:
+                try:
+                    on_commit(path)
+                except Exception as e:
+                    print(f"❌ Error after writing {path.name}: {e}")
+        self._done(len(batch))
+
+    def _discard(self, tmp, path, error, on_fail):
+        self._failed(path, error, on_fail)
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+
+    def _fsync_dir(self, directory):
+        """Make the renames durable (no-op where directories can't be opened)"""
+        try:
+            fd = os.open(directory, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    def _failed(self, path, error, on_fail=None):
+        self.failures += 1
+        self.last_error = f"{path.name}: {error}"
+        WRITE_FAILURES.inc()
+        print(f"❌ Failed to write {path}: {error}")
+        self._notify_failed(path, on_fail)
+
+    def close(self, timeout=10.0):
+        """Write what is queued, then stop the thread"""
+        self.queue.close()
+        self._thread.join(timeout)
+
+    def stats(self):
+        with self._idle:
+            pending = self._pending
+        return {
+            'pending': pending,
+            'written': self.written,
+            'bytes_written': self.bytes_written,
+            'failures': self.failures,
+            'batches': self.batches,
+            'fsync': self.fsync,
+            'last_error': self.last_error,
+            'queue': self.queue.stats()
+        }
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Smart Glasses Embedding Index
+Local semantic search over capture descriptions: a NumPy matrix of normalized
+vectors, memory-mapped from disk and appended to as new captions arrive.
+"""
+
+import re
+import json
+import time
+import zlib
+import pathlib
+import threading
+import numpy as np
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+# Words that carry no meaning for "where did I see X" style queries
+STOPWORDS = frozenset("""
+a an the and or of in on at to for with from by is are was were be been it its this that
+these those there here i me my you your we our they their he she his her them what where
+when which who how did do does can could would should have has had not no any some into
+""".split())
+
+class HashingEmbedder:
+    def __init__(self, dim=128):
+        # Feature hashing of words and word bigrams; needs no model or network
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _features(self, text):
+        words = [w for w in _TOKEN.findall(text.lower()) if w not in STOPWORDS]
+        # Crude plural folding so "keys" matches "key"
+        words = [w[:-1] if len(w) > 3 and w.endswith("s") and not w.endswith("ss") else w for w in words]
+        return words + [f"{a}_{b}" for a, b in zip(words, words[1:])]
+
+    def embed(self, text):
+        """Unit-length float32 vector for a piece of text"""
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for feature in self._features(text):
+            h = zlib.crc32(feature.encode())
+            # Bigrams count half as much as single words
+            weight = 0.5 if "_" in feature else 1.0
+            vec[h % self.dim] += weight if (h >> 31) & 1 else -weight
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+class EmbeddingIndex:
+    def __init__(self, directory, embedder=None, initial_capacity=1024):
+        self.directory = pathlib.Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.embedder = embedder or HashingEmbedder()
+        self.dim = self.embedder.dim
+        self._lock = threading.Lock()
+        self._header_path = self.directory / "header.json"
+        header = json.loads(self._header_path.read_text()) if self._header_path.exists() else {}
+        if header and (header.get('dim') != self.dim or header.get('embedder') != self.embedder.name):
+            print("⚠️  Embedding settings changed, rebuilding search index")
+            header = {}
+        self.count = header.get('count', 0)
+        self.capacity = max(header.get('capacity', 0), initial_capacity)
+        self.last_caption_at = header.get('last_caption_at', 0.0)
+        # Rows are appended in capture order most of the time; while that holds
+        # time filters are a binary search instead of a full mask
+        self.time_sorted = header.get('time_sorted', True)
+        self._open(reset=not header)
+        self._indexed = set(self.ids[:self.count].tolist())
+
+    def _map(self, name, dtype, shape, reset):
+        path = self.directory / name
+        itemsize = np.dtype(dtype).itemsize
+        size = int(np.prod(shape)) * itemsize
+        mode = "w+" if reset or not path.exists() else "r+"
+        if mode == "r+" and path.stat().st_size < size:
+            with open(path, "r+b") as f:
+                f.truncate(size)
+        return np.memmap(path, dtype=dtype, mode=mode, shape=shape)
+
+    def _open(self, reset=False):
+        if reset:
+            self.count = 0
+        self.vectors = self._map("vectors.f32", np.float32, (self.capacity, self.dim), reset)
+        self.ids = self._map("ids.i64", np.int64, (self.capacity,), reset)
+        self.times = self._map("times.f64", np.float64, (self.capacity,), reset)
+
+    def _grow(self):
+        """Double capacity; the files are extended in place and remapped"""
+        for array in (self.vectors, self.ids, self.times):
+            array.flush()
+        self.capacity *= 2
+        self._open()
+
+    def _write_header(self):
+        self._header_path.write_text(json.dumps({
+            'count': self.count,
+            'capacity': self.capacity,
+            'dim': self.dim,
+            'embedder': self.embedder.name,
+            'last_caption_at': self.last_caption_at,
+            'time_sorted': self.time_sorted
+        }))
+
+    def add(self, capture_id, captured_at, text, caption_at=None):
+        """Append one capture description (no-op if the capture is already indexed)"""
+        vec = self.embedder.embed(text)
+        with self._lock:
+            if capture_id in self._indexed:
+                return False
+            if self.count >= self.capacity:
+                self._grow()
+            n = self.count
+            if n and captured_at < self.times[n - 1]:
+                self.time_sorted = False
+            self.vectors[n] = vec
+            self.ids[n] = capture_id
+            self.times[n] = captured_at
+            self.count += 1
+            self._indexed.add(capture_id)
+            if caption_at:
+                self.last_caption_at = max(self.last_caption_at, caption_at)
+            return True
+
+    def flush(self):
+        """Persist appended rows and the header"""
+        with self._lock:
+            for array in (self.vectors, self.ids, self.times):
+                array.flush()
+            self._write_header()
+
+    def sync(self, catalog):
+        """Index captions written since the last sync"""
+        added = 0
+        for row in catalog.captions_since(self.last_caption_at):
+            if self.add(row['capture_id'], row['captured_at'], row['caption'], row['created_at']):
+                added += 1
+        if added:
+            self.flush()
+            print(f"🔎 Indexed {added} new capture descriptions")
+        return added
+
+    def search(self, query, k=10, start=None, end=None):
+        """Top-k (capture_id, score) by cosine similarity, optionally within [start, end]"""
+        q = self.embedder.embed(query)
+        with self._lock:
+            n = self.count
+            lo, hi = 0, n
+            times = self.times[:n]
+            if self.time_sorted:
+                if start is not None:
+                    lo = int(np.searchsorted(times, start, side="left"))
+                if end is not None:
+                    hi = int(np.searchsorted(times, end, side="right"))
+            if hi <= lo:
+                return []
+            scores = self.vectors[lo:hi] @ q
+            if not self.time_sorted and (start is not None or end is not None):
+                mask = np.ones(hi - lo, dtype=bool)
+                if start is not None:
+                    mask &= times[lo:hi] >= start
+                if end is not None:
+                    mask &= times[lo:hi] <= end
+                scores = np.where(mask, scores, -np.inf)
+            k = min(k, hi - lo)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            ids = self.ids[lo:hi][top]
+            return [(int(i), float(s)) for i, s in zip(ids, scores[top]) if np.isfinite(s) and s > 0]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'count': self.count,
+                'capacity': self.capacity,
+                'dim': self.dim,
+                'embedder': self.embedder.name,
+                'time_sorted': self.time_sorted
+            }
+
+def main():
+    """Benchmark search latency at 10^5 and 10^6 rows"""
+    import tempfile
+    vocabulary = ("kitchen desk keys phone laptop street car door coffee mug book window "
+                  "office table chair person dog park stairs wallet glasses screen").split()
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        index = EmbeddingIndex(tmp)
+        for target in (100_000, 1_000_000):
+            t0 = time.perf_counter()
+            while index.count < target:
+                words = rng.choice(vocabulary, 6)
+                index.add(index.count + 1, 1_700_000_000 + index.count * 10, " ".join(words))
+            index.flush()
+            build = time.perf_counter() - t0
+            latencies = []
+            for _ in range(20):
+                t0 = time.perf_counter()
+                index.search("where did I leave my keys", k=10)
+                latencies.append(time.perf_counter() - t0)
+            t0 = time.perf_counter()
+            index.search("keys", k=10, start=1_700_000_000, end=1_700_000_000 + 3600 * 24)
+            ranged = time.perf_counter() - t0
+            print(f"🔎 {target:>9,} rows: append {target / build:,.0f}/s, "
+                  f"search p50 {sorted(latencies)[10] * 1000:.1f} ms, "
+                  f"1-day range {ranged * 1000:.2f} ms")
+
+if __name__ == "__main__":
+    main()
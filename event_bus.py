@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Smart Glasses Event Bus
+In-process publish/subscribe used to push capture, camera and analysis events
+to browsers over Server-Sent Events instead of having them poll.
+"""
+
+import json
+import queue
+import threading
+from collections import deque
+
+class Subscription:
+    def __init__(self, bus, maxsize):
+        self.bus = bus
+        self.queue = queue.Queue(maxsize=maxsize)
+        # Set when events were dropped because this client fell behind;
+        # the client should refetch state instead of trusting the deltas
+        self.overflowed = False
+
+    def get(self, timeout=None):
+        """Next event dict, or None on timeout"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        """Stop receiving events"""
+        self.bus.unsubscribe(self)
+
+class EventBus:
+    def __init__(self, history=256, subscriber_queue_size=100):
+        self.subscriber_queue_size = subscriber_queue_size
+        self._subscribers = set()
+        self._history = deque(maxlen=history)
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        """Register a new listener"""
+        sub = Subscription(self, self.subscriber_queue_size)
+        with self._lock:
+            self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def publish(self, event_type, data):
+        """Deliver an event to every subscriber without ever blocking the publisher"""
+        with self._lock:
+            event = {'id': self._next_id, 'type': event_type, 'data': data}
+            self._next_id += 1
+            self._history.append(event)
+            subscribers = list(self._subscribers)
+        for sub in subscribers:
+            try:
+                sub.queue.put_nowait(event)
+            except queue.Full:
+                sub.overflowed = True
+        return event
+
+    def since(self, last_id):
+        """Buffered events after last_id, or None if some have already been discarded"""
+        with self._lock:
+            if self._history and self._history[0]['id'] > last_id + 1:
+                return None
+            return [event for event in self._history if event['id'] > last_id]
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+def format_sse(event):
+    """Encode an event dict in text/event-stream format"""
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event['data'])}\n\n"
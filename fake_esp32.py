@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Fake ESP32 Camera
+Emulates the smart glasses firmware on a pseudo-terminal so ESP32Camera and the
+frame parser can be exercised without hardware.
+"""
+
+import os
+import pty
+import tty
+import time
+import random
+import pathlib
+import threading
+from frame_parser import encode_frame, make_test_jpeg
+
+PROTOCOL_VERSION = 2
+FIRMWARE_VERSION = "1.1.0"
+
+# Same table as the firmware
+RESOLUTIONS = {
+    "QQVGA": (160, 120), "QVGA": (320, 240), "CIF": (400, 296), "VGA": (640, 480),
+    "SVGA": (800, 600), "XGA": (1024, 768), "HD": (1280, 720), "SXGA": (1280, 1024),
+    "UXGA": (1600, 1200)
+}
+
+class FakeESP32:
+    def __init__(self, frames=None, frame_size=48 * 1024, boot_message=None,
+                 baud=None, latency=0.0, corruption=0.0, seed=0, protocol=PROTOCOL_VERSION):
+        # frames: list of JPEG byte strings, or a directory of .jpg files,
+        # served round-robin. Defaults to synthetic frames of frame_size.
+        # baud throttles writes to what a UART at that rate could carry (None:
+        # as fast as the pty allows, like native USB CDC); latency is the
+        # capture time before a frame starts; corruption is the fraction of
+        # frames sent damaged. protocol=1 emulates firmware without the
+        # command protocol. Synthetic frames are frame_size bytes at the
+        # default SVGA / quality 12 and scale with the configured settings;
+        # supplied frames are served as they are.
+        if isinstance(frames, (str, pathlib.Path)):
+            frames = [p.read_bytes() for p in sorted(pathlib.Path(frames).glob("*.jpg"))]
+        self.synthetic = not frames
+        self.frame_size = frame_size
+        self.frames = frames or [make_test_jpeg(frame_size, seed=n) for n in range(8)]
+        self.protocol = protocol
+        if boot_message is None:
+            boot_message = ("Ready proto=2. Send any key to capture." if protocol >= 2
+                            else "Ready. Send any key to capture.")
+        self.boot_message = boot_message
+        self.baud = baud
+        self.settings = {'framesize': "SVGA", 'quality': 12, 'baud': baud or 115200}
+        self.commands = 0
+        self._line = None  # command being received after '!'
+        self._baud_pending = None  # (new rate, previous rate, deadline) until confirmed
+        self.latency = latency
+        self.corruption = corruption
+        self._rng = random.Random(seed)
+        self.port = None
+        self.frames_sent = 0
+        self.frames_corrupted = 0
+        self._master = None
+        self._slave = None
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        """Open the pty pair and start answering triggers"""
+        self._master, self._slave = pty.openpty()
+        # Raw mode: no echo of triggers and no \n -> \r\n translation of JPEG bytes
+        tty.setraw(self._slave)
+        self.port = os.ttyname(self._slave)
+        self._running = True
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+        if self.boot_message:
+            self._write(f"{self.boot_message}\r\n".encode())
+        return self
+
+    def _write(self, data):
+        view = memoryview(data)
+        # 8N1 framing: 10 bits on the wire per byte
+        bytes_per_second = self.baud / 10 if self.baud else None
+        started = time.perf_counter()
+        sent = 0
+        while len(view):
+            master = self._master
+            if master is None:
+                return
+            chunk = view[:4096] if bytes_per_second else view
+            n = os.write(master, chunk)
+            view = view[n:]
+            sent += n
+            if bytes_per_second:
+                ahead = sent / bytes_per_second - (time.perf_counter() - started)
+                if ahead > 0:
+                    time.sleep(ahead)
+
+    def _serve(self):
+        """Firmware loop: '?' is a readiness probe, '!' starts a command line, any other byte triggers one frame"""
+        while self._running:
+            try:
+                data = os.read(self._master, 64)
+            except OSError:
+                break
+            for byte in data:
+                if self._line is not None:
+                    if byte == ord("\n"):
+                        line, self._line = self._line.decode(errors="ignore").strip(), None
+                        self._command(line)
+                    elif byte != ord("\r"):
+                        self._line.append(byte)
+                elif byte == ord("?"):
+                    self._confirm_baud()
+                    self._write(b"Ready proto=2\r\n" if self.protocol >= 2 else b"Ready\r\n")
+                elif byte == ord("!") and self.protocol >= 2:
+                    self._line = bytearray()
+                else:
+                    self.send_frame()
+
+    def _confirm_baud(self):
+        if not self._baud_pending:
+            return
+        rate, previous, deadline = self._baud_pending
+        self._baud_pending = None
+        if time.monotonic() > deadline:
+            # Too late: the firmware already went back to the old rate
+            rate = previous
+        self.settings['baud'] = rate
+        if self.baud:
+            self.baud = rate
+
+    def _command(self, line):
+        """Answer one protocol 2 command like the firmware does"""
+        self.commands += 1
+        words = line.split()
+        verb = words[0].upper() if words else ""
+        if verb == "HELLO":
+            self._reply(f"OK proto={PROTOCOL_VERSION} fw={FIRMWARE_VERSION} {self._settings()}")
+        elif verb == "SET":
+            try:
+                pairs = dict(word.split("=", 1) for word in words[1:])
+            except ValueError:
+                return self._reply("ERR expected key=value")
+            framesize = pairs.pop("framesize", self.settings['framesize']).upper()
+            quality = pairs.pop("quality", self.settings['quality'])
+            if pairs:
+                return self._reply(f"ERR unknown setting {next(iter(pairs))}")
+            if framesize not in RESOLUTIONS:
+                return self._reply("ERR unknown framesize")
+            if not str(quality).isdigit() or not 4 <= int(quality) <= 63:
+                return self._reply("ERR quality must be 4..63")
+            self.settings.update(framesize=framesize, quality=int(quality))
+            if self.synthetic:
+                self.frames = [make_test_jpeg(self._scaled_size(), seed=n) for n in range(8)]
+            self._reply(f"OK {self._settings()}")
+        elif verb == "BAUD" and len(words) == 2 and words[1].isdigit() and int(words[1]) >= 9600:
+            self._reply(f"OK baud={words[1]}")
+            self._baud_pending = (int(words[1]), self.settings['baud'], time.monotonic() + 2.0)
+        else:
+            self._reply("ERR unknown command")
+
+    def _settings(self):
+        return " ".join(f"{key}={value}" for key, value in self.settings.items())
+
+    def _reply(self, text):
+        self._write(f"{text}\r\n".encode())
+
+    def _scaled_size(self):
+        """Synthetic frame size for the current settings, relative to SVGA / quality 12"""
+        width, height = RESOLUTIONS[self.settings['framesize']]
+        scale = (width * height) / (800 * 600) * (12 / self.settings['quality']) ** 0.6
+        return max(512, int(self.frame_size * scale))
+
+    def send_frame(self):
+        """Write the next frame the way the firmware does"""
+        jpeg = self.frames[self.frames_sent % len(self.frames)]
+        if self.latency:
+            time.sleep(self.latency)
+        data = encode_frame(jpeg)
+        if self.corruption and self._rng.random() < self.corruption:
+            data = self._corrupt(data)
+            self.frames_corrupted += 1
+        self._write(data)
+        self.frames_sent += 1
+
+    def _corrupt(self, data):
+        """Damage a frame the ways a flaky link does: truncation, noise or a bad header"""
+        kind = self._rng.choice(("truncate", "noise", "header"))
+        data = bytearray(data)
+        if kind == "truncate":
+            return bytes(data[:self._rng.randrange(8, len(data))])
+        if kind == "noise":
+            for _ in range(16):
+                data[self._rng.randrange(len(data))] = self._rng.randrange(256)
+            return bytes(data)
+        # Garbage with a stray sync pattern before an intact frame
+        return b"\xAA\x55\xFF\xFF" + bytes(self._rng.randrange(256) for _ in range(32)) + bytes(data)
+
+    def stop(self):
+        """Close the pty pair"""
+        self._running = False
+        for fd in (self._master, self._slave):
+            if fd is not None:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+        self._master = self._slave = None
+        if self._thread:
+            self._thread.join(timeout=1.0)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+def main():
+    """Run a fake camera until interrupted"""
+    import argparse
+    parser = argparse.ArgumentParser(description="Emulate the smart glasses camera on a pty")
+    parser.add_argument("--baud", type=int, default=None, help="Throttle to this UART rate")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds from trigger to frame")
+    parser.add_argument("--corruption", type=float, default=0.0, help="Fraction of frames damaged")
+    parser.add_argument("--frames", default=None, help="Directory of .jpg files to serve")
+    parser.add_argument("--protocol", type=int, default=PROTOCOL_VERSION, choices=(1, 2),
+                        help="Firmware protocol version to emulate")
+    args = parser.parse_args()
+    device = FakeESP32(frames=args.frames, baud=args.baud, latency=args.latency,
+                       corruption=args.corruption, protocol=args.protocol).start()
+    print(f"🤖 Fake ESP32 listening on {device.port}")
+    print(f"💡 Use ESP32Camera(port=\"{device.port}\") to connect")
+    try:
+        while True:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        print("\n🛑 Fake ESP32 stopped")
+    finally:
+        device.stop()
+
+if __name__ == "__main__":
+    main()
@@ -4,8 +4,124 @@
 #define CAMERA_MODEL_XIAO_ESP32S3
 #include "camera_pins.h"
 
+// Serial protocol
+//   '?'              -> "Ready proto=2"
+//   '!' <line> '\n'  -> one text command, answered with "OK ..." or "ERR ..."
+//       HELLO                          firmware and current settings
+//       SET framesize=VGA quality=20   either key may be left out
+//       BAUD 921600                    switch rate; reverts unless '?' arrives at
+//                                      the new rate within 2 s
+//   any other byte   -> capture: 0xAA 0x55 | uint32 LE length | JPEG | "Done\r\n"
+// Version 1 firmware had no commands: every byte, '?' included, triggered a capture.
+#define PROTOCOL_VERSION 2
+#define FIRMWARE_VERSION "1.1.0"
+
+struct FrameSizeName { const char *name; framesize_t size; };
+static const FrameSizeName FRAME_SIZES[] = {
+  {"QQVGA", FRAMESIZE_QQVGA}, {"QVGA", FRAMESIZE_QVGA}, {"CIF", FRAMESIZE_CIF},
+  {"VGA", FRAMESIZE_VGA},     {"SVGA", FRAMESIZE_SVGA}, {"XGA", FRAMESIZE_XGA},
+  {"HD", FRAMESIZE_HD},       {"SXGA", FRAMESIZE_SXGA}, {"UXGA", FRAMESIZE_UXGA},
+};
+static const int FRAME_SIZE_COUNT = sizeof(FRAME_SIZES) / sizeof(FRAME_SIZES[0]);
+
+static uint32_t currentBaud = 115200;
+static framesize_t currentSize = FRAMESIZE_SVGA;
+static int currentQuality = 12;
+
+static const char *frameSizeName(framesize_t size) {
+  for (int i = 0; i < FRAME_SIZE_COUNT; i++) {
+    if (FRAME_SIZES[i].size == size) return FRAME_SIZES[i].name;
+  }
+  return "?";
+}
+
+static void printSettings() {
+  Serial.printf("framesize=%s quality=%d baud=%lu", frameSizeName(currentSize), currentQuality,
+                (unsigned long)currentBaud);
+}
+
+// The sensor may still hold a frame taken with the old settings
+static void dropStaleFrame() {
+  camera_fb_t *fb = esp_camera_fb_get();
+  if (fb) esp_camera_fb_return(fb);
+}
+
+static void handleSet(char *args) {
+  framesize_t size = currentSize;
+  int quality = currentQuality;
+  for (char *tok = strtok(args, " "); tok; tok = strtok(NULL, " ")) {
+    if (strncmp(tok, "framesize=", 10) == 0) {
+      bool found = false;
+      for (int i = 0; i < FRAME_SIZE_COUNT; i++) {
+        if (strcasecmp(tok + 10, FRAME_SIZES[i].name) == 0) {
+          size = FRAME_SIZES[i].size;
+          found = true;
+        }
+      }
+      if (!found) { Serial.printf("ERR unknown framesize %s\n", tok + 10); return; }
+    } else if (strncmp(tok, "quality=", 8) == 0) {
+      quality = atoi(tok + 8);
+      if (quality < 4 || quality > 63) { Serial.println("ERR quality must be 4..63"); return; }
+    } else {
+      Serial.printf("ERR unknown setting %s\n", tok);
+      return;
+    }
+  }
+  sensor_t *s = esp_camera_sensor_get();
+  if (s->set_framesize(s, size) != 0 || s->set_quality(s, quality) != 0) {
+    Serial.println("ERR sensor rejected settings");
+    return;
+  }
+  currentSize = size;
+  currentQuality = quality;
+  dropStaleFrame();
+  Serial.print("OK ");
+  printSettings();
+  Serial.println();
+}
+
+static void handleBaud(const char *arg) {
+  uint32_t baud = strtoul(arg, NULL, 10);
+  if (baud < 9600 || baud > 2000000) { Serial.println("ERR baud must be 9600..2000000"); return; }
+  uint32_t previous = currentBaud;
+  Serial.printf("OK baud=%lu\n", (unsigned long)baud);
+  Serial.flush();
+  Serial.updateBaudRate(baud);
+  // Keep the new rate only if the host proves it can hear us at it
+  unsigned long until = millis() + 2000;
+  while (millis() < until) {
+    if (Serial.available() && Serial.read() == '?') {
+      currentBaud = baud;
+      Serial.printf("Ready proto=%d\n", PROTOCOL_VERSION);
+      return;
+    }
+    delay(1);
+  }
+  Serial.updateBaudRate(previous);
+}
+
+static void handleCommand() {
+  char line[96];
+  size_t n = Serial.readBytesUntil('\n', line, sizeof(line) - 1);
+  line[n] = 0;
+  if (n && line[n - 1] == '\r') line[n - 1] = 0;
+
+  if (strcmp(line, "HELLO") == 0) {
+    Serial.printf("OK proto=%d fw=%s ", PROTOCOL_VERSION, FIRMWARE_VERSION);
+    printSettings();
+    Serial.println();
+  } else if (strncmp(line, "SET ", 4) == 0) {
+    handleSet(line + 4);
+  } else if (strncmp(line, "BAUD ", 5) == 0) {
+    handleBaud(line + 5);
+  } else {
+    Serial.printf("ERR unknown command %s\n", line);
+  }
+}
+
 void setup() {
-  Serial.begin(115200);
+  Serial.begin(currentBaud);
+  Serial.setTimeout(500);
   delay(2000);
 
   // ---- camera config ----
@@ -20,8 +136,8 @@ void setup() {
   c.pin_pwdn = PWDN_GPIO_NUM; c.pin_reset = RESET_GPIO_NUM;
   c.xclk_freq_hz = 20000000;
   c.pixel_format = PIXFORMAT_JPEG;
-  c.frame_size   = FRAMESIZE_SVGA;   // 800x600 to start
-  c.jpeg_quality = 12;
+  c.frame_size   = FRAMESIZE_UXGA;   // allocate for the largest size, then drop to the default
+  c.jpeg_quality = currentQuality;
   c.fb_count     = 1;
   c.fb_location  = CAMERA_FB_IN_PSRAM;
 
@@ -29,13 +145,26 @@ void setup() {
     Serial.println("Camera init failed");
     while (true) delay(1000);
   }
+  sensor_t *s = esp_camera_sensor_get();
+  s->set_framesize(s, currentSize);
 
-  Serial.println("Ready. Send any key to capture.");
+  Serial.printf("Ready proto=%d. Send any key to capture.\n", PROTOCOL_VERSION);
 }
 
 void loop() {
   if (Serial.available()) {
-    Serial.read(); // clear one byte
+    int cmd = Serial.read(); // one byte per command
+
+    // Readiness probe from the host: answer without capturing
+    if (cmd == '?') {
+      Serial.printf("Ready proto=%d\n", PROTOCOL_VERSION);
+      return;
+    }
+    if (cmd == '!') {
+      handleCommand();
+      return;
+    }
+
     camera_fb_t *fb = esp_camera_fb_get();
     if (!fb) {
       Serial.println("Capture failed");
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Smart Glasses Frame Dedup
+Perceptual hashing (dHash) of captured frames and a rolling window of recent
+hashes so near-identical frames from a static scene can be suppressed.
+"""
+
+import io
+import time
+import threading
+import numpy as np
+from PIL import Image
+
+HASH_SIZE = 8  # 8x8 gradient bits -> one 64-bit hash
+
+SKIP = "skip"            # drop the frame entirely
+REFERENCE = "reference"  # record a sighting on the matching capture instead of a new file
+
+# Popcount lookup for Hamming distances over uint8 views of the hashes
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+def dhash(jpeg_data, hash_size=HASH_SIZE):
+    """Difference hash of a JPEG as an unsigned 64-bit int"""
+    img = Image.open(io.BytesIO(jpeg_data))
+    # Let the JPEG decoder downscale by 1/2..1/8 in the DCT; far cheaper than a full decode
+    img.draft("L", (hash_size * 8, hash_size * 8))
+    pixels = np.asarray(img.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR),
+                        dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+def hamming_distances(value, hashes):
+    """Vectorized Hamming distance from one hash to an array of uint64 hashes"""
+    xor = np.bitwise_xor(hashes, np.uint64(value))
+    return _POPCOUNT[xor.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+def to_signed(value):
+    """Store an unsigned 64-bit hash in a signed SQLite INTEGER"""
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+def from_signed(value):
+    """Inverse of to_signed"""
+    return value + (1 << 64) if value < 0 else value
+
+class FrameDeduplicator:
+    def __init__(self, max_distance=4, window=32, mode=REFERENCE):
+        if mode not in (SKIP, REFERENCE):
+            raise ValueError(f"Unknown dedup mode: {mode}")
+        self.max_distance = max_distance
+        self.mode = mode
+        # Ring buffer of recent hashes and the capture each one belongs to
+        self._hashes = np.zeros(window, dtype=np.uint64)
+        self._refs = [None] * window
+        self._count = 0
+        self._next = 0
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.duplicates = 0
+
+    def check(self, jpeg_data):
+        """Hash a frame and look for a near match.
+
+        Returns (hash, ref) where ref is the (capture id, path) of the matching
+        recent frame, or None if the frame is new. Frames that can't be
+        decoded get a None hash and are always treated as new.
+        """
+        try:
+            value = dhash(jpeg_data)
+        except Exception as e:
+            print(f"⚠️  Could not hash frame: {e}")
+            return None, None
+        with self._lock:
+            self.checked += 1
+            if not self._count:
+                return value, None
+            distances = hamming_distances(value, self._hashes[:self._count])
+            best = int(np.argmin(distances))
+            if distances[best] <= self.max_distance:
+                self.duplicates += 1
+                return value, self._refs[best]
+        return value, None
+
+    def remember(self, value, ref):
+        """Add a stored frame's hash to the window"""
+        if value is None:
+            return
+        with self._lock:
+            self._hashes[self._next] = np.uint64(value)
+            self._refs[self._next] = ref
+            self._next = (self._next + 1) % len(self._hashes)
+            self._count = min(self._count + 1, len(self._hashes))
+
+    def resolve(self, path, capture_id):
+        """Fill in the capture id of a frame remembered before it was cataloged"""
+        with self._lock:
+            for i, ref in enumerate(self._refs):
+                if ref is not None and ref[0] is None and ref[1] == path:
+                    self._refs[i] = (capture_id, path)
+
+    def forget(self, path):
+        """Drop a remembered frame that never made it to disk"""
+        with self._lock:
+            size = len(self._hashes)
+            # Oldest first, so the ring keeps its eviction order
+            order = range(self._count) if self._count < size else [(self._next + i) % size for i in range(size)]
+            keep = [i for i in order if self._refs[i] is None or self._refs[i][1] != path]
+            if len(keep) == self._count:
+                return
+            hashes = self._hashes[keep]
+            refs = [self._refs[i] for i in keep]
+            self._hashes[:] = 0
+            self._hashes[:len(keep)] = hashes
+            self._refs = refs + [None] * (size - len(keep))
+            self._count = len(keep)
+            self._next = len(keep) % size
+
+    def stats(self):
+        """Dedup counters"""
+        with self._lock:
+            return {
+                'checked': self.checked,
+                'duplicates': self.duplicates,
+                'max_distance': self.max_distance,
+                'mode': self.mode,
+                'window': len(self._hashes)
+            }
+
+def _synthetic_sequence(count, size=(800, 600), scene_every=50, seed=0):
+    """Mostly static scenes with sensor noise and an occasional cut, JPEG encoded"""
+    rng = np.random.default_rng(seed)
+    frames = []
+    scene = None
+    for n in range(count):
+        if n % scene_every == 0:
+            small = rng.integers(0, 256, (size[1] // 40, size[0] // 40, 3), dtype=np.uint8)
+            scene = np.asarray(Image.fromarray(small).resize(size, Image.BILINEAR), dtype=np.int16)
+        noisy = np.clip(scene + rng.normal(0, 4, scene.shape), 0, 255).astype(np.uint8)
+        out = io.BytesIO()
+        Image.fromarray(noisy).save(out, format="JPEG", quality=80)
+        frames.append(out.getvalue())
+    return frames
+
+def main():
+    """Benchmark hashing and dedup on a synthetic frame sequence"""
+    count = 500
+    print(f"🎞️  Generating {count} synthetic SVGA frames...")
+    frames = _synthetic_sequence(count)
+    total_mb = sum(len(f) for f in frames) / (1024 * 1024)
+
+    t0 = time.perf_counter()
+    for frame in frames:
+        dhash(frame)
+    elapsed = time.perf_counter() - t0
+    print(f"#️⃣  dhash: {count / elapsed:.0f} frames/s ({elapsed / count * 1000:.2f} ms/frame)")
+
+    dedup = FrameDeduplicator(max_distance=4, window=32)
+    stored = 0
+    t0 = time.perf_counter()
+    for n, frame in enumerate(frames):
+        value, ref = dedup.check(frame)
+        if ref is None:
+            dedup.remember(value, (n, None))
+            stored += 1
+    elapsed = time.perf_counter() - t0
+    print(f"♻️  Dedup: kept {stored}/{count} frames ({count // 50} scenes), "
+          f"{total_mb:.1f} MB in, {count / elapsed:.0f} frames/s")
+
+    window = np.random.default_rng(1).integers(0, 2**63, 100_000, dtype=np.uint64)
+    t0 = time.perf_counter()
+    for _ in range(100):
+        hamming_distances(12345, window)
+    print(f"📏 Hamming scan of 100k hashes: {(time.perf_counter() - t0) * 10:.2f} ms")
+
+if __name__ == "__main__":
+    main()
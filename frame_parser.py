@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Smart Glasses Frame Parser
+Streaming decoder for the ESP32 serial protocol:
+    0xAA 0x55 | uint32 little-endian length | JPEG bytes | "Done\\r\\n"
+"""
+
+import io
+import os
+import time
+import struct
+
+SYNC = b"\xAA\x55"
+HEADER_SIZE = 6
+JPEG_SOI = b"\xFF\xD8"
+JPEG_EOI = b"\xFF\xD9"
+
+# The camera driver can pad a frame after the EOI marker, so look for it
+# within this many bytes of the end instead of only the last two.
+EOI_SEARCH_WINDOW = 64
+
+class FrameDecoder:
+    def __init__(self, capacity=512 * 1024, max_frame_size=None):
+        # One preallocated buffer for the lifetime of the decoder. Data lives
+        # in [_start, _end); _scan is where the next sync search resumes so
+        # bytes already ruled out are never searched twice.
+        self._buf = bytearray(capacity)
+        self._view = memoryview(self._buf)
+        self._start = 0
+        self._end = 0
+        self._scan = 0
+        # A frame must leave room for the tail of a truncated predecessor
+        self.max_frame_size = max_frame_size or capacity // 2
+        self.frames = 0
+        self.resyncs = 0
+        self.bytes_in = 0
+        # Seconds read_frame waited before a frame header showed up
+        self.last_sync_wait = None
+
+    @property
+    def buffered(self):
+        """Number of bytes waiting to be parsed"""
+        return self._end - self._start
+
+    def reset(self):
+        """Drop all buffered data"""
+        self._start = self._end = self._scan = 0
+
+    def _make_room(self, size):
+        """Move buffered data to the front if fewer than size bytes are free at the end"""
+        if len(self._buf) - self._end >= size or self._start == 0:
+            return
+        pending = self._end - self._start
+        self._view[:pending] = self._view[self._start:self._end]
+        self._scan -= self._start
+        self._start = 0
+        self._end = pending
+
+    def _writable(self, size):
+        """Writable view of up to size free bytes at the end of the buffer"""
+        self._make_room(size)
+        return self._view[self._end:min(len(self._buf), self._end + size)]
+
+    def feed(self, data):
+        """Append raw bytes to the buffer"""
+        data = memoryview(data)
+        while len(data):
+            target = self._writable(len(data))
+            if not len(target):
+                raise BufferError("Frame buffer full")
+            n = len(target)
+            target[:] = data[:n]
+            self._end += n
+            self.bytes_in += n
+            data = data[n:]
+
+    def readinto_from(self, stream, size=4096):
+        """Read directly from a stream (serial port, pty, file) into the buffer"""
+        if hasattr(stream, "in_waiting"):
+            # pyserial blocks until the full request or the port timeout, so
+            # only ask for what has arrived (or one byte to wait for more)
+            size = stream.in_waiting or 1
+        target = self._writable(size)
+        if not len(target):
+            raise BufferError("Frame buffer full")
+        n = stream.readinto(target) or 0
+        self._end += n
+        self.bytes_in += n
+        return n
+
+    def _resync(self, pos):
+        """Give up on a candidate header at pos and keep scanning after it"""
+        self.resyncs += 1
+        self._scan = pos + 1
+
+    def next_frame(self):
+        """Return the next complete, valid JPEG frame or None if more data is needed"""
+        buf = self._buf
+        while True:
+            i = buf.find(SYNC, self._scan, self._end)
+            if i == -1:
+                # Keep a trailing 0xAA; it may be the first half of a sync
+                keep = 1 if self._end > self._start and buf[self._end - 1] == SYNC[0] else 0
+                self._start = self._scan = self._end - keep
+                return None
+
+            # Anything before the sync is boot chatter or "Done" lines
+            self._start = i
+            if self._end - i < HEADER_SIZE:
+                self._scan = i
+                return None
+
+            length = struct.unpack_from("<I", buf, i + 2)[0]
+            if length < len(JPEG_SOI) + len(JPEG_EOI) or length > self.max_frame_size:
+                self._resync(i)
+                continue
+
+            payload_start = i + HEADER_SIZE
+            available = self._end - payload_start
+            if available >= 2 and buf[payload_start:payload_start + 2] != JPEG_SOI:
+                self._resync(i)
+                continue
+
+            if available < length:
+                self._scan = i
+                return None
+
+            payload_end = payload_start + length
+            tail_start = max(payload_start + 2, payload_end - EOI_SEARCH_WINDOW)
+            if buf.rfind(JPEG_EOI, tail_start, payload_end) == -1:
+                # Truncated frame: its declared length ran into the next
+                # frame, whose header is somewhere after this one
+                self._resync(i)
+                continue
+
+            frame = bytes(self._view[payload_start:payload_end])
+            self._start = self._scan = payload_end
+            self.frames += 1
+            return frame
+
+    def read_frame(self, stream, deadline, stop=None):
+        """Block until a frame is decoded from stream or deadline (time.time()) passes.
+
+        stop is an optional threading.Event that ends the wait early; it is
+        checked between reads, so a blocking stream should have a timeout.
+        """
+        start = time.perf_counter()
+        self.last_sync_wait = None
+        while True:
+            frame = self.next_frame()
+            if self.last_sync_wait is None and (frame is not None or self.buffered >= HEADER_SIZE):
+                # An incomplete frame leaves the buffer starting at its header
+                self.last_sync_wait = time.perf_counter() - start
+            if frame is not None:
+                return frame
+            if time.time() >= deadline or (stop is not None and stop.is_set()):
+                return None
+            self.readinto_from(stream)
+
+def encode_frame(jpeg):
+    """Frame a JPEG the way the firmware does"""
+    return SYNC + struct.pack("<I", len(jpeg)) + jpeg + b"Done\r\n"
+
+def make_test_jpeg(size, seed=0):
+    """Synthetic JPEG-shaped payload (SOI ... EOI) of the given size"""
+    rng = bytes((seed * 31 + i * 7) & 0xFF for i in range(256))
+    body = (rng * (size // 256 + 1))[:max(0, size - 4)]
+    return JPEG_SOI + body.replace(JPEG_EOI, b"\xFF\x00") + JPEG_EOI
+
+def _legacy_parse(stream, chunk=1024):
+    """The original grow-and-rescan parser, kept for benchmark comparison"""
+    frames = 0
+    buf = bytearray()
+    while True:
+        data = stream.read(chunk)
+        if not data:
+            return frames
+        buf += data
+        while True:
+            i = buf.find(SYNC)
+            if i == -1 or len(buf) < i + HEADER_SIZE:
+                break
+            length = struct.unpack("<I", buf[i + 2:i + 6])[0]
+            if len(buf) < i + HEADER_SIZE + length:
+                break
+            buf = buf[i + HEADER_SIZE:]
+            bytes(buf[:length])
+            buf = buf[length:]
+            frames += 1
+
+def _build_stream(frame_count, frame_size, corrupt_every=0):
+    """Boot chatter followed by frames, optionally with false syncs and truncated frames"""
+    parts = [b"ESP-ROM boot\r\nReady. Send any key to capture.\r\n"]
+    for n in range(frame_count):
+        parts.append(encode_frame(make_test_jpeg(frame_size, seed=n)))
+        if corrupt_every and n % corrupt_every == 0:
+            parts.append(SYNC + struct.pack("<I", 0xFFFFFF) + b"noise")
+            parts.append(encode_frame(make_test_jpeg(frame_size, seed=n))[:frame_size // 2])
+    return b"".join(parts)
+
+def _decode_all(stream_bytes):
+    """Decode an in-memory stream, returns (frames, resyncs, seconds)"""
+    decoder = FrameDecoder()
+    stream = io.BytesIO(stream_bytes)
+    decoded = 0
+    t0 = time.perf_counter()
+    while True:
+        if decoder.next_frame() is not None:
+            decoded += 1
+        elif not decoder.readinto_from(stream, size=16 * 1024):
+            break
+    return decoded, decoder.resyncs, time.perf_counter() - t0
+
+def main():
+    """Benchmark decoder throughput on synthetic streams"""
+    frame_count = 200
+    frame_size = 48 * 1024
+
+    clean = _build_stream(frame_count, frame_size)
+    clean_mb = len(clean) / (1024 * 1024)
+    print(f"📊 Clean stream: {frame_count} frames, {clean_mb:.1f} MB")
+    decoded, _, elapsed = _decode_all(clean)
+    print(f"✅ FrameDecoder: {decoded} frames, {clean_mb / elapsed:.1f} MB/s")
+    t0 = time.perf_counter()
+    legacy = _legacy_parse(io.BytesIO(clean))
+    print(f"📉 Legacy parser: {legacy} frames, {clean_mb / (time.perf_counter() - t0):.1f} MB/s")
+
+    noisy = _build_stream(frame_count, frame_size, corrupt_every=10)
+    noisy_mb = len(noisy) / (1024 * 1024)
+    decoded, resyncs, elapsed = _decode_all(noisy)
+    print(f"🔁 Corrupted stream: {decoded}/{frame_count} frames, {resyncs} resyncs, "
+          f"{noisy_mb / elapsed:.1f} MB/s")
+
+    if os.name == "posix":
+        from fake_esp32 import FakeESP32
+        with FakeESP32(frame_size=frame_size) as device:
+            fd = os.open(device.port, os.O_RDWR | os.O_NOCTTY)
+            with io.FileIO(fd, "r+b", closefd=True) as port:
+                decoder = FrameDecoder()
+                t0 = time.perf_counter()
+                got = 0
+                for _ in range(50):
+                    port.write(b"x")
+                    if decoder.read_frame(port, time.time() + 5.0):
+                        got += 1
+                elapsed = time.perf_counter() - t0
+        print(f"🔌 pty round trip: {got}/50 frames, "
+              f"{decoder.bytes_in / (1024 * 1024) / elapsed:.1f} MB/s")
+
+if __name__ == "__main__":
+    main()
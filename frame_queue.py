@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Smart Glasses Frame Queue
+Bounded producer/consumer queue between the serial reader and the frame
+consumers (disk writer, AI analysis).
+"""
+
+import time
+import threading
+from collections import deque
+
+BLOCK = "block"              # producer waits for space (backpressure)
+DROP_OLDEST = "drop_oldest"  # producer evicts the oldest queued frame
+
+class FrameQueue:
+    def __init__(self, maxsize=8, policy=DROP_OLDEST, on_drop=None):
+        if policy not in (BLOCK, DROP_OLDEST):
+            raise ValueError(f"Unknown queue policy: {policy}")
+        self.maxsize = maxsize
+        self.policy = policy
+        # on_drop(item) runs (outside the lock) for each item evicted by DROP_OLDEST
+        self.on_drop = on_drop
+        self._items = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self.put_count = 0
+        self.dropped = 0
+        self.high_watermark = 0
+
+    def put(self, item, timeout=None):
+        """Add an item, applying the overflow policy. Returns False if it was not queued."""
+        evicted = []
+        try:
+            return self._put(item, timeout, evicted)
+        finally:
+            if self.on_drop:
+                for old in evicted:
+                    self.on_drop(old)
+
+    def _put(self, item, timeout, evicted):
+        with self._cond:
+            if self._closed:
+                return False
+            if len(self._items) >= self.maxsize:
+                if self.policy == DROP_OLDEST:
+                    evicted.append(self._items.popleft())
+                    self.dropped += 1
+                else:
+                    deadline = None if timeout is None else time.monotonic() + timeout
+                    while len(self._items) >= self.maxsize and not self._closed:
+                        remaining = None if deadline is None else deadline - time.monotonic()
+                        if remaining is not None and remaining <= 0:
+                            self.dropped += 1
+                            return False
+                        self._cond.wait(remaining)
+                    if self._closed:
+                        return False
+            self._items.append(item)
+            self.put_count += 1
+            self.high_watermark = max(self.high_watermark, len(self._items))
+            self._cond.notify_all()
+            return True
+
+    def get(self, timeout=None):
+        """Remove and return the oldest item, or None on timeout / once closed and drained"""
+        with self._cond:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while not self._items:
+                if self._closed:
+                    return None
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+            item = self._items.popleft()
+            self._cond.notify_all()
+            return item
+
+    def close(self):
+        """Stop accepting items; consumers drain what is left"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def __len__(self):
+        with self._cond:
+            return len(self._items)
+
+    def stats(self):
+        """Queue counters for the status API"""
+        with self._cond:
+            return {
+                'size': len(self._items),
+                'maxsize': self.maxsize,
+                'policy': self.policy,
+                'queued': self.put_count,
+                'dropped': self.dropped,
+                'high_watermark': self.high_watermark
+            }
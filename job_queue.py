@@ -0,0 +1,521 @@
+#!/usr/bin/env python3
+"""
+Smart Glasses Job Queue
+Durable queue for model work, so analyses, chat turns and captions survive a
+flaky connection or a restart. Jobs are kept in SQLite and retried with
+jittered exponential backoff; interactive jobs run ahead of background
+captioning and per-kind caps keep captions from taking every worker. While
+the backend keeps failing the queue sends one probe at a time, and drains at
+full concurrency as soon as a call succeeds again.
+
+Durable jobs are (kind, JSON payload) pairs run by the handler registered for
+their kind. submit() also accepts plain callables, like AnalysisExecutor;
+those share the scheduling and retries but are not persisted.
+"""
+
+import json
+import time
+import heapq
+import random
+import sqlite3
+import pathlib
+import itertools
+import threading
+from collections import OrderedDict
+from analysis_worker import AnalysisJob, RateLimiter
+from metrics import REGISTRY
+
+JOB_WAIT_SECONDS = REGISTRY.histogram(
+    "job_queue_wait_seconds", "Time from enqueue until a job succeeded", ("kind",))
+JOB_RETRIES = REGISTRY.counter(
+    "job_queue_retries_total", "Failed attempts scheduled for a retry", ("kind",))
+JOB_FAILURES = REGISTRY.counter(
+    "job_queue_failures_total", "Jobs that failed for good", ("kind",))
+
+# Priorities: lower runs first
+INTERACTIVE = 0
+BACKGROUND = 10
+
+# Job states besides AnalysisJob's queued / running / done / error
+RETRYING = "retrying"
+
+class PermanentError(Exception):
+    """A failure that retrying won't fix (e.g. the capture was deleted)"""
+
+class QueuedJob(AnalysisJob):
+    def __init__(self, key, kind, priority, payload=None, call=None, job_id=None, created_at=None):
+        super().__init__(key, kind)
+        if job_id:
+            self.id = job_id
+        if created_at:
+            self.created_at = created_at
+        self.priority = priority
+        # Durable jobs carry a JSON payload for their kind's handler;
+        # in-memory jobs carry (fn, args, kwargs)
+        self.payload = payload
+        self.call = call
+        self.durable = call is None
+        self.attempts = 0
+        self.strikes = 0  # failures while the backend was otherwise healthy
+        self.next_attempt = 0.0
+        self.probe = False
+        self._entry = None  # current heap entry; older ones are stale
+
+    def to_dict(self, redact=False):
+        """JSON-friendly job state; redact drops chat answers (they belong to one browser session)"""
+        state = super().to_dict()
+        if redact and self.kind == "chat":
+            state['result'] = None
+        state.update(
+            priority=self.priority,
+            attempts=self.attempts,
+            next_attempt=self.next_attempt if self.status == RETRYING else None,
+            durable=self.durable
+        )
+        return state
+
+class JobQueue:
+    def __init__(self, db_path=None, max_workers=4, rate_per_minute=None, burst=1, limits=None,
+                 max_attempts=8, base_delay=2.0, max_delay=300.0, failure_threshold=2,
+                 max_jobs=1000, keep_finished=24 * 3600, event_bus=None, seed=None):
+        self.event_bus = event_bus
+        self.rate_limiter = RateLimiter(rate_per_minute, burst) if rate_per_minute else None
+        self.max_workers = max_workers
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failure_threshold = failure_threshold
+        self.max_jobs = max_jobs
+        self.keep_finished = keep_finished
+        self._rng = random.Random(seed)
+        self._handlers = {}                # kind -> (handler(payload), default priority)
+        self._limits = dict(limits or {})  # kind -> max running at once
+        self._running = {}                 # kind -> running now
+        self._jobs = OrderedDict()         # recent jobs by id, for get()
+        self._inflight = {}                # key -> unfinished job
+        self._ready = []                   # heap of (priority, seq, job)
+        self._delayed = []                 # heap of (next_attempt, seq, job)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._closed = False
+        # Backend health, shared by every job
+        self.failures_in_row = 0
+        self.resume_at = 0.0
+        self.last_error = None
+        self._probing = False
+        self.submitted = 0
+        self.coalesced = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.retried = 0
+        self.probes = 0
+
+        self._conn = None
+        self._db_lock = threading.Lock()
+        if db_path:
+            db_path = pathlib.Path(db_path)
+            db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            with self._conn:
+                self._conn.execute("""
+                    CREATE TABLE IF NOT EXISTS jobs (
+                        id TEXT PRIMARY KEY,
+                        key TEXT NOT NULL,
+                        kind TEXT NOT NULL,
+                        priority INTEGER NOT NULL,
+                        payload TEXT NOT NULL,
+                        status TEXT NOT NULL,
+                        attempts INTEGER NOT NULL DEFAULT 0,
+                        next_attempt REAL NOT NULL DEFAULT 0,
+                        result TEXT,
+                        error TEXT,
+                        created_at REAL NOT NULL,
+                        finished_at REAL
+                    )
+                """)
+                self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, kind)")
+                self._conn.execute("DELETE FROM jobs WHERE finished_at < ?",
+                                   (time.time() - keep_finished,))
+
+        self._threads = [threading.Thread(target=self._worker, daemon=True, name=f"jobs-{n}")
+                         for n in range(max_workers)]
+        for thread in self._threads:
+            thread.start()
+
+    # --- submitting ---
+
+    def register(self, kind, handler, priority=BACKGROUND, max_concurrent=None):
+        """Run durable jobs of kind with handler(payload); resumes any left from an earlier run"""
+        with self._cond:
+            self._handlers[kind] = (handler, priority)
+            if max_concurrent:
+                self._limits[kind] = max_concurrent
+        if not self._conn:
+            return
+        with self._db_lock:
+            rows = self._conn.execute(
+                "SELECT id, key, priority, payload, attempts, next_attempt, created_at FROM jobs "
+                "WHERE kind = ? AND status NOT IN ('done', 'error') ORDER BY created_at", (kind,)
+            ).fetchall()
+        with self._cond:
+            for job_id, key, job_priority, payload, attempts, next_attempt, created_at in rows:
+                if key in self._inflight:
+                    continue
+                job = QueuedJob(key, kind, job_priority, payload=json.loads(payload),
+                                job_id=job_id, created_at=created_at)
+                job.attempts = attempts
+                job.next_attempt = next_attempt
+                job.status = RETRYING if attempts else "queued"
+                self._track(job)
+                self._schedule(job)
+        if rows:
+            print(f"📥 Resuming {len(rows)} queued {kind} jobs")
+
+    def enqueue(self, kind, payload, key=None, priority=None):
+        """Persist and queue a job for kind's handler; an unfinished job with the same key is reused"""
+        with self._cond:
+            if kind not in self._handlers:
+                raise ValueError(f"No handler registered for {kind} jobs")
+            if self._closed:
+                raise RuntimeError("Job queue is shut down")
+            priority = self._handlers[kind][1] if priority is None else priority
+            existing = self._coalesce(key, priority)
+            if existing:
+                return existing
+            job = QueuedJob(key, kind, priority, payload=payload)
+            if key is None:
+                job.key = f"{kind}:{job.id}"
+            self._track(job)
+        # On disk before the caller hears about it
+        self._save(job, insert=True)
+        with self._cond:
+            self._schedule(job)
+        return job
+
+    def submit(self, key, fn, *args, kind="analysis", priority=None, **kwargs):
+        """Queue fn(*args, **kwargs) in memory only; an identical unfinished request returns the existing job"""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Job queue is shut down")
+            if priority is None:
+                priority = self._handlers.get(kind, (None, INTERACTIVE))[1]
+            existing = self._coalesce(key, priority)
+            if existing:
+                return existing
+            job = QueuedJob(key, kind, priority, call=(fn, args, kwargs))
+            self._track(job)
+            self._schedule(job)
+        return job
+
+    def _coalesce(self, key, priority):
+        """Existing unfinished job for key, moved up to priority if that is more urgent (lock held)"""
+        job = self._inflight.get(key)
+        if not job:
+            return None
+        self.coalesced += 1
+        if priority < job.priority and job.status in ("queued", RETRYING):
+            job.priority = priority
+            if job.status == "queued":
+                self._schedule(job)
+            if job.durable:
+                self._save(job)
+        return job
+
+    def _track(self, job):
+        """Remember a new job (lock held)"""
+        self._inflight[job.key] = job
+        self._jobs[job.id] = job
+        self.submitted += 1
+        while len(self._jobs) > self.max_jobs:
+            old_id, old_job = next(iter(self._jobs.items()))
+            if not old_job.done.is_set():
+                break
+            del self._jobs[old_id]
+
+    def _schedule(self, job):
+        """Put a job on the ready or delayed heap (lock held)"""
+        job._entry = entry = (job.priority, next(self._seq), job)
+        if job.next_attempt > time.time():
+            heapq.heappush(self._delayed, (job.next_attempt, entry[1], job))
+        else:
+            heapq.heappush(self._ready, entry)
+        self._cond.notify()
+
+    # --- dispatching ---
+
+    @property
+    def degraded(self):
+        """True while the backend is failing and only probes are sent"""
+        return self.failures_in_row >= self.failure_threshold
+
+    def _next_job(self):
+        """(job, None) for the next job to run, or (None, seconds to wait) (lock held)"""
+        now = time.time()
+        while self._delayed and self._delayed[0][0] <= now:
+            _, _, job = heapq.heappop(self._delayed)
+            if job.status == RETRYING:
+                job._entry = entry = (job.priority, next(self._seq), job)
+                heapq.heappush(self._ready, entry)
+        wait = self._delayed[0][0] - now if self._delayed else None
+        if self.degraded:
+            if now < self.resume_at:
+                return None, self.resume_at - now
+            if self._probing:
+                return None, None
+
+        capped = []
+        job = None
+        while self._ready:
+            entry = heapq.heappop(self._ready)
+            candidate = entry[2]
+            if candidate._entry is not entry or candidate.status not in ("queued", RETRYING):
+                continue
+            limit = self._limits.get(candidate.kind)
+            if limit and self._running.get(candidate.kind, 0) >= limit:
+                capped.append(entry)
+                continue
+            job = candidate
+            break
+        for entry in capped:
+            heapq.heappush(self._ready, entry)
+        return job, wait
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        return
+                    job, wait = self._next_job()
+                    if job:
+                        break
+                    self._cond.wait(wait)
+                job.status = "running"
+                job.started_at = time.time()
+                job.probe = self.degraded
+                if job.probe:
+                    self._probing = True
+                    self.probes += 1
+                self._running[job.kind] = self._running.get(job.kind, 0) + 1
+            self._run(job)
+
+    def _run(self, job):
+        try:
+            if self.rate_limiter:
+                self.rate_limiter.acquire()
+            if job.durable:
+                result = self._handlers[job.kind][0](job.payload)
+            else:
+                fn, args, kwargs = job.call
+                result = fn(*args, **kwargs)
+        except Exception as e:
+            self._failed(job, e)
+        else:
+            self._succeeded(job, result)
+
+    def _succeeded(self, job, result):
+        with self._cond:
+            self._running[job.kind] -= 1
+            recovered = self.failures_in_row > 0
+            self.failures_in_row = 0
+            self.resume_at = 0.0
+            self._probing = False
+            if recovered:
+                # The backend is back: everything waiting out a backoff can go now
+                for _, _, waiting in self._delayed:
+                    waiting.next_attempt = 0.0
+                    if waiting.status == RETRYING:
+                        self._schedule(waiting)
+                self._delayed = []
+            job.result = result
+            job.error = None
+            job.status = "done"
+            self.succeeded += 1
+            self._finish(job)
+        JOB_WAIT_SECONDS.observe(job.finished_at - job.created_at, kind=job.kind)
+        self._after_finish(job)
+
+    def _failed(self, job, error):
+        permanent = isinstance(error, (PermanentError, FileNotFoundError))
+        now = time.time()
+        with self._cond:
+            self._running[job.kind] -= 1
+            job.attempts += 1
+            job.error = str(error)
+            if not permanent:
+                self.last_error = f"{job.kind}: {error}"
+                self.failures_in_row += 1
+                if job.probe:
+                    self._probing = False
+                if self.degraded:
+                    self.resume_at = now + self._backoff(self.failures_in_row - self.failure_threshold + 1)
+                if not job.probe:
+                    # Probes fail because the backend is down, not because of the job
+                    job.strikes += 1
+            if permanent or job.strikes >= self.max_attempts or (self._closed and not job.durable):
+                job.status = "error"
+                self.failed += 1
+                JOB_FAILURES.inc(kind=job.kind)
+                self._finish(job)
+            else:
+                job.status = RETRYING
+                job.next_attempt = now + self._backoff(job.attempts)
+                self.retried += 1
+                JOB_RETRIES.inc(kind=job.kind)
+                self._schedule(job)
+                self._cond.notify_all()
+        if job.done.is_set():
+            print(f"❌ {job.kind} job {job.id} failed: {error}")
+            self._after_finish(job)
+        elif job.durable:
+            self._save(job)
+
+    def _backoff(self, attempt):
+        """Exponential backoff with jitter: between half and all of base * 2^(attempt-1)"""
+        delay = min(self.max_delay, self.base_delay * 2 ** max(0, attempt - 1))
+        return delay / 2 + self._rng.uniform(0, delay / 2)
+
+    def _finish(self, job):
+        """Final state bookkeeping (lock held)"""
+        job.finished_at = time.time()
+        if self._inflight.get(job.key) is job:
+            del self._inflight[job.key]
+        self._cond.notify_all()
+
+    def _after_finish(self, job):
+        if job.durable:
+            self._save(job)
+        job.done.set()
+        if self.event_bus:
+            self.event_bus.publish('analysis', job.to_dict(redact=True))
+
+    # --- persistence ---
+
+    def _save(self, job, insert=False):
+        if not self._conn:
+            return
+        finished = job.status in ("done", "error")
+        result = json.dumps(job.result) if finished and job.result is not None else None
+        with self._db_lock, self._conn:
+            if insert:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO jobs (id, key, kind, priority, payload, status, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (job.id, job.key, job.kind, job.priority, json.dumps(job.payload), job.status,
+                     job.created_at)
+                )
+            else:
+                self._conn.execute(
+                    "UPDATE jobs SET priority = ?, status = ?, attempts = ?, next_attempt = ?, "
+                    "result = ?, error = ?, finished_at = ? WHERE id = ?",
+                    (job.priority, "queued" if job.status == "running" else job.status, job.attempts,
+                     job.next_attempt, result, job.error, job.finished_at, job.id)
+                )
+
+    def _load_finished(self, job_id):
+        """A job from an earlier run, looked up on disk"""
+        if not self._conn:
+            return None
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT key, kind, priority, payload, status, attempts, result, error, created_at, finished_at "
+                "FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if not row or row[4] not in ("done", "error"):
+            return None
+        key, kind, priority, payload, status, attempts, result, error, created_at, finished_at = row
+        job = QueuedJob(key, kind, priority, payload=json.loads(payload), job_id=job_id, created_at=created_at)
+        job.status = status
+        job.attempts = attempts
+        job.result = json.loads(result) if result is not None else None
+        job.error = error
+        job.finished_at = finished_at
+        job.done.set()
+        return job
+
+    # --- inspection and control ---
+
+    def get(self, job_id):
+        """Look up a job by id (recent ones in memory, finished durable ones on disk)"""
+        with self._cond:
+            job = self._jobs.get(job_id)
+        return job or self._load_finished(job_id)
+
+    def jobs(self, status=None, kind=None, limit=50):
+        """Unfinished jobs in dispatch order, then recently finished ones (chat answers redacted)"""
+        with self._cond:
+            pending = sorted(self._inflight.values(), key=lambda j: (j.priority, j.created_at))
+            finished = [j for j in reversed(self._jobs.values()) if j.done.is_set()]
+        selected = [j for j in pending + finished
+                    if (status is None or j.status == status) and (kind is None or j.kind == kind)]
+        return [j.to_dict(redact=True) for j in selected[:limit]]
+
+    def retry_now(self):
+        """Forget the backend's failure streak and make every waiting job due now"""
+        with self._cond:
+            self.failures_in_row = 0
+            self.resume_at = 0.0
+            delayed, self._delayed = self._delayed, []
+            for _, _, job in delayed:
+                job.next_attempt = 0.0
+                if job.status == RETRYING:
+                    self._schedule(job)
+            self._cond.notify_all()
+        return len(delayed)
+
+    def stats(self):
+        """Queue depth per kind and state, backend health and counters"""
+        now = time.time()
+        with self._cond:
+            depth = {}
+            oldest = None
+            for job in self._inflight.values():
+                counts = depth.setdefault(job.kind, {'queued': 0, RETRYING: 0, 'running': 0})
+                counts[job.status] = counts.get(job.status, 0) + 1
+                if oldest is None or job.created_at < oldest:
+                    oldest = job.created_at
+            return {
+                'backend': {
+                    'state': 'degraded' if self.degraded else 'ok',
+                    'failures_in_row': self.failures_in_row,
+                    'resume_in': round(max(0.0, self.resume_at - now), 1) if self.degraded else 0.0,
+                    'last_error': self.last_error
+                },
+                'depth': depth,
+                'in_flight': len(self._inflight),
+                'oldest_pending_s': round(now - oldest, 1) if oldest else None,
+                'submitted': self.submitted,
+                'coalesced': self.coalesced,
+                'succeeded': self.succeeded,
+                'failed': self.failed,
+                'retried': self.retried,
+                'probes': self.probes,
+                'workers': self.max_workers,
+                'limits': dict(self._limits),
+                'tracked_jobs': len(self._jobs),
+                'persistent': self._conn is not None
+            }
+
+    def shutdown(self, wait=True):
+        """Stop dispatching; running jobs finish, durable queued jobs stay on disk for the next start"""
+        with self._cond:
+            self._closed = True
+            # In-memory jobs can't outlive the process
+            abandoned = [job for job in self._inflight.values()
+                         if not job.durable and job.status in ("queued", RETRYING)]
+            for job in abandoned:
+                job.status = "error"
+                job.error = "Job queue shut down"
+                self._finish(job)
+            self._cond.notify_all()
+        for job in abandoned:
+            job.done.set()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+            if self._conn:
+                with self._db_lock:
+                    self._conn.close()
+                    self._conn = None
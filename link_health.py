@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Smart Glasses Link Health
+Connection health tracking and reconnect backoff for the ESP32 serial link.
+"""
+
+import time
+import random
+import threading
+
+class Backoff:
+    def __init__(self, base=0.5, maximum=30.0, factor=2.0, jitter=0.2):
+        self.base = base
+        self.maximum = maximum
+        self.factor = factor
+        self.jitter = jitter
+        self.attempt = 0
+
+    def next_delay(self):
+        """Delay before the next reconnect attempt (exponential with +/- jitter)"""
+        delay = min(self.maximum, self.base * (self.factor ** self.attempt))
+        self.attempt += 1
+        return delay * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def reset(self):
+        self.attempt = 0
+
+class LinkHealth:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connected_since = None
+        self.uptime_total = 0.0
+        self.connects = 0
+        self.reconnects = 0
+        self.connect_failures = 0
+        self.frames = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.consecutive_failures = 0
+        self.last_frame_at = None
+        self.last_heartbeat_at = None
+        self.last_error = None
+        self.last_connect_seconds = None
+
+    def link_up(self, connect_seconds, reconnect=False):
+        """The port is open and the firmware answered"""
+        with self._lock:
+            now = time.time()
+            self.connected_since = now
+            self.last_heartbeat_at = now
+            self.connects += 1
+            if reconnect:
+                self.reconnects += 1
+            self.consecutive_failures = 0
+            self.last_connect_seconds = connect_seconds
+
+    def link_down(self, reason=None):
+        """The port was closed, either deliberately or after an error"""
+        with self._lock:
+            if self.connected_since is not None:
+                self.uptime_total += time.time() - self.connected_since
+            self.connected_since = None
+            if reason:
+                self.last_error = reason
+
+    def connect_failed(self, reason):
+        with self._lock:
+            self.connect_failures += 1
+            self.last_error = reason
+
+    def heartbeat(self):
+        """Any sign of life from the firmware"""
+        with self._lock:
+            self.last_heartbeat_at = time.time()
+
+    def frame_received(self):
+        with self._lock:
+            now = time.time()
+            self.frames += 1
+            self.last_frame_at = now
+            self.last_heartbeat_at = now
+            self.consecutive_failures = 0
+
+    def timeout(self):
+        with self._lock:
+            self.timeouts += 1
+            self.consecutive_failures += 1
+
+    def error(self, reason):
+        with self._lock:
+            self.errors += 1
+            self.consecutive_failures += 1
+            self.last_error = reason
+
+    def stats(self, resyncs=0):
+        """Counters for the status API"""
+        with self._lock:
+            now = time.time()
+            current = now - self.connected_since if self.connected_since else 0.0
+            return {
+                'up': self.connected_since is not None,
+                'uptime_seconds': round(current, 1),
+                'uptime_total_seconds': round(self.uptime_total + current, 1),
+                'connects': self.connects,
+                'reconnects': self.reconnects,
+                'connect_failures': self.connect_failures,
+                'last_connect_seconds': self.last_connect_seconds,
+                'frames': self.frames,
+                'timeouts': self.timeouts,
+                'errors': self.errors,
+                'resyncs': resyncs,
+                'consecutive_failures': self.consecutive_failures,
+                'seconds_since_heartbeat': round(now - self.last_heartbeat_at, 1) if self.last_heartbeat_at else None,
+                'last_error': self.last_error
+            }
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Smart Glasses Load Test
+Starts the server in development mode (python app.py) and production mode
+(python serve.py) against the fake model and compares request throughput
+and latency percentiles on the gallery API.
+
+    python loadtest.py --clients 32 --duration 10
+"""
+
+import os
+import sys
+import time
+import json
+import signal
+import socket
+import argparse
+import threading
+import subprocess
+import http.client
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+MODES = {
+    'dev': [sys.executable, os.path.join(HERE, "app.py")],
+    'waitress': [sys.executable, os.path.join(HERE, "serve.py")]
+}
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_server(mode, port):
+    env = dict(os.environ, PORT=str(port), MODEL_BACKEND="fake", CAPTION_ENABLED="0",
+               CAMERA_DISCOVER="0", CAMERA_PORT="/dev/null-camera")
+    proc = subprocess.Popen(MODES[mode], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/api/cache/stats")
+            conn.getresponse().read()
+            return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError(f"{mode} server did not start")
+
+def paths_for(port):
+    """Mix of gallery requests a browser makes"""
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    conn.request("GET", "/api/images?limit=20")
+    images = json.loads(conn.getresponse().read())['images']
+    paths = ["/api/images?limit=20", "/api/cameras", "/api/cache/stats"]
+    if images:
+        paths.append(f"/api/image/{images[0]['filename']}?size=thumb")
+    return paths
+
+def percentile_ms(sorted_seconds, q):
+    if not sorted_seconds:
+        return float('nan')
+    return sorted_seconds[min(len(sorted_seconds) - 1, int(q * len(sorted_seconds)))] * 1000
+
+def client(port, paths, stop_at, latencies, errors):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    i = 0
+    while time.time() < stop_at:
+        path = paths[i % len(paths)]
+        i += 1
+        t0 = time.perf_counter()
+        try:
+            conn.request("GET", path)
+            response = conn.getresponse()
+            response.read()
+            if response.status >= 500:
+                errors.append(response.status)
+            latencies.append(time.perf_counter() - t0)
+        except (OSError, http.client.HTTPException):
+            errors.append(path)
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+
+def run(mode, clients, duration):
+    port = free_port()
+    proc = start_server(mode, port)
+    try:
+        paths = paths_for(port)
+        latencies, errors = [], []
+        stop_at = time.time() + duration
+        threads = [threading.Thread(target=client, args=(port, paths, stop_at, latencies, errors))
+                   for _ in range(clients)]
+        t0 = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - t0
+    finally:
+        t0 = time.perf_counter()
+        proc.send_signal(signal.SIGTERM)
+        try:
+            proc.wait(timeout=40)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+        shutdown = time.perf_counter() - t0
+    latencies.sort()
+    return {
+        'mode': mode,
+        'requests': len(latencies),
+        'rps': len(latencies) / elapsed,
+        'p50_ms': percentile_ms(latencies, 0.50),
+        'p99_ms': percentile_ms(latencies, 0.99),
+        'errors': len(errors),
+        'shutdown_s': shutdown
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare dev and production serving")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--modes", default="dev,waitress")
+    args = parser.parse_args()
+
+    print(f"🔥 {args.clients} clients x {args.duration:.0f}s per mode")
+    for mode in args.modes.split(","):
+        r = run(mode, args.clients, args.duration)
+        print(f"  {r['mode']:<9} {r['rps']:8.0f} req/s   p50 {r['p50_ms']:7.1f} ms   "
+              f"p99 {r['p99_ms']:7.1f} ms   errors {r['errors']}   shutdown {r['shutdown_s']:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Smart Glasses Metrics
+Minimal Prometheus-style counters and histograms rendered in the text
+exposition format, plus an on-demand per-request cProfile hook.
+"""
+
+import io
+import time
+import pstats
+import random
+import cProfile
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+# Buckets in seconds, from sub-millisecond queries to multi-second model calls
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (4096, 8192, 16384, 32768, 65536, 131072, 262144, 524288)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _label_text(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(n, "") for n in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_label_text(self.labels, key)} {value}")
+        return lines
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(n, "") for n in self.labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of a with-block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f"{self.name}_bucket{_label_text(self.labels + ('le',), key + (bound,))} {count}")
+                lines.append(f"{self.name}_bucket{_label_text(self.labels + ('le',), key + ('+Inf',))} {series[-1]}")
+                lines.append(f"{self.name}_sum{_label_text(self.labels, key)} {series[-2]:.6f}")
+                lines.append(f"{self.name}_count{_label_text(self.labels, key)} {series[-1]}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name, help_text, labels, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, labels, **kwargs)
+            return metric
+
+    def counter(self, name, help_text, labels=()):
+        return self._register(Counter, name, help_text, labels)
+
+    def histogram(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram, name, help_text, labels, buckets=buckets)
+
+    def render(self):
+        """All metrics in Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+# Process-wide registry; modules register their metrics at import time
+REGISTRY = Registry()
+
+class RequestProfiler:
+    def __init__(self, keep=20, top=25):
+        # Off by default; when on, a sampled fraction of requests runs under cProfile
+        self.enabled = False
+        self.sample_rate = 1.0
+        self.top = top
+        self.profiles = deque(maxlen=keep)
+        # cProfile can only profile one request at a time safely
+        self._busy = threading.Lock()
+
+    def configure(self, enabled, sample_rate=None):
+        self.enabled = bool(enabled)
+        if sample_rate is not None:
+            self.sample_rate = min(1.0, max(0.0, float(sample_rate)))
+
+    def start(self):
+        """Profiler for this request, or None if it isn't sampled"""
+        if not self.enabled or random.random() >= self.sample_rate:
+            return None
+        if not self._busy.acquire(blocking=False):
+            return None
+        profile = cProfile.Profile()
+        profile.enable()
+        return profile
+
+    def finish(self, profile, route, seconds):
+        """Stop a request's profiler and keep its top functions"""
+        profile.disable()
+        self._busy.release()
+        out = io.StringIO()
+        pstats.Stats(profile, stream=out).sort_stats("cumulative").print_stats(self.top)
+        self.profiles.append({
+            'route': route,
+            'seconds': round(seconds, 6),
+            'at': time.time(),
+            'stats': out.getvalue()
+        })
+
+    def stats(self):
+        return {
+            'enabled': self.enabled,
+            'sample_rate': self.sample_rate,
+            'profiles': list(self.profiles)
+        }
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Smart Glasses Model Clients
+Thin wrappers around the generative model so the rest of the system can run
+against Gemini or a local fake with the same interface:
+
+    client.generate(parts) -> str
+    client.generate_stream(parts) -> iterator of text chunks
+"""
+
+import time
+import random
+import hashlib
+import threading
+from collections import deque
+from metrics import REGISTRY
+
+MODEL_SECONDS = REGISTRY.histogram(
+    "model_request_seconds", "Model call latency (streamed calls: until the last chunk)", ("model", "mode"))
+MODEL_FIRST_CHUNK_SECONDS = REGISTRY.histogram(
+    "model_first_chunk_seconds", "Time to first chunk of streamed model calls", ("model",))
+MODEL_ERRORS = REGISTRY.counter(
+    "model_errors_total", "Failed model calls", ("model", "mode"))
+
+class GeminiClient:
+    def __init__(self, api_key, model_name="gemini-1.5-flash"):
+        import google.generativeai as genai
+        genai.configure(api_key=api_key)
+        self.model_name = model_name
+        self.model = genai.GenerativeModel(model_name)
+
+    def generate(self, parts):
+        """Run one generate_content call and return the response text"""
+        response = self.model.generate_content(parts)
+        return response.text
+
+    def generate_stream(self, parts):
+        """Yield response text as Gemini produces it"""
+        for chunk in self.model.generate_content(parts, stream=True):
+            if chunk.text:
+                yield chunk.text
+
+def parse_outages(spec):
+    """"30-60,120-180" -> [(30.0, 60.0), (120.0, 180.0)] (seconds after start)"""
+    outages = []
+    for part in filter(None, (spec or "").replace(" ", "").split(",")):
+        start, end = part.split("-")
+        outages.append((float(start), float(end)))
+    return outages
+
+class FakeModelClient:
+    def __init__(self, latency=0.5, model_name="fake-model", chunk_interval=0.05, chunk_words=3,
+                 outages=None, outage_period=None, failure_rate=0.0, seed=0):
+        # Streaming: the first chunk arrives after latency, then one every chunk_interval.
+        # Failures on a schedule: calls raise ConnectionError during outages,
+        # (start, end) seconds after the client was created and repeating every
+        # outage_period seconds if set, and at random with failure_rate.
+        self.model_name = model_name
+        self.latency = latency
+        self.chunk_interval = chunk_interval
+        self.chunk_words = chunk_words
+        self.outages = list(outages or [])
+        self.outage_period = outage_period
+        self.failure_rate = failure_rate
+        self._rng = random.Random(seed)
+        self._started = time.monotonic()
+        self.calls = 0
+        self.failures = 0
+
+    def available(self, now=None):
+        """False while a scheduled outage is in progress"""
+        elapsed = (time.monotonic() if now is None else now) - self._started
+        if self.outage_period:
+            elapsed %= self.outage_period
+        return not any(start <= elapsed < end for start, end in self.outages)
+
+    def _check(self):
+        if not self.available():
+            self.failures += 1
+            raise ConnectionError("Fake model unavailable (scheduled outage)")
+        if self.failure_rate and self._rng.random() < self.failure_rate:
+            self.failures += 1
+            raise ConnectionError("Fake model request failed")
+
+    def _describe(self, parts):
+        """Deterministic response text derived from the request"""
+        if isinstance(parts, str):
+            parts = [parts]
+        digest = hashlib.sha256()
+        texts = []
+        images = 0
+        for part in parts:
+            if isinstance(part, dict):
+                digest.update(part.get("data", b""))
+                images += 1
+            else:
+                digest.update(str(part).encode())
+                texts.append(str(part))
+        prompt = texts[0].splitlines()[0] if texts else ""
+        return (f"Fake response #{self.calls} for {images} image(s) "
+                f"[{digest.hexdigest()[:8]}]: {prompt[:80]}")
+
+    def generate(self, parts):
+        """Sleep for the configured latency and return a canned response"""
+        self.calls += 1
+        self._check()
+        time.sleep(self.latency)
+        return self._describe(parts)
+
+    def generate_stream(self, parts):
+        """Emit the canned response a few words at a time with timed gaps"""
+        self.calls += 1
+        self._check()
+        words = self._describe(parts).split(" ")
+        time.sleep(self.latency)
+        for i in range(0, len(words), self.chunk_words):
+            if i:
+                time.sleep(self.chunk_interval)
+            yield " ".join(words[i:i + self.chunk_words]) + (" " if i + self.chunk_words < len(words) else "")
+
+def _percentile_ms(sorted_seconds, q):
+    if not sorted_seconds:
+        return None
+    return round(sorted_seconds[min(len(sorted_seconds) - 1, int(q * len(sorted_seconds)))] * 1000, 1)
+
+class StreamStats:
+    def __init__(self, window=256):
+        # Time-to-first-token and total time of recent streamed responses
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.streams = 0
+        self.errors = 0
+
+    def timed(self, chunks, on_first=None):
+        """Wrap a chunk iterator, recording when the first and last chunks arrive"""
+        start = time.perf_counter()
+        first = None
+        try:
+            for chunk in chunks:
+                if first is None:
+                    first = time.perf_counter() - start
+                    if on_first:
+                        on_first(first)
+                yield chunk
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+        with self._lock:
+            self.streams += 1
+            self._samples.append((first if first is not None else 0.0, time.perf_counter() - start))
+
+    def stats(self):
+        with self._lock:
+            samples = list(self._samples)
+            streams, errors = self.streams, self.errors
+        ttft = sorted(s[0] for s in samples)
+        total = sorted(s[1] for s in samples)
+        return {
+            'streams': streams,
+            'errors': errors,
+            'ttft_p50_ms': _percentile_ms(ttft, 0.5),
+            'ttft_p95_ms': _percentile_ms(ttft, 0.95),
+            'total_p50_ms': _percentile_ms(total, 0.5)
+        }
+
+class MeteredClient:
+    def __init__(self, client):
+        # Same interface as the wrapped client, with latency/error metrics
+        self.client = client
+        self.model_name = client.model_name
+
+    def generate(self, parts):
+        start = time.perf_counter()
+        try:
+            return self.client.generate(parts)
+        except Exception:
+            MODEL_ERRORS.inc(model=self.model_name, mode="generate")
+            raise
+        finally:
+            MODEL_SECONDS.observe(time.perf_counter() - start, model=self.model_name, mode="generate")
+
+    def generate_stream(self, parts):
+        start = time.perf_counter()
+        first = True
+        try:
+            for chunk in self.client.generate_stream(parts):
+                if first:
+                    MODEL_FIRST_CHUNK_SECONDS.observe(time.perf_counter() - start, model=self.model_name)
+                    first = False
+                yield chunk
+        except Exception:
+            MODEL_ERRORS.inc(model=self.model_name, mode="stream")
+            raise
+        finally:
+            MODEL_SECONDS.observe(time.perf_counter() - start, model=self.model_name, mode="stream")
+
+    def __getattr__(self, name):
+        # Backend-specific settings (e.g. the fake client's latency)
+        return getattr(self.client, name)
+
+def create_model_client(api_key=None, backend="gemini", model_name="gemini-1.5-flash", fake_latency=0.5,
+                        fake_outages=None, fake_outage_period=None, fake_failure_rate=0.0):
+    """Build the configured client, or None if Gemini has no API key"""
+    if backend == "fake":
+        return MeteredClient(FakeModelClient(latency=fake_latency, outages=fake_outages,
+                                             outage_period=fake_outage_period,
+                                             failure_rate=fake_failure_rate))
+    if not api_key:
+        return None
+    return MeteredClient(GeminiClient(api_key, model_name))
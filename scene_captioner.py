@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Smart Glasses Scene Captioner
+Background stage that stores a short description of every capture once, so
+chat can be grounded in what was seen without sending images on each turn.
+"""
+
+import threading
+from job_queue import PermanentError
+
+CAPTION_PROMPT = """Describe this frame from a pair of smart glasses in one or two sentences.
+Name the place, the main objects and any people or activity. Explicitly mention small
+personal items (keys, phone, wallet, glasses) and any readable text. No preamble."""
+
+class SceneCaptioner:
+    def __init__(self, catalog, caption_fn, queue, event_bus=None, model_name=None, backfill=50):
+        # caption_fn(image_path) -> caption text; raises on failure.
+        # Captions are durable "caption" jobs on queue, run by caption_job
+        self.catalog = catalog
+        self.caption_fn = caption_fn
+        self.queue = queue
+        self.event_bus = event_bus
+        self.model_name = model_name
+        self.backfill = backfill
+        # Called as listener(image, caption) after each caption is stored
+        self.caption_listeners = []
+        self.captioned = 0
+        self.failures = 0
+        self._running = False
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Caption recent uncaptioned captures, then follow new ones as they arrive"""
+        if self._running:
+            return
+        self._running = True
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="captioner")
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=2.0)
+
+    def _loop(self):
+        sub = self.event_bus.subscribe() if self.event_bus else None
+        try:
+            self._submit_backlog()
+            while self._running:
+                if sub is None:
+                    # No event bus: poll the catalog instead
+                    self._stop_event.wait(5.0)
+                    self._submit_backlog()
+                    continue
+                event = sub.get(timeout=1.0)
+                if sub.overflowed:
+                    sub.overflowed = False
+                    self._submit_backlog()
+                if event and event['type'] == 'capture' and event['data'].get('id'):
+                    self.submit(event['data'])
+        finally:
+            if sub:
+                sub.close()
+
+    def _submit_backlog(self):
+        for image in self.catalog.uncaptioned(self.backfill):
+            self.submit(image)
+
+    def submit(self, image, priority=None):
+        """Queue captioning of one catalog entry; repeated submits share a job"""
+        return self.queue.enqueue("caption", {'capture_id': image['id']},
+                                  key=f"caption:{image['id']}", priority=priority)
+
+    def caption_job(self, payload):
+        """Queue handler: caption one capture by catalog id"""
+        image = self.catalog.get_by_id(payload['capture_id'])
+        if image is None:
+            raise PermanentError(f"Capture {payload['capture_id']} no longer exists")
+        return self._caption(image)
+
+    def _caption(self, image):
+        existing = self.catalog.get_caption(image['id'])
+        if existing:
+            return existing
+        try:
+            caption = self.caption_fn(image['path']).strip()
+        except Exception:
+            self.failures += 1
+            raise
+        self.catalog.set_caption(image['id'], caption, self.model_name)
+        self.captioned += 1
+        for listener in self.caption_listeners:
+            try:
+                listener(image, caption)
+            except Exception as e:
+                print(f"⚠️  Caption listener failed: {e}")
+        return caption
+
+    def stats(self):
+        return {'captioned': self.captioned, 'failures': self.failures, 'running': self._running}
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Smart Glasses Production Server
+Runs the web app under waitress: one process (the cameras, catalog and event
+bus are owned by a single process) with a pool of request threads.
+
+    python serve.py                  # 0.0.0.0:5000, 32 threads
+    PORT=8080 SERVER_THREADS=64 python serve.py
+"""
+
+import os
+import signal
+from waitress import create_server
+from app import create_app, shutdown_services
+
+def main():
+    host = os.getenv('HOST', '0.0.0.0')
+    port = int(os.getenv('PORT', '5000'))
+    # Each open event stream (gallery tab, analysis, chat) holds a thread
+    threads = int(os.getenv('SERVER_THREADS', '32'))
+
+    app = create_app()
+    server = create_server(app, host=host, port=port, threads=threads,
+                           channel_timeout=60, connection_limit=threads * 4)
+
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+    signal.signal(signal.SIGTERM, stop)
+
+    print(f"🚀 Smart Glasses server on http://{host}:{port} ({threads} threads)")
+    try:
+        server.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print("\n🛑 Shutting down server...")
+        server.close()
+        shutdown_services()
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,6 @@ Smart Glasses System Setup Script
 Sets up the environment and checks configuration for the smart glasses system.
 """
 
-import os
 import sys
 import subprocess
 from pathlib import Path
@@ -64,26 +63,19 @@ def check_serial_ports():
     """Check for available serial ports"""
     print("\n🔌 Checking for available serial ports...")
     
-    # Check for common ESP32 ports
-    common_ports = [
-        "/dev/cu.usbmodem101",  # macOS
-        "/dev/cu.usbmodem2101", # macOS alternative
-        "/dev/ttyUSB0",         # Linux
-        "/dev/ttyUSB1",         # Linux alternative
-        "COM3",                 # Windows
-        "COM4",                 # Windows alternative
-    ]
-    
-    available_ports = []
-    for port in common_ports:
-        if os.path.exists(port):
-            available_ports.append(port)
+    try:
+        from camera_manager import discover_ports
+        available_ports = discover_ports()
+    except ImportError:
+        print("⚠️  pyserial not installed, skipping port discovery")
+        return True
     
     if available_ports:
-        print(f"✅ Found potential ESP32 ports: {', '.join(available_ports)}")
-        print("💡 Update arduino_camera.py if your ESP32 uses a different port")
+        for found in available_ports:
+            print(f"✅ Found potential ESP32 port: {found['port']} ({found['description']})")
+        print("💡 Set CAMERA_PORT in .env to pick the default camera; others are registered automatically")
     else:
-        print("⚠️  No common ESP32 ports found")
+        print("⚠️  No ESP32 serial ports found")
         print("💡 Connect your ESP32 and check the port manually")
     
     return True
@@ -4,6 +4,7 @@ class SmartGlassesApp {
     constructor() {
         this.cameraRunning = false;
         this.currentImages = [];
+        this.pageSize = 40;
         this.selectedImage = null;
         
         this.init();
@@ -14,23 +15,58 @@ class SmartGlassesApp {
         this.checkCameraStatus();
         this.loadImages();
         this.loadChatHistory();
-        
-        // Auto-refresh images every 30 seconds
-        setInterval(() => {
-            if (this.cameraRunning) {
-                this.loadImages();
+        this.connectEvents();
+    }
+
+    connectEvents() {
+        // Server pushes new captures and camera state; no polling needed
+        this.events = new EventSource('/api/events');
+        this.events.addEventListener('capture', (e) => this.addImage(JSON.parse(e.data)));
+        this.events.addEventListener('camera', (e) => {
+            const state = JSON.parse(e.data);
+            // The dashboard controls the default camera; others report their own state
+            if (state.camera === 'default') {
+                this.updateCameraStatus(state.running, state.connected);
             }
-        }, 30000);
+        });
+        // We missed events (slow tab or server restart): fetch what was added meanwhile
+        this.events.addEventListener('resync', () => {
+            this.checkCameraStatus();
+            this.refreshImages();
+        });
+        this.events.addEventListener('open', () => {
+            if (this.eventsDisconnected) {
+                this.eventsDisconnected = false;
+                this.checkCameraStatus();
+                this.refreshImages();
+            }
+        });
+        this.events.onerror = () => {
+            this.eventsDisconnected = true;
+        };
     }
 
     bindEvents() {
         // Camera controls
         document.getElementById('camera-toggle').addEventListener('click', () => this.toggleCamera());
         document.getElementById('capture-single').addEventListener('click', () => this.captureSingle());
-        document.getElementById('refresh-images').addEventListener('click', () => this.loadImages());
+        document.getElementById('refresh-images').addEventListener('click', () => this.refreshImages());
+
+        // Infinite scroll: older captures load when the end of the gallery comes into view
+        this.galleryObserver = new IntersectionObserver((entries) => {
+            if (entries.some(entry => entry.isIntersecting) && this.imagesBefore) {
+                this.loadOlderImages();
+            }
+        }, { rootMargin: '400px' });
+        this.galleryObserver.observe(document.getElementById('gallery-more'));
 
         // Chat
         document.getElementById('chat-form').addEventListener('submit', (e) => this.submitChat(e));
+        document.getElementById('chat-messages').addEventListener('scroll', (e) => {
+            if (e.target.scrollTop === 0 && this.chatHistoryBefore) {
+                this.loadChatHistory(this.chatHistoryBefore);
+            }
+        });
         
         // Modal
         document.getElementById('close-modal').addEventListener('click', () => this.closeModal());
@@ -120,8 +156,8 @@ class SmartGlassesApp {
             const result = await response.json();
 
             if (response.ok) {
+                // The new image arrives through the 'capture' event
                 this.showToast('Image captured successfully!', 'success');
-                setTimeout(() => this.loadImages(), 1000); // Refresh images after 1 second
             } else {
                 this.showToast(result.error || 'Capture failed', 'error');
             }
@@ -135,17 +171,64 @@ class SmartGlassesApp {
     }
 
     async loadImages() {
+        // Head of the gallery; an unchanged list comes back as a 304 and isn't re-rendered
         try {
-            const response = await fetch('/api/images');
-            const images = await response.json();
-            this.currentImages = images;
-            this.renderImages(images);
+            const headers = this.imagesEtag ? { 'If-None-Match': this.imagesEtag } : {};
+            const response = await fetch(`/api/images?limit=${this.pageSize}`, { headers, cache: 'no-store' });
+            if (response.status === 304) return;
+            const page = await response.json();
+            this.imagesEtag = response.headers.get('ETag');
+            this.imagesBefore = page.before;
+            this.imagesCursor = page.cursor;
+            this.currentImages = page.images;
+            this.renderImages(page.images);
         } catch (error) {
             console.error('Error loading images:', error);
             this.showToast('Error loading images', 'error');
         }
     }
 
+    async refreshImages() {
+        // Only captures added since the last response; the rest of the gallery stays as is
+        if (this.imagesCursor == null) return this.loadImages();
+        try {
+            let more = true;
+            while (more) {
+                const response = await fetch(`/api/images?since=${this.imagesCursor}&limit=100`);
+                const page = await response.json();
+                // Oldest first, so the newest ends up on top
+                page.images.slice().reverse().forEach(image => this.addImage(image));
+                this.imagesCursor = page.cursor;
+                more = page.more;
+            }
+        } catch (error) {
+            console.error('Error refreshing images:', error);
+            this.showToast('Error loading images', 'error');
+        }
+    }
+
+    async loadOlderImages() {
+        if (this.imagesLoading) return;
+        this.imagesLoading = true;
+        try {
+            const response = await fetch(`/api/images?before=${this.imagesBefore}&limit=${this.pageSize}`);
+            const page = await response.json();
+            const known = new Set(this.currentImages.map(img => img.filename));
+            const older = page.images.filter(img => !known.has(img.filename));
+            this.currentImages.push(...older);
+            this.imagesBefore = page.before;
+
+            const gallery = document.getElementById('image-gallery').querySelector('.grid');
+            const first = gallery.children.length;
+            gallery.insertAdjacentHTML('beforeend', older.map(image => this.imageTileHtml(image)).join(''));
+            Array.from(gallery.children).slice(first).forEach(item => this.bindImageTile(item));
+        } catch (error) {
+            console.error('Error loading older images:', error);
+        } finally {
+            this.imagesLoading = false;
+        }
+    }
+
     renderImages(images) {
         const gallery = document.getElementById('image-gallery').querySelector('.grid');
         const noImages = document.getElementById('no-images');
@@ -157,9 +240,16 @@ class SmartGlassesApp {
         }
 
         noImages.style.display = 'none';
-        gallery.innerHTML = images.map(image => `
+        gallery.innerHTML = images.map(image => this.imageTileHtml(image)).join('');
+
+        // Add click handlers to images
+        gallery.querySelectorAll('.image-item').forEach(item => this.bindImageTile(item));
+    }
+
+    imageTileHtml(image) {
+        return `
             <div class="image-item bg-gray-700 rounded-lg cursor-pointer" data-filename="${image.filename}">
-                <img src="/api/image/${image.filename}" alt="Captured at ${image.timestamp}" loading="lazy">
+                <img src="/api/image/${image.filename}?size=thumb" alt="Captured at ${image.timestamp}" loading="lazy">
                 <div class="image-overlay">
                     <i class="fas fa-search-plus"></i>
                 </div>
@@ -168,17 +258,27 @@ class SmartGlassesApp {
                     <div class="text-gray-300">${image.timestamp}</div>
                 </div>
             </div>
-        `).join('');
+        `;
+    }
 
-        // Add click handlers to images
-        gallery.querySelectorAll('.image-item').forEach(item => {
-            item.addEventListener('click', () => {
-                const filename = item.dataset.filename;
-                this.openImageModal(filename);
-            });
+    bindImageTile(item) {
+        item.addEventListener('click', () => {
+            const filename = item.dataset.filename;
+            this.openImageModal(filename);
         });
     }
 
+    addImage(image) {
+        // Prepend a single pushed capture instead of re-rendering the gallery
+        if (this.currentImages.some(img => img.filename === image.filename)) return;
+        this.currentImages.unshift(image);
+
+        const gallery = document.getElementById('image-gallery').querySelector('.grid');
+        document.getElementById('no-images').style.display = 'none';
+        gallery.insertAdjacentHTML('afterbegin', this.imageTileHtml(image));
+        this.bindImageTile(gallery.firstElementChild);
+    }
+
     openImageModal(filename) {
         this.selectedImage = filename;
         const image = this.currentImages.find(img => img.filename === filename);
@@ -209,17 +309,35 @@ class SmartGlassesApp {
         analysisDiv.innerHTML = '<div class="loading-spinner"></div> Analyzing image...';
 
         try {
-            const response = await fetch(`/api/analyze/${this.selectedImage}`, {
+            // Streamed: render the answer as the model produces it
+            const response = await fetch(`/api/analyze/${this.selectedImage}/stream`, {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify({ question: question || null })
             });
 
-            const result = await response.json();
-
             if (response.ok) {
-                analysisDiv.innerHTML = this.formatAnalysis(result.analysis);
+                let text = '';
+                await this.readEventStream(response, {
+                    chunk: (data) => {
+                        text += data.text;
+                        analysisDiv.innerHTML = this.formatAnalysis(text);
+                    },
+                    error: (data) => {
+                        analysisDiv.innerHTML = `<span class="text-red-400">Error: ${data.error}</span>`;
+                    },
+                    queued: (data) => {
+                        // Model unreachable: the server keeps the request and retries it
+                        analysisDiv.innerHTML = '<i class="fas fa-clock mr-1"></i>Offline - analysis queued, it will appear here when the connection is back.';
+                        this.followJob(data.job_id, (job) => {
+                            analysisDiv.innerHTML = job.status === 'done'
+                                ? this.formatAnalysis(job.result)
+                                : `<span class="text-red-400">Error: ${job.error}</span>`;
+                        });
+                    }
+                });
             } else {
+                const result = await response.json();
                 analysisDiv.innerHTML = `<span class="text-red-400">Error: ${result.error}</span>`;
             }
         } catch (error) {
@@ -249,18 +367,46 @@ class SmartGlassesApp {
         this.addTypingIndicator();
 
         try {
-            const response = await fetch('/api/chat', {
+            const response = await fetch('/api/chat/stream', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify({ message })
             });
 
-            const result = await response.json();
-            this.removeTypingIndicator();
-
             if (response.ok) {
-                this.addChatMessage(result.response, 'ai');
+                let text = '';
+                let content = null;
+                await this.readEventStream(response, {
+                    chunk: (data) => {
+                        text += data.text;
+                        if (!content) {
+                            // First words arrived: swap the typing indicator for the answer
+                            this.removeTypingIndicator();
+                            this.addChatMessage(text, 'ai');
+                            content = document.querySelector('#chat-messages .chat-message.ai:last-child .message-content');
+                        } else {
+                            content.innerHTML = this.formatMessage(text);
+                        }
+                        const messagesContainer = document.getElementById('chat-messages');
+                        messagesContainer.scrollTop = messagesContainer.scrollHeight;
+                    },
+                    error: (data) => {
+                        this.removeTypingIndicator();
+                        this.addChatMessage(`Error: ${data.error}`, 'ai');
+                    },
+                    queued: (data) => {
+                        this.removeTypingIndicator();
+                        this.addChatMessage('Offline - your message is queued and will be answered when the connection is back.', 'ai');
+                        const pending = document.querySelector('#chat-messages .chat-message.ai:last-child .message-content');
+                        this.followJob(data.job_id, (job) => {
+                            pending.innerHTML = this.formatMessage(job.status === 'done' ? job.result : `Error: ${job.error}`);
+                        });
+                    }
+                });
+                this.removeTypingIndicator();
             } else {
+                const result = await response.json();
+                this.removeTypingIndicator();
                 this.addChatMessage(`Error: ${result.error}`, 'ai');
             }
         } catch (error) {
@@ -270,19 +416,56 @@ class SmartGlassesApp {
         }
     }
 
-    addChatMessage(message, sender) {
+    followJob(jobId, onDone) {
+        // Queued jobs finish whenever the backend recovers; the job stream reports it
+        const source = new EventSource(`/api/jobs/${jobId}/stream`);
+        source.addEventListener('done', (e) => {
+            source.close();
+            onDone(JSON.parse(e.data));
+        });
+    }
+
+    async readEventStream(response, handlers) {
+        // Minimal server-sent events parser for POST responses (EventSource is GET-only)
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const block = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+                let event = 'message';
+                let data = '';
+                block.split('\n').forEach(line => {
+                    if (line.startsWith('event: ')) event = line.slice(7);
+                    else if (line.startsWith('data: ')) data += line.slice(6);
+                });
+                if (data && handlers[event]) handlers[event](JSON.parse(data));
+            }
+        }
+    }
+
+    addChatMessage(message, sender, timestamp = null, before = null) {
         const messagesContainer = document.getElementById('chat-messages');
         const messageDiv = document.createElement('div');
         messageDiv.className = `chat-message ${sender}`;
         
-        const timestamp = new Date().toLocaleTimeString();
         messageDiv.innerHTML = `
             <div class="message-content">${this.formatMessage(message)}</div>
-            <div class="timestamp">${timestamp}</div>
+            <div class="timestamp">${timestamp || new Date().toLocaleTimeString()}</div>
         `;
 
-        messagesContainer.appendChild(messageDiv);
-        messagesContainer.scrollTop = messagesContainer.scrollHeight;
+        if (before) {
+            // Older history goes above what is already shown
+            messagesContainer.insertBefore(messageDiv, before);
+        } else {
+            messagesContainer.appendChild(messageDiv);
+            messagesContainer.scrollTop = messagesContainer.scrollHeight;
+        }
 
         // Remove welcome message if it exists
         const welcomeMessage = messagesContainer.querySelector('.text-center');
@@ -319,17 +502,31 @@ class SmartGlassesApp {
             .replace(/\*(.*?)\*/g, '<em>$1</em>');
     }
 
-    async loadChatHistory() {
+    async loadChatHistory(before = null) {
+        // History is paged: the latest turns first, older pages when scrolled to the top
+        if (this.chatHistoryLoading) return;
+        this.chatHistoryLoading = true;
         try {
-            const response = await fetch('/api/chat/history');
-            const history = await response.json();
+            const url = before ? `/api/chat/history?before=${before}` : '/api/chat/history';
+            const response = await fetch(url);
+            const page = await response.json();
+            const messagesContainer = document.getElementById('chat-messages');
+            const anchor = before ? messagesContainer.querySelector('.chat-message') : null;
+            const previousHeight = messagesContainer.scrollHeight;
             
-            history.forEach(chat => {
-                this.addChatMessage(chat.user_message, 'user');
-                this.addChatMessage(chat.ai_response, 'ai');
+            page.turns.forEach(chat => {
+                this.addChatMessage(chat.user_message, 'user', chat.timestamp, anchor);
+                this.addChatMessage(chat.ai_response, 'ai', chat.timestamp, anchor);
             });
+            if (anchor) {
+                // Keep the messages the user was looking at in place
+                messagesContainer.scrollTop = messagesContainer.scrollHeight - previousHeight;
+            }
+            this.chatHistoryBefore = page.before;
         } catch (error) {
             console.error('Error loading chat history:', error);
+        } finally {
+            this.chatHistoryLoading = false;
         }
     }
 
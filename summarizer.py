@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Smart Glasses Summarizer
+"What did I do in the last hour": picks keyframes from a time window by
+perceptual hash, captions them in parallel (reusing stored captions), then
+reduces the captions map-reduce style. First-level partial summaries cover
+fixed clock buckets, so overlapping windows hit the cache for every bucket
+they share.
+"""
+
+import time
+from datetime import datetime
+from analysis_cache import cache_key
+from job_queue import INTERACTIVE
+
+SUMMARY_PROMPT = """Below are {kind} from a pair of smart glasses between {start} and {end}, in order.
+Summarize what the wearer did in a short paragraph: places, activities, people and notable
+objects, in time order with approximate times. Merge repetition. No preamble.
+
+{notes}"""
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+def select_keyframes(frames, max_frames=48, max_distance=10, min_gap=60.0):
+    """Group frames (oldest first) into scenes and pick one frame per scene.
+
+    A scene ends when a frame's hash is more than max_distance bits from the
+    scene's first frame (or, without hashes, after min_gap seconds). Each
+    scene is represented by an already-captioned frame when there is one.
+    Returns (frame, scene_start, scene_end) tuples, evenly thinned to
+    max_frames.
+    """
+    scenes = []
+    for frame in frames:
+        if scenes:
+            first = scenes[-1][0]
+            if first['phash'] is not None and frame['phash'] is not None:
+                same = hamming(first['phash'], frame['phash']) <= max_distance
+            else:
+                same = frame['captured_at'] - first['captured_at'] < min_gap
+            if same:
+                scenes[-1].append(frame)
+                continue
+        scenes.append([frame])
+
+    keyframes = []
+    for scene in scenes:
+        captioned = [f for f in scene if f.get('caption')]
+        pick = captioned[0] if captioned else scene[len(scene) // 2]
+        keyframes.append((pick, scene[0]['captured_at'], scene[-1]['captured_at']))
+    if len(keyframes) > max_frames:
+        step = len(keyframes) / max_frames
+        keyframes = [keyframes[int(i * step)] for i in range(max_frames)]
+    return keyframes
+
+def clock(ts):
+    return datetime.fromtimestamp(ts).strftime("%H:%M")
+
+class Summarizer:
+    def __init__(self, catalog, captioner, generate_fn, executor, cache, model_name,
+                 max_frames=48, bucket_seconds=600.0, group_size=8, deadline=120.0):
+        # generate_fn(prompt) -> text; runs on the shared model job queue
+        self.catalog = catalog
+        self.captioner = captioner
+        self.generate_fn = generate_fn
+        self.executor = executor
+        self.cache = cache
+        self.model_name = model_name
+        self.max_frames = max_frames
+        self.bucket_seconds = bucket_seconds
+        self.group_size = group_size
+        self.deadline = deadline
+        self.summaries = 0
+
+    def summarize(self, start, end, camera=None):
+        """Summary of [start, end] plus per-stage counts; latency is bounded by the deadline"""
+        started = time.monotonic()
+        deadline = started + self.deadline
+        stats = {'frames': 0, 'keyframes': 0, 'captions_reused': 0, 'captions_new': 0,
+                 'captions_missing': 0, 'partials_cached': 0, 'model_calls': 0}
+
+        # 1. Select
+        frames = self.catalog.window(start, end, camera=camera)
+        stats['frames'] = len(frames)
+        if not frames:
+            return {'summary': None, 'start': start, 'end': end, 'camera': camera,
+                    'stats': stats, 'seconds': 0.0}
+
+        # 2. Dedup / keyframes
+        keyframes = select_keyframes(frames, self.max_frames)
+        stats['keyframes'] = len(keyframes)
+
+        # 3. Caption keyframes in parallel; stored captions cost nothing
+        jobs = {}
+        for frame, _, _ in keyframes:
+            if frame.get('caption'):
+                stats['captions_reused'] += 1
+            else:
+                # Someone is waiting: these run ahead of the background caption backlog
+                jobs[frame['id']] = self.captioner.submit(frame, priority=INTERACTIVE)
+        # Captions get half the time budget so the reduce steps always get the rest
+        caption_deadline = started + self.deadline / 2
+        for job in jobs.values():
+            if job.wait(max(0.0, caption_deadline - time.monotonic())) and job.status == "done":
+                stats['captions_new'] += 1
+            else:
+                stats['captions_missing'] += 1
+        notes = []
+        for frame, scene_start, scene_end in keyframes:
+            job = jobs.get(frame['id'])
+            caption = frame.get('caption') or (job.result if job and job.status == "done" else None)
+            if caption:
+                span = clock(scene_start) if scene_end - scene_start < 60 else f"{clock(scene_start)}-{clock(scene_end)}"
+                notes.append((scene_start, f"[{span}] {caption.strip()}"))
+
+        # 4. Reduce: one partial per clock bucket, then groups of partials, then the summary
+        buckets = {}
+        for ts, line in notes:
+            buckets.setdefault(int(ts // self.bucket_seconds), []).append(line)
+        items = [(b * self.bucket_seconds, (b + 1) * self.bucket_seconds, lines)
+                 for b, lines in sorted(buckets.items())]
+        summary = None
+        if len(items) == 1:
+            # The window sits inside one bucket: summarize its captions directly
+            lo, hi, lines = items[0]
+            summary = self._partial(max(lo, start), min(hi, end), lines, "frame descriptions",
+                                    deadline, stats, wait=True)
+        elif items:
+            partials = self._reduce_level(items, "frame descriptions", deadline, stats)
+            kind = "summaries of consecutive periods"
+            while len(partials) > self.group_size:
+                groups = [partials[i:i + self.group_size] for i in range(0, len(partials), self.group_size)]
+                partials = self._reduce_level([(g[0][0], g[-1][1], [text for _, _, text in g]) for g in groups],
+                                              kind, deadline, stats)
+            if len(partials) == 1:
+                summary = partials[0][2]
+            elif partials:
+                summary = self._partial(start, end, [text for _, _, text in partials], kind,
+                                        deadline, stats, wait=True)
+            else:
+                # Out of time before any partial finished: one direct pass over the captions
+                summary = self._partial(start, end, [line for _, line in notes], "frame descriptions",
+                                        deadline, stats, wait=True)
+        self.summaries += 1
+        return {
+            'summary': summary,
+            'start': start,
+            'end': end,
+            'camera': camera,
+            'stats': stats,
+            'seconds': round(time.monotonic() - started, 2)
+        }
+
+    def _reduce_level(self, items, kind, deadline, stats):
+        """Summarize each item's lines in parallel; items that miss the deadline are dropped"""
+        pending = [(lo, hi, self._partial(lo, hi, lines, kind, deadline, stats)) for lo, hi, lines in items]
+        reduced = []
+        for lo, hi, result in pending:
+            if isinstance(result, str):
+                reduced.append((lo, hi, result))
+            elif result.wait(max(0.0, deadline - time.monotonic())) and result.status == "done":
+                reduced.append((lo, hi, result.result))
+        return reduced
+
+    def _partial(self, lo, hi, lines, kind, deadline, stats, wait=False):
+        """Cached text for one reduce step, or the job computing it (its text if wait)"""
+        prompt = SUMMARY_PROMPT.format(kind=kind, start=clock(lo), end=clock(hi), notes="\n".join(lines))
+        key = cache_key(None, prompt, self.model_name or "")
+        cached = self.cache.get(key)
+        if cached is not None:
+            stats['partials_cached'] += 1
+            return cached
+        stats['model_calls'] += 1
+        job = self.executor.submit(f"summary:{key}", self._generate, key, prompt, kind="summary")
+        if not wait:
+            return job
+        # The final step gets one model call past the deadline at most
+        job.wait(max(0.0, deadline - time.monotonic()) + 60.0)
+        if job.status != "done":
+            raise RuntimeError(job.error or "Summary timed out")
+        return job.result
+
+    def _generate(self, key, prompt):
+        text = self.generate_fn(prompt).strip()
+        self.cache.put(key, text)
+        return text
+
+    def stats(self):
+        return {
+            'summaries': self.summaries,
+            'max_frames': self.max_frames,
+            'bucket_seconds': self.bucket_seconds,
+            'group_size': self.group_size,
+            'deadline': self.deadline
+        }
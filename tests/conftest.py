@@ -0,0 +1,6 @@
+"""Make the top-level modules importable when pytest runs from any directory"""
+
+import pathlib
+import sys
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
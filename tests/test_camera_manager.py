@@ -0,0 +1,87 @@
+"""Several cameras under one CameraManager: separate directories and capture threads, one catalog"""
+
+import pathlib
+import time
+
+import pytest
+
+from camera_manager import CameraManager
+from capture_catalog import CaptureCatalog
+from fake_esp32 import FakeESP32
+
+CAMERA_IDS = ("left", "right", "rear")
+
+@pytest.fixture
+def devices():
+    fakes = [FakeESP32(frame_size=4096, seed=n).start() for n in range(len(CAMERA_IDS))]
+    yield dict(zip(CAMERA_IDS, fakes))
+    for fake in fakes:
+        fake.stop()
+
+@pytest.fixture
+def catalog(tmp_path):
+    catalog = CaptureCatalog(tmp_path / "captures")
+    yield catalog
+    catalog.close()
+
+@pytest.fixture
+def manager(devices, catalog, tmp_path):
+    manager = CameraManager(captures_dir=tmp_path / "captures", catalog=catalog)
+    for camera_id, device in devices.items():
+        manager.add_camera(device.port, camera_id)
+    yield manager
+    manager.shutdown()
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+def test_each_camera_has_its_own_directory(manager, catalog, tmp_path):
+    directories = {camera_id: manager.get(camera_id).captures_dir for camera_id in CAMERA_IDS}
+    assert len(set(directories.values())) == len(CAMERA_IDS)
+    for camera_id, directory in directories.items():
+        assert directory == tmp_path / "captures" / camera_id
+        camera = manager.get(camera_id)
+        assert camera.connect()
+        path = pathlib.Path(camera.capture_single_image())
+        assert path.is_relative_to(directory)
+        assert catalog.get(path.relative_to(catalog.captures_dir).as_posix())['camera'] == camera_id
+
+def test_cameras_share_one_catalog(manager, catalog):
+    assert all(manager.get(camera_id).catalog is catalog for camera_id in CAMERA_IDS)
+    for camera_id in CAMERA_IDS:
+        camera = manager.get(camera_id)
+        assert camera.connect()
+        for _ in range(2):
+            assert camera.capture_single_image()
+    assert catalog.count() == 2 * len(CAMERA_IDS)
+    for camera_id in CAMERA_IDS:
+        images = catalog.latest(camera=camera_id)
+        assert len(images) == 2
+        assert all(image['camera'] == camera_id for image in images)
+
+def test_capture_on_one_camera_leaves_the_others_alone(manager, devices):
+    for camera_id in CAMERA_IDS:
+        assert manager.get(camera_id).connect()
+    assert manager.get("left").capture_single_image()
+    assert devices["left"].frames_sent == 1
+    assert devices["right"].frames_sent == 0 and devices["rear"].frames_sent == 0
+
+def test_stopping_one_camera_leaves_the_others_running(manager, devices):
+    for camera_id in CAMERA_IDS:
+        assert manager.start(camera_id, interval=0.2)
+    assert wait_for(lambda: all(device.frames_sent >= 2 for device in devices.values()))
+
+    manager.stop("right")
+    assert not manager.status("right")['running']
+    stopped_at = devices["right"].frames_sent
+    running = {camera_id: devices[camera_id].frames_sent for camera_id in ("left", "rear")}
+    assert wait_for(lambda: all(devices[camera_id].frames_sent >= count + 3
+                                for camera_id, count in running.items()))
+    assert devices["right"].frames_sent == stopped_at
+    assert manager.status("left")['running'] and manager.status("rear")['running']
+    assert manager.status("right")['connected']
@@ -0,0 +1,119 @@
+"""ESP32Camera against the fake firmware: handshake, commands, baud switching and profiles"""
+
+import time
+
+import pytest
+
+from arduino_camera import ESP32Camera
+from fake_esp32 import FakeESP32, FIRMWARE_VERSION
+from frame_parser import make_test_jpeg
+
+def open_camera(device, tmp_path, **kwargs):
+    camera = ESP32Camera(port=device.port, captures_dir=tmp_path / "captures", ready_timeout=3.0, **kwargs)
+    assert camera.connect()
+    return camera
+
+@pytest.fixture
+def device():
+    with FakeESP32(frame_size=4096) as fake:
+        yield fake
+
+@pytest.fixture
+def camera(device, tmp_path):
+    camera = open_camera(device, tmp_path)
+    yield camera
+    camera.disconnect()
+
+def test_handshake_reads_protocol_and_hello(camera):
+    assert camera.protocol == 2
+    assert camera.firmware == {'protocol': 2, 'version': FIRMWARE_VERSION}
+    assert camera.settings == {'framesize': "SVGA", 'quality': 12, 'baud': 115200}
+    assert camera.firmware_status()['firmware'] == FIRMWARE_VERSION
+
+def test_set_round_trip(camera, device):
+    settings = camera.configure(framesize="vga", quality=20)
+    assert settings['framesize'] == "VGA" and settings['quality'] == 20
+    assert device.settings['framesize'] == "VGA" and device.settings['quality'] == 20
+    assert camera.profile is None and camera.capture_profile is None
+
+def test_firmware_rejects_bad_framesize(camera, device):
+    with pytest.raises(ValueError, match="unknown framesize"):
+        camera.command("SET framesize=HUGE")
+    assert device.settings['framesize'] == "SVGA"
+    # Caught on the host before anything is sent, too
+    commands = device.commands
+    with pytest.raises(ValueError):
+        camera.configure(framesize="HUGE")
+    assert device.commands == commands
+
+def test_baud_switch(camera, device):
+    assert camera.set_baud(921600)
+    assert camera.baud == 921600 and camera.settings['baud'] == 921600
+    assert device.settings['baud'] == 921600
+
+def test_baud_reverts_without_probe(camera, device):
+    # Lose the '?' sent at the new rate, as if the host couldn't be heard there
+    write = camera.ser.write
+    camera.ser.write = lambda data: len(data) if data == b"?" else write(data)
+    with pytest.raises(TimeoutError):
+        camera.set_baud(921600)
+    camera.ser.write = write
+    assert camera.baud == 115200 and camera.ser.baudrate == 115200
+    # A probe after the confirmation window finds the firmware back at the old rate
+    camera.ser.write(b"?")
+    assert "Ready" in camera.ser.readline().decode()
+    assert device.settings['baud'] == 115200
+    assert camera.hello()['settings']['baud'] == 115200
+
+def test_protocol_1_fallback(tmp_path):
+    with FakeESP32(frame_size=4096, protocol=1) as device:
+        camera = open_camera(device, tmp_path)
+        try:
+            assert camera.protocol == 1
+            assert camera.firmware == {}
+            with pytest.raises(RuntimeError):
+                camera.command("HELLO")
+            # Profiles are ignored; plain triggers still capture
+            assert camera.capture_single_image(profile="fast")
+            assert device.commands == 0
+        finally:
+            camera.disconnect()
+
+def test_capture_single_image_profiles(camera, device):
+    small = camera.capture_single_image(profile="fast")
+    assert device.settings['framesize'] == "QVGA" and device.settings['quality'] == 30
+    assert camera.profile == "fast"
+    full = camera.capture_single_image()
+    assert device.settings['framesize'] == "SVGA" and device.settings['quality'] == 12
+    assert camera.profile == "full" and camera.capture_profile == "full"
+    sizes = [len(open(path, "rb").read()) for path in (small, full)]
+    assert sizes[0] < sizes[1]
+
+def test_max_profile_frames_fit_the_decoder(tmp_path):
+    # UXGA at quality 10 is well past the decoder's old 256 KB default
+    frame = make_test_jpeg(300 * 1024)
+    with FakeESP32(frames=[frame]) as device:
+        camera = open_camera(device, tmp_path, frame_timeout=5.0)
+        try:
+            path = camera.capture_single_image(profile="max")
+            assert path and open(path, "rb").read() == frame
+            assert device.settings['framesize'] == "UXGA"
+            assert camera.decoder.resyncs == 0
+        finally:
+            camera.disconnect()
+
+def test_stop_interrupts_a_frame_in_progress(tmp_path):
+    # The board takes far longer than the test to answer a trigger
+    with FakeESP32(frame_size=4096, latency=30.0) as device:
+        camera = open_camera(device, tmp_path, frame_timeout=20.0)
+        try:
+            for start in (camera.start_continuous_capture, camera.start_streaming_capture):
+                start()
+                time.sleep(0.5)
+                started = time.time()
+                camera.stop_continuous_capture()
+                assert time.time() - started < 5.0
+                assert not camera.capture_thread.is_alive()
+                assert camera.writer_thread is None
+        finally:
+            camera.disconnect()
@@ -0,0 +1,40 @@
+"""Adaptive capture budgets: stored frames count, probe frames don't"""
+
+import time
+
+from arduino_camera import ESP32Camera
+from capture_scheduler import AdaptiveScheduler
+from fake_esp32 import FakeESP32
+
+def test_budget_counts_only_stored_frames():
+    scheduler = AdaptiveScheduler(max_bytes_per_hour=10_000)
+    scheduler.observe(b"probe" * 1000, count=False)
+    assert scheduler.stats()['bytes_last_hour'] == 0
+    assert scheduler.next_delay() == scheduler.interval
+    scheduler.record(10_000)
+    assert scheduler.next_delay() > 3000
+
+def test_max_bytes_per_hour_limits_saved_bytes_in_adaptive_mode(tmp_path):
+    frame_size = 32 * 1024
+    budget = 3 * frame_size - 1
+    # Synthetic frames can't be decoded, so every probe counts as a scene change
+    scheduler = AdaptiveScheduler(min_interval=0.05, max_interval=0.05, max_bytes_per_hour=budget)
+    with FakeESP32(frame_size=frame_size) as device:
+        camera = ESP32Camera(port=device.port, captures_dir=tmp_path, scheduler=scheduler, ready_timeout=3.0)
+        assert camera.connect()
+        try:
+            camera.start_continuous_capture(adaptive=True)
+            deadline = time.time() + 10
+            while scheduler.stats()['throttled'] == 0 and time.time() < deadline:
+                time.sleep(0.05)
+            # Another second would allow many more captures if the budget didn't hold
+            time.sleep(1.0)
+        finally:
+            camera.disconnect()
+    saved = [path.stat().st_size for path in tmp_path.rglob("*.jpg")]
+    stats = scheduler.stats()
+    assert stats['throttled'] >= 1
+    # Probes were seen but not counted: the budget tracks exactly what was stored
+    assert stats['frames'] > 0 and stats['captures_last_hour'] == len(saved) == 3
+    assert stats['bytes_last_hour'] == sum(saved)
+    assert sum(saved) - max(saved) < budget
@@ -0,0 +1,90 @@
+"""FrameDecoder on damaged and fragmented input, in memory and from the fake firmware"""
+
+import struct
+import time
+
+import serial
+
+from fake_esp32 import FakeESP32
+from frame_parser import SYNC, FrameDecoder, encode_frame, make_test_jpeg
+
+def decode(*chunks, decoder=None):
+    """Feed chunks one at a time and collect every frame they complete"""
+    decoder = decoder or FrameDecoder(capacity=64 * 1024)
+    frames = []
+    for chunk in chunks:
+        decoder.feed(chunk)
+        while (frame := decoder.next_frame()) is not None:
+            frames.append(frame)
+    return frames, decoder
+
+def test_false_sync_inside_jpeg_data():
+    jpeg = make_test_jpeg(4096)
+    # A sync pattern and plausible length in the middle of the payload
+    jpeg = jpeg[:1000] + SYNC + struct.pack("<I", 100) + jpeg[1006:]
+    frames, decoder = decode(encode_frame(jpeg), encode_frame(make_test_jpeg(2048, seed=1)))
+    assert frames == [jpeg, make_test_jpeg(2048, seed=1)]
+    assert decoder.resyncs == 0
+
+def test_false_sync_between_frames():
+    noise = b"Done\r\n" + SYNC + struct.pack("<I", 512) + b"not a jpeg"
+    frames, decoder = decode(noise, encode_frame(make_test_jpeg(2048)))
+    assert frames == [make_test_jpeg(2048)]
+    assert decoder.resyncs >= 1
+
+def test_truncated_frame_is_skipped():
+    first, second = make_test_jpeg(4096, seed=1), make_test_jpeg(4096, seed=2)
+    truncated = encode_frame(first)[:2500]
+    frames, decoder = decode(truncated, encode_frame(second))
+    assert frames == [second]
+    assert decoder.resyncs >= 1
+
+def test_header_split_across_reads():
+    jpeg = make_test_jpeg(3000)
+    data = encode_frame(jpeg)
+    # Split between the sync bytes, inside the length and inside the payload
+    for cuts in ((1,), (3,), (5,), (1, 4, 7, 2000)):
+        chunks, start = [], 0
+        for cut in cuts:
+            chunks.append(data[start:cut])
+            start = cut
+        chunks.append(data[start:])
+        decoder = FrameDecoder(capacity=64 * 1024)
+        for chunk in chunks[:-1]:
+            decoder.feed(chunk)
+            assert decoder.next_frame() is None
+        decoder.feed(chunks[-1])
+        assert decoder.next_frame() == jpeg
+
+def test_byte_at_a_time():
+    jpegs = [make_test_jpeg(1500, seed=n) for n in range(3)]
+    data = b"boot chatter\r\n" + b"".join(encode_frame(jpeg) for jpeg in jpegs)
+    frames, _ = decode(*(data[i:i + 1] for i in range(len(data))))
+    assert frames == jpegs
+
+def test_length_above_max_frame_size():
+    decoder = FrameDecoder(capacity=64 * 1024, max_frame_size=4096)
+    big, small = make_test_jpeg(8192), make_test_jpeg(2048)
+    frames, decoder = decode(encode_frame(big), encode_frame(small), decoder=decoder)
+    assert frames == [small]
+    assert decoder.resyncs >= 1
+
+def test_corrupted_link_from_fake_firmware():
+    with FakeESP32(frame_size=8192, corruption=0.3, seed=3, boot_message="") as device:
+        # pyserial, like ESP32Camera: reads time out instead of blocking on a lost frame
+        with serial.Serial(device.port, timeout=0.1) as port:
+            decoder = FrameDecoder(capacity=64 * 1024)
+            intact = 0
+            for n in range(40):
+                port.write(b"x")
+                frame = decoder.read_frame(port, time.time() + 0.5)
+                if frame == device.frames[n % len(device.frames)]:
+                    intact += 1
+                elif frame is not None:
+                    # Noise inside the payload can't be detected without a checksum,
+                    # but what comes out is always a whole JPEG of the right size
+                    assert frame[:2] == b"\xFF\xD8" and frame[-2:] == b"\xFF\xD9"
+    assert device.frames_corrupted > 0
+    assert decoder.resyncs > 0
+    # Every frame sent intact was decoded
+    assert intact >= device.frames_sent - device.frames_corrupted
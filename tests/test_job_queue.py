@@ -0,0 +1,129 @@
+"""JobQueue against the fake model: outages, probing, priorities, per-kind caps and restarts"""
+
+import threading
+import time
+
+import pytest
+
+from job_queue import BACKGROUND, INTERACTIVE, JobQueue
+from model_client import FakeModelClient
+
+def model_handler(model):
+    return lambda payload: model.generate([f"{payload['kind']} {payload['n']}"])
+
+class Tracker:
+    """Handler wrapper recording start order and the most jobs of each kind running at once"""
+
+    def __init__(self, handler=lambda payload: payload['n'], hold=0.0):
+        self.handler = handler
+        self.hold = hold
+        self.order = []
+        self.running = {}
+        self.peak = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, payload):
+        kind = payload['kind']
+        with self._lock:
+            self.order.append((kind, payload['n']))
+            self.running[kind] = self.running.get(kind, 0) + 1
+            self.peak[kind] = max(self.peak.get(kind, 0), self.running[kind])
+        try:
+            time.sleep(self.hold)
+            return self.handler(payload)
+        finally:
+            with self._lock:
+                self.running[kind] -= 1
+
+@pytest.fixture
+def db_path(tmp_path):
+    return tmp_path / "jobs.db"
+
+def test_outage_loses_nothing_and_only_probes(db_path):
+    outage = 1.0
+    model = FakeModelClient(latency=0.01, outages=[(0.0, outage)])
+    queue = JobQueue(db_path, max_workers=4, base_delay=0.05, max_delay=0.3, seed=0)
+    try:
+        queue.register('caption', model_handler(model), priority=BACKGROUND, max_concurrent=2)
+        queue.register('analysis', model_handler(model), priority=INTERACTIVE)
+        jobs = [queue.enqueue('caption', {'kind': 'caption', 'n': n}) for n in range(40)]
+        jobs += [queue.enqueue('analysis', {'kind': 'analysis', 'n': n}) for n in range(5)]
+
+        deadline = time.monotonic() + outage
+        saw_degraded = False
+        while time.monotonic() < deadline and not saw_degraded:
+            saw_degraded = queue.degraded
+            time.sleep(0.01)
+        assert saw_degraded
+
+        assert all(job.wait(30) for job in jobs)
+        assert [job for job in jobs if job.status != 'done'] == []
+        stats = queue.stats()
+        assert stats['probes'] >= 1
+        assert stats['backend']['state'] == 'ok'
+        # One probe at a time while degraded, instead of every job retrying on its own
+        assert model.failures < len(jobs) / 2
+    finally:
+        queue.shutdown()
+
+def test_interactive_jobs_run_before_background(db_path):
+    release = threading.Event()
+    tracker = Tracker()
+
+    def handler(payload):
+        if payload['n'] < 0:
+            release.wait(5)
+        return tracker(payload)
+
+    queue = JobQueue(db_path, max_workers=1)
+    try:
+        queue.register('caption', handler, priority=BACKGROUND)
+        queue.register('analysis', handler, priority=INTERACTIVE)
+        # Occupy the only worker while the rest is queued
+        blocker = queue.enqueue('caption', {'kind': 'caption', 'n': -1})
+        while blocker.status != 'running':
+            time.sleep(0.01)
+        jobs = [queue.enqueue('caption', {'kind': 'caption', 'n': n}) for n in range(5)]
+        jobs += [queue.enqueue('analysis', {'kind': 'analysis', 'n': n}) for n in range(5)]
+        release.set()
+        assert all(job.wait(10) for job in jobs)
+    finally:
+        queue.shutdown()
+    kinds = [kind for kind, n in tracker.order if n >= 0]
+    assert kinds == ['analysis'] * 5 + ['caption'] * 5
+
+def test_per_kind_caps(db_path):
+    tracker = Tracker(hold=0.05)
+    queue = JobQueue(db_path, max_workers=4)
+    try:
+        queue.register('caption', tracker, priority=BACKGROUND, max_concurrent=2)
+        queue.register('analysis', tracker, priority=INTERACTIVE)
+        jobs = [queue.enqueue('caption', {'kind': 'caption', 'n': n}) for n in range(12)]
+        jobs += [queue.enqueue('analysis', {'kind': 'analysis', 'n': n}) for n in range(6)]
+        assert all(job.wait(10) for job in jobs)
+        assert queue.stats()['limits'] == {'caption': 2}
+    finally:
+        queue.shutdown()
+    assert tracker.peak['caption'] == 2
+    # The capped kind leaves the other workers to everything else
+    assert tracker.peak['analysis'] >= 2
+
+def test_durable_jobs_resume_after_restart(db_path):
+    model = FakeModelClient(latency=0.0, outages=[(0.0, 1e9)])
+    queue = JobQueue(db_path, max_workers=2, base_delay=0.05, max_delay=0.2)
+    queue.register('caption', model_handler(model))
+    pending = [queue.enqueue('caption', {'kind': 'caption', 'n': n}).id for n in range(10)]
+    time.sleep(0.3)
+    queue.shutdown()
+    assert model.failures >= 1
+
+    model.outages = []
+    queue = JobQueue(db_path, max_workers=2)
+    try:
+        queue.register('caption', model_handler(model))
+        resumed = [queue.get(job_id) for job_id in pending]
+        assert all(job is not None and job.wait(10) for job in resumed)
+        assert [job.status for job in resumed] == ['done'] * len(pending)
+        assert all(job.result.endswith(f": caption {n}") for n, job in enumerate(resumed))
+    finally:
+        queue.shutdown()